@@ -1,5 +1,6 @@
 from .base.env.config import EnvConfig  # noqa F401
 from .base.env.registration import make as make_env  # noqa F401
+from .base.env.registration import make_vector as make_vector_env  # noqa F401
 from .base.rl.registration import make_parameter  # noqa F401
 from .base.rl.registration import make_remote_memory  # noqa F401
 from .base.rl.registration import make_trainer  # noqa F401
@@ -13,7 +13,7 @@ from srl.base.rl.base import RLParameter, RLTrainer
 from srl.base.rl.processor import Processor
 from srl.base.rl.processors.image_processor import ImageProcessor
 from srl.base.rl.registration import register
-from srl.base.rl.remote_memory import ExperienceReplayBuffer
+from srl.base.rl.remote_memory import ColumnarReplayBuffer
 from srl.rl.functions.common import render_discrete_action
 from srl.rl.models.tf.dqn_image_block import DQNImageBlock
 from srl.rl.models.tf.input_layer import create_input_layer
@@ -94,12 +94,21 @@ register(
 # ------------------------------------------------------
 # RemoteMemory
 # ------------------------------------------------------
-class RemoteMemory(ExperienceReplayBuffer):
+class RemoteMemory(ColumnarReplayBuffer):
     def __init__(self, *args):
         super().__init__(*args)
         self.config = cast(Config, self.config)
 
-        self.init(self.config.capacity)
+        self.init(
+            self.config.capacity,
+            {
+                "state": (self.config.observation_shape, np.float32),
+                "next_state": (self.config.observation_shape, np.float32),
+                "action": ((), np.int32),
+                "reward": ((), np.float32),
+                "done": ((), np.float32),
+            },
+        )
 
 
 # ------------------------------------------------------
@@ -165,20 +174,11 @@ class Trainer(RLTrainer):
 
         batchs = self.remote_memory.sample(self.config.batch_size)
 
-        states = []
-        actions = []
-        n_states = []
-        rewards = []
-        dones = []
-        for b in batchs:
-            states.append(b["state"])
-            actions.append(b["action"])
-            n_states.append(b["next_state"])
-            rewards.append(b["reward"])
-            dones.append(b["done"])
-        states = np.asarray(states)
-        n_states = np.asarray(n_states)
-        actions = np.asarray(actions).reshape((-1, 1))
+        states = batchs["state"]
+        actions = batchs["action"].reshape((-1, 1))
+        n_states = batchs["next_state"]
+        rewards = batchs["reward"]
+        dones = batchs["done"]
 
         #: a' = argmaxE[Z(s', a')]
         logits = self.parameter.Q(n_states)
@@ -13,11 +13,13 @@ from srl.base.rl.base import RLParameter, RLTrainer
 from srl.base.rl.processor import Processor
 from srl.base.rl.processors.image_processor import ImageProcessor
 from srl.base.rl.registration import register
-from srl.base.rl.remote_memory import ExperienceReplayBuffer
+from srl.base.rl.remote_memory import ColumnarReplayBuffer
+from srl.base.rl.worker import RLWorker
 from srl.rl.functions.common import create_epsilon_list, inverse_rescaling, render_discrete_action, rescaling
 from srl.rl.models.tf.dqn_image_block import DQNImageBlock
 from srl.rl.models.tf.input_layer import create_input_layer
 from srl.rl.models.tf.mlp_block import MLPBlock
+from srl.utils import profiler
 
 """
 Paper
@@ -72,6 +74,10 @@ class Config(DiscreteActionConfig):
     batch_size: int = 32
     capacity: int = 100_000
     memory_warmup_size: int = 1000
+    # state/next_state を1フレームずつ保存し重複を省く(画像やwindow_length>1の時に省メモリ)
+    enable_frame_store: bool = False
+    # 指定するとmemoryをこのディレクトリ上のnp.memmapに置く(同じディレクトリで再開可能)
+    memory_memmap_dir: str = ""
     target_model_update_interval: int = 1000
     enable_reward_clip: bool = False
 
@@ -86,6 +92,7 @@ class Config(DiscreteActionConfig):
     def set_atari_config(self):
         self.batch_size = 32
         self.capacity = 1_000_000
+        self.enable_frame_store = True
         self.cnn_block = DQNImageBlock
         self.hidden_block = MLPBlock
         self.hidden_block_kwargs = dict(hidden_layer_sizes=(512,))
@@ -143,12 +150,30 @@ register(
 # ------------------------------------------------------
 # RemoteMemory
 # ------------------------------------------------------
-class RemoteMemory(ExperienceReplayBuffer):
+class RemoteMemory(ColumnarReplayBuffer):
     def __init__(self, *args):
         super().__init__(*args)
         self.config = cast(Config, self.config)
 
-        self.init(self.config.capacity)
+        columns = {
+            "action": ((), np.int32),
+            "reward": ((), np.float32),
+            "done": ((), np.bool_),
+            "next_invalid_actions_mask": ((self.config.action_num,), np.bool_),
+        }
+        if self.config.enable_frame_store:
+            self.init(
+                self.config.capacity,
+                columns,
+                frame_shape=self.config._one_observation_shape,
+                window_length=self.config.window_length,
+                dummy_frame_val=self.config.dummy_state_val,
+                memmap_dir=self.config.memory_memmap_dir,
+            )
+        else:
+            columns["state"] = (self.config.observation_shape, np.float32)
+            columns["next_state"] = (self.config.observation_shape, np.float32)
+            self.init(self.config.capacity, columns, memmap_dir=self.config.memory_memmap_dir)
 
 
 # ------------------------------------------------------
@@ -242,60 +267,47 @@ class Trainer(RLTrainer):
         return {"loss": loss, "sync": self.sync_count}
 
     def _train_on_batchs(self, batchs):
+        with profiler.timer("batch"):
+            target_q = self._calc_target_q(batchs)
+
+        with profiler.timer("gradient"):
+            with tf.GradientTape() as tape:
+                q = self.parameter.q_online(batchs["state"])
+
+                # 現在選んだアクションのQ値
+                actions_onehot = tf.one_hot(batchs["action"], self.config.action_num)
+                q = tf.reduce_sum(q * actions_onehot, axis=1)
 
-        states = []
-        n_states = []
-        actions = []
-        for b in batchs:
-            states.append(b["state"])
-            n_states.append(b["next_state"])
-            actions.append(b["action"])
-        states = np.asarray(states)
-        n_states = np.asarray(n_states)
+                loss = self.loss(target_q, q)
+
+            grads = tape.gradient(loss, self.parameter.q_online.trainable_variables)
+            self.optimizer.apply_gradients(zip(grads, self.parameter.q_online.trainable_variables))
+
+        return loss.numpy()
+
+    def _calc_target_q(self, batchs) -> np.ndarray:
+        n_states = batchs["next_state"]
+        rewards = batchs["reward"]
+        dones = batchs["done"]
+        next_invalid_actions_mask = batchs["next_invalid_actions_mask"]
 
         # next Q
         n_q = self.parameter.q_online(n_states).numpy()
         n_q_target = self.parameter.q_target(n_states).numpy()
 
         # 各バッチのQ値を計算
-        target_q = np.zeros(len(batchs))
-        for i, b in enumerate(batchs):
-            reward = b["reward"]
-            done = b["done"]
-            next_invalid_actions = b["next_invalid_actions"]
-            if done:
-                gain = reward
-            else:
-                # DoubleDQN: indexはonlineQから選び、値はtargetQを選ぶ
-                if self.config.enable_double_dqn:
-                    n_q[i] = [(-np.inf if a in next_invalid_actions else v) for a, v in enumerate(n_q[i])]
-                    n_act_idx = np.argmax(n_q[i])
-                else:
-                    n_q_target[i] = [
-                        (-np.inf if a in next_invalid_actions else v) for a, v in enumerate(n_q_target[i])
-                    ]
-                    n_act_idx = np.argmax(n_q_target[i])
-                maxq = n_q_target[i][n_act_idx]
-                if self.config.enable_rescale:
-                    maxq = inverse_rescaling(maxq)
-                gain = reward + self.config.discount * maxq
-            if self.config.enable_rescale:
-                gain = rescaling(gain)
-            target_q[i] = gain
-
-        with tf.GradientTape() as tape:
-            q = self.parameter.q_online(states)
-
-            # 現在選んだアクションのQ値
-            actions_onehot = tf.one_hot(actions, self.config.action_num)
-            q = tf.reduce_sum(q * actions_onehot, axis=1)
-
-            loss = self.loss(target_q, q)
-
-        grads = tape.gradient(loss, self.parameter.q_online.trainable_variables)
-        self.optimizer.apply_gradients(zip(grads, self.parameter.q_online.trainable_variables))
-
-        return loss.numpy()
+        # DoubleDQN: indexはonlineQから選び、値はtargetQを選ぶ
+        if self.config.enable_double_dqn:
+            n_act_idx = np.argmax(np.where(next_invalid_actions_mask, -np.inf, n_q), axis=1)
+        else:
+            n_act_idx = np.argmax(np.where(next_invalid_actions_mask, -np.inf, n_q_target), axis=1)
+        maxq = n_q_target[np.arange(len(n_act_idx)), n_act_idx]
+        if self.config.enable_rescale:
+            maxq = inverse_rescaling(maxq)
+        target_q = np.where(dones, rewards, rewards + self.config.discount * maxq)
+        if self.config.enable_rescale:
+            target_q = rescaling(target_q)
+        return target_q.astype(np.float32)
 
 
 # ------------------------------------------------------
@@ -318,6 +330,7 @@ class Worker(DiscreteActionWorker):
             self.final_epsilon = self.config.final_epsilon
 
     def call_on_reset(self, state: np.ndarray, invalid_actions: List[int]) -> dict:
+        self.is_first_step = True
         return {}
 
     def call_policy(self, state: np.ndarray, invalid_actions: List[int]) -> Tuple[int, dict]:
@@ -339,7 +352,10 @@ class Worker(DiscreteActionWorker):
             # epsilonより低いならランダム
             action = random.choice([a for a in range(self.config.action_num) if a not in invalid_actions])
         else:
-            q = self.parameter.q_online(self.state[np.newaxis, ...])[0].numpy()
+            if self.batch_prediction is not None:
+                q = self.batch_prediction
+            else:
+                q = self.parameter.q_online(self.state[np.newaxis, ...])[0].numpy()
 
             # invalid actionsは -inf にする
             q = [(-np.inf if a in invalid_actions else v) for a, v in enumerate(q)]
@@ -350,6 +366,9 @@ class Worker(DiscreteActionWorker):
         self.action = action
         return action, {"epsilon": epsilon}
 
+    def call_policy_batch(self, workers: List[RLWorker], states: np.ndarray) -> List[np.ndarray]:
+        return list(self.parameter.q_online(states).numpy())
+
     def call_on_step(
         self,
         next_state: np.ndarray,
@@ -370,14 +389,29 @@ class Worker(DiscreteActionWorker):
             else:
                 reward = 0
 
+        next_invalid_actions_mask = np.zeros(self.config.action_num, dtype=np.bool_)
+        next_invalid_actions_mask[next_invalid_actions] = True
         batch = {
-            "state": self.state,
-            "next_state": next_state,
             "action": self.action,
             "reward": reward,
             "done": done,
-            "next_invalid_actions": next_invalid_actions,
+            "next_invalid_actions_mask": next_invalid_actions_mask,
         }
+        if self.config.enable_frame_store:
+            # 最新フレームだけ送る
+            if self.config.window_length > 1:
+                first_frame = self.state[-1]
+                next_frame = next_state[-1]
+            else:
+                first_frame = self.state
+                next_frame = next_state
+            batch["frame_stream"] = (self.actor_id, id(self))
+            batch["first_frame"] = first_frame if self.is_first_step else None
+            batch["next_frame"] = next_frame
+            self.is_first_step = False
+        else:
+            batch["state"] = self.state
+            batch["next_state"] = next_state
         self.remote_memory.add(batch)
 
         return {}
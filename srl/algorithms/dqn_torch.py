@@ -13,7 +13,7 @@ from srl.base.rl.base import RLParameter, RLTrainer
 from srl.base.rl.processor import Processor
 from srl.base.rl.processors.image_processor import ImageProcessor
 from srl.base.rl.registration import register
-from srl.base.rl.remote_memory import ExperienceReplayBuffer
+from srl.base.rl.remote_memory import ColumnarReplayBuffer
 from srl.rl.functions.common import create_epsilon_list, render_discrete_action
 from srl.rl.models.torch.input_layer import InputLayer
 
@@ -105,12 +105,22 @@ register(
 # ------------------------------------------------------
 # RemoteMemory
 # ------------------------------------------------------
-class RemoteMemory(ExperienceReplayBuffer):
+class RemoteMemory(ColumnarReplayBuffer):
     def __init__(self, *args):
         super().__init__(*args)
         self.config = cast(Config, self.config)
 
-        self.init(self.config.capacity)
+        self.init(
+            self.config.capacity,
+            {
+                "state": (self.config.observation_shape, np.float32),
+                "next_state": (self.config.observation_shape, np.float32),
+                "action": ((), np.int64),
+                "reward": ((), np.float32),
+                "done": ((), np.bool_),
+                "next_invalid_actions_mask": ((self.config.action_num,), np.bool_),
+            },
+        )
 
 
 # ------------------------------------------------------
@@ -222,16 +232,12 @@ class Trainer(RLTrainer):
         return {"loss": loss, "sync": self.sync_count}
 
     def _train_on_batchs(self, batchs):
-
-        states = []
-        n_states = []
-        actions = []
-        for b in batchs:
-            states.append(b["state"])
-            n_states.append(b["next_state"])
-            actions.append(b["action"])
-        states = torch.tensor(states)
-        n_states = torch.tensor(n_states)
+        states = torch.from_numpy(batchs["state"])
+        n_states = torch.from_numpy(batchs["next_state"])
+        actions = batchs["action"]
+        rewards = batchs["reward"]
+        dones = batchs["done"]
+        next_invalid_actions_mask = batchs["next_invalid_actions_mask"]
 
         # next Q
         with torch.no_grad():
@@ -241,26 +247,13 @@ class Trainer(RLTrainer):
             n_q_target = n_q_target.to("cpu").detach().numpy()
 
         # 各バッチのQ値を計算
-        target_q = np.zeros(len(batchs))
-        for i, b in enumerate(batchs):
-            reward = b["reward"]
-            done = b["done"]
-            next_invalid_actions = b["next_invalid_actions"]
-            if done:
-                gain = reward
-            else:
-                # DoubleDQN: indexはonlineQから選び、値はtargetQを選ぶ
-                if self.config.enable_double_dqn:
-                    n_q[i] = [(-np.inf if a in next_invalid_actions else v) for a, v in enumerate(n_q[i])]
-                    n_act_idx = np.argmax(n_q[i])
-                else:
-                    n_q_target[i] = [
-                        (-np.inf if a in next_invalid_actions else v) for a, v in enumerate(n_q_target[i])
-                    ]
-                    n_act_idx = np.argmax(n_q_target[i])
-                maxq = n_q_target[i][n_act_idx]
-                gain = reward + self.config.discount * maxq
-            target_q[i] = gain
+        # DoubleDQN: indexはonlineQから選び、値はtargetQを選ぶ
+        if self.config.enable_double_dqn:
+            n_act_idx = np.argmax(np.where(next_invalid_actions_mask, -np.inf, n_q), axis=1)
+        else:
+            n_act_idx = np.argmax(np.where(next_invalid_actions_mask, -np.inf, n_q_target), axis=1)
+        maxq = n_q_target[np.arange(len(n_act_idx)), n_act_idx]
+        target_q = np.where(dones, rewards, rewards + self.config.discount * maxq)
         target_q = torch.from_numpy(target_q.astype(np.float32))
 
         # --- torch train
@@ -353,13 +346,15 @@ class Worker(DiscreteActionWorker):
             else:
                 reward = 0
 
+        next_invalid_actions_mask = np.zeros(self.config.action_num, dtype=np.bool_)
+        next_invalid_actions_mask[next_invalid_actions] = True
         batch = {
             "state": self.state,
             "next_state": next_state.astype(np.float32),
             "action": self.action,
             "reward": reward,
             "done": done,
-            "next_invalid_actions": next_invalid_actions,
+            "next_invalid_actions_mask": next_invalid_actions_mask,
         }
         self.remote_memory.add(batch)
 
@@ -1,6 +1,6 @@
 import random
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import numpy as np
 import tensorflow as tf
@@ -14,6 +14,7 @@ from srl.base.rl.processor import Processor
 from srl.base.rl.processors.image_processor import ImageProcessor
 from srl.base.rl.registration import register
 from srl.base.rl.remote_memory import PriorityExperienceReplay
+from srl.base.rl.worker import RLWorker
 from srl.rl.functions.common import (
     calc_epsilon_greedy_probs,
     create_epsilon_list,
@@ -475,9 +476,12 @@ class Worker(DiscreteActionWorker):
         return {}
 
     def call_policy(self, state: np.ndarray, invalid_actions: List[int]) -> Tuple[int, dict]:
-        state = state[np.newaxis, np.newaxis, ...]  # (batch, time step, ...)
-        q, self.hidden_state = self.parameter.q_online(state, self.hidden_state)
-        q = q[0][0].numpy()  # (batch, time step, action_num)
+        if self.batch_prediction is not None:
+            q, self.hidden_state = self.batch_prediction
+        else:
+            state = state[np.newaxis, np.newaxis, ...]  # (batch, time step, ...)
+            q, self.hidden_state = self.parameter.q_online(state, self.hidden_state)
+            q = q[0][0].numpy()  # (batch, time step, action_num)
 
         if self.training:
             epsilon = self.config.epsilon
@@ -491,6 +495,19 @@ class Worker(DiscreteActionWorker):
         self.q = q
         return self.action, {}
 
+    def call_policy_batch(self, workers: List[RLWorker], states: np.ndarray) -> Optional[list]:
+        if len(workers) == 0:
+            return None  # hidden_stateがworker毎に必要
+        workers = cast(List[Worker], workers)
+        states = states[:, np.newaxis, ...]  # (batch, time step, ...)
+        hidden_state = [
+            tf.concat([w.hidden_state[0] for w in workers], axis=0),
+            tf.concat([w.hidden_state[1] for w in workers], axis=0),
+        ]
+        q, (h, c) = self.parameter.q_online(states, hidden_state)
+        q = q.numpy()
+        return [(q[i][0], [h[i : i + 1], c[i : i + 1]]) for i in range(len(workers))]
+
     def call_on_step(
         self,
         next_state: np.ndarray,
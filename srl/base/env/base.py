@@ -101,6 +101,25 @@ class EnvBase(ABC, IRender):
     def restore(self, data: Any) -> None:
         raise NotImplementedError()
 
+    # --------------------------------
+    # snapshot(option)
+    # --------------------------------
+    def snapshot(self) -> Any:
+        """backup より軽量に現在の状態を返します
+
+        探索(MCTS等)で何度も呼ばれる EnvRun.backup/restore で使われ、pickle せずにそのまま保持されます。
+        tuple や int 等、後から書き換えられない値で返してください。
+        また実装する場合は、reset/step で返した状態を後から書き換えないでください。
+        実装しない場合は backup を pickle したものを使います。
+        """
+        return pickle.dumps(self.backup())
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.restore(pickle.loads(data))
+
+    def is_snapshot_implemented(self) -> bool:
+        return self.__class__.snapshot is not EnvBase.snapshot
+
     # --------------------------------
     # options
     # --------------------------------
@@ -158,6 +177,7 @@ class EnvRun:
     def __init__(self, env: EnvBase, config: EnvConfig) -> None:
         self.env = env
         self.config = config
+        self._is_snapshot_implemented = env.is_snapshot_implemented()
         self.init()
 
         self._render = Render(env, config.font_name, config.font_size)
@@ -255,6 +275,22 @@ class EnvRun:
 
     def backup(self, include_env: bool = True) -> Any:
         logger.debug("env.backup")
+        if self._is_snapshot_implemented:
+            # env が snapshot に対応している場合は pickle しない
+            return (
+                self.step_num,
+                self.episode_rewards.copy(),
+                self.state,
+                self.step_rewards,
+                self.done,
+                self.done_reason,
+                self.next_player_index,
+                [a[:] for a in self._invalid_actions_list],
+                self.info,
+                self.t0,
+                self.env.snapshot() if include_env else None,
+                include_env,
+            )
         d = [
             self.step_num,
             self.episode_rewards,
@@ -273,6 +309,20 @@ class EnvRun:
 
     def restore(self, data: Any) -> None:
         logger.debug("env.restore")
+        if isinstance(data, tuple):
+            self._step_num = data[0]
+            self._episode_rewards = data[1].copy()
+            self._state = data[2]
+            self._step_rewards = data[3]
+            self._done = data[4]
+            self._done_reason = data[5]
+            self._next_player_index = data[6]
+            self._invalid_actions_list = [a[:] for a in data[7]]
+            self._info = data[8]
+            self.t0 = data[9]
+            if data[11]:
+                self.env.restore_snapshot(data[10])
+            return
         d = pickle.loads(data)
         self._step_num = d[0]
         self._episode_rewards = d[1]
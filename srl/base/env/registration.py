@@ -1,13 +1,16 @@
+import importlib
 import logging
-from typing import Dict, Union
+from typing import Dict, Optional, Union
 
 from srl.base.env.base import EnvRun
 from srl.base.env.config import EnvConfig
+from srl.base.env.vector import VectorEnvBase
 from srl.utils.common import is_package_installed, load_module
 
 logger = logging.getLogger(__name__)
 
 _registry = {}
+_vector_registry = {}
 
 
 def make(config: Union[str, EnvConfig]) -> EnvRun:
@@ -52,3 +55,52 @@ def register(id: str, entry_point: str, kwargs: Dict = None) -> None:
         "entry_point": entry_point,
         "kwargs": kwargs,
     }
+
+
+def get_entry(id: str) -> Optional[dict]:
+    """別プロセス(spawn)で同じenvを作れるように登録情報を返します"""
+    entry = _registry.get(id, None)
+    if entry is None:
+        return None
+    return {"entry_point": entry["entry_point"], "kwargs": entry["kwargs"].copy()}
+
+
+def register_entry(id: str, entry: Optional[dict]) -> None:
+    """get_entry で取得した登録情報を登録します(登録済みの場合は何もしません)"""
+    if entry is None or id in _registry:
+        return
+    # entry_point の module で登録している場合が多いので、まずは import して登録させる
+    importlib.import_module(entry["entry_point"].split(":")[0])
+    if id not in _registry:
+        register(id, entry["entry_point"], entry["kwargs"])
+
+
+def make_vector(config: Union[str, EnvConfig], batch_size: int, seed: Optional[int] = None) -> VectorEnvBase:
+    """register_vector で登録した env を batch_size 個まとめた VectorEnv を作成します"""
+    if isinstance(config, str):
+        config = EnvConfig(config)
+
+    env_name = config.name
+    if env_name not in _vector_registry:
+        raise ValueError(f"'{env_name}' is not registered as a vector env.")
+    env_cls = load_module(_vector_registry[env_name]["entry_point"])
+
+    _kwargs = _vector_registry[env_name]["kwargs"].copy()
+    _kwargs.update(config.kwargs)
+    env = env_cls(batch_size=batch_size, seed=seed, **_kwargs)
+    env.set_max_episode_steps(config.max_episode_steps)
+    return env
+
+
+def register_vector(id: str, entry_point: str, kwargs: Dict = None) -> None:
+    """VectorEnvBase を継承した env を登録します、id は make で使う env と同じで問題ありません"""
+    global _vector_registry
+    if kwargs is None:
+        kwargs = {}
+
+    if id in _vector_registry:
+        logger.warn(f"{id} was already registered as a vector env. It will be overwritten.")
+    _vector_registry[id] = {
+        "entry_point": entry_point,
+        "kwargs": kwargs,
+    }
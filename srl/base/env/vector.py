@@ -0,0 +1,134 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from srl.base.define import EnvObservationType, Info
+from srl.base.env.space import SpaceBase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VectorEnvBase(ABC):
+    """同じ env を batch_size 個まとめて、1回の step で全て進める env
+
+    - action は (batch_size,) の配列で受け取り、observation/reward/done は (batch_size, ...) の np.ndarray で返します
+    - 終了(max_episode_steps による打ち切りを含む)した env は step 内で自動的に reset します
+    - 1人プレイ用の env のみを対象にしています
+    """
+
+    batch_size: int = 1
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        assert self.batch_size > 0
+        self.rng = np.random.default_rng(self.seed)
+        self._max_episode_steps = self.max_episode_steps
+        self.step_nums = np.zeros(self.batch_size, dtype=np.int64)
+        self.episode_rewards = np.zeros(self.batch_size, dtype=np.float32)
+
+    # -----------------------------------------------------
+    # inheritance target implementation(継承先に必要な実装)
+    # -----------------------------------------------------
+    @property
+    @abstractmethod
+    def action_space(self) -> SpaceBase:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def observation_space(self) -> SpaceBase:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def observation_type(self) -> EnvObservationType:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def max_episode_steps(self) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def call_reset(self, indices: np.ndarray) -> None:
+        """indices の env を初期状態にする"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def call_step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """全ての env を1step進める、(rewards, dones) を返す"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def call_observation(self) -> np.ndarray:
+        """全ての env の observation を返す"""
+        raise NotImplementedError()
+
+    # -----------------------------------------------------
+    #  inherit implementation(継承元の実装)
+    # -----------------------------------------------------
+    def set_seed(self, seed: Optional[int] = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def set_max_episode_steps(self, max_episode_steps: int) -> None:
+        """0以下の場合は env の max_episode_steps を使います"""
+        if max_episode_steps <= 0:
+            max_episode_steps = self.max_episode_steps
+        self._max_episode_steps = max_episode_steps
+
+    def reset(self) -> np.ndarray:
+        self.call_reset(np.arange(self.batch_size))
+        self.step_nums[:] = 0
+        self.episode_rewards[:] = 0
+        return self.call_observation()
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Info]:
+        """step
+
+        Returns:(
+            next_states,  終了した env は reset 後の状態
+            rewards,
+            dones,
+            info,
+                "final_states": reset 前の状態
+                "truncated": max_episode_steps で終了したか
+                "episode_rewards": 終了した env のエピソードの合計報酬(終了していない env は0)
+        )
+        """
+        actions = np.asarray(actions)
+        assert actions.shape[0] == self.batch_size
+        rewards, dones = self.call_step(actions)
+        rewards = rewards.astype(np.float32, copy=False)
+
+        self.step_nums += 1
+        self.episode_rewards += rewards
+        truncated = ~dones & (self.step_nums > self._max_episode_steps)  # EnvRun と同じ判定
+        dones = dones | truncated
+
+        final_states = self.call_observation()
+        episode_rewards = np.where(dones, self.episode_rewards, 0)
+
+        # 終了した env は reset する
+        indices = np.flatnonzero(dones)
+        if indices.size > 0:
+            self.call_reset(indices)
+            self.step_nums[indices] = 0
+            self.episode_rewards[indices] = 0
+            states = self.call_observation()
+        else:
+            states = final_states
+
+        info = {
+            "final_states": final_states,
+            "truncated": truncated,
+            "episode_rewards": episode_rewards,
+        }
+        return states, rewards, dones, info
+
+    def sample(self) -> np.ndarray:
+        """ランダムな action を返す(DiscreteSpace のみ)"""
+        return self.rng.integers(0, self.action_space.n, size=self.batch_size)  # type: ignore
@@ -5,8 +5,9 @@ import os
 import pickle
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from srl.base.rl import checkpoint
 from srl.base.rl.config import RLConfig
 
 logger = logging.getLogger(__name__)
@@ -69,6 +70,11 @@ class RLRemoteMemory(ABC):
     def call_backup(self, **kwargs) -> Any:
         raise NotImplementedError()
 
+    def add_many(self, batchs: List[tuple]) -> None:
+        """add の引数をまとめて追加します(分散学習時のIPC回数削減用)"""
+        for args in batchs:
+            self.add(*args)  # type: ignore
+
     def restore(self, dat: Any, **kwargs) -> None:
         if isinstance(dat, tuple):
             dat = lzma.decompress(dat[0])
@@ -83,8 +89,21 @@ class RLRemoteMemory(ABC):
             dat = (dat, True)
         return dat
 
-    def save(self, path: str, compress: bool = True, **kwargs) -> None:
+    def save(self, path: str, compress: bool = True, chunked: bool = False, **kwargs) -> None:
+        """memory を保存します
+
+        chunked=True もしくは path が既存のディレクトリの場合は、ディレクトリに分割して保存します。
+        (列毎/範囲毎に並列で圧縮し、前回の保存から変わっていない部分は書き込みません)
+        """
         logger.debug(f"memory save (size: {self.length()}): {path}")
+        if chunked or os.path.isdir(path):
+            t0 = time.time()
+            num, write_num = checkpoint.save_chunks(self.call_backup(**kwargs), path)
+            logger.info(
+                f"memory saved (size: {self.length()}, chunks: {write_num}/{num}, "
+                f"time: {time.time() - t0:.1f}s): {path}"
+            )
+            return
         try:
             t0 = time.time()
             dat = self.call_backup(**kwargs)
@@ -104,6 +123,10 @@ class RLRemoteMemory(ABC):
     def load(self, path: str, **kwargs) -> None:
         logger.debug(f"memory load: {path}")
         t0 = time.time()
+        if checkpoint.is_chunk_dir(path):
+            self.call_restore(checkpoint.load_chunks(path), **kwargs)
+            logger.info(f"memory loaded (size: {self.length()}, time: {time.time() - t0:.1f}s): {path}")
+            return
         # LZMA
         with open(path, "rb") as f:
             compress = binascii.hexlify(f.read(6)) == b"fd377a585a00"
@@ -0,0 +1,179 @@
+"""
+memory の backup をディレクトリに分割して保存します
+
+path/
+    manifest.pickle : ndarray や長いlistを参照(_ChunkRef)に置き換えた backup と、各chunkのファイル名
+    {hash}.zlib     : 1chunk(ndarray の行範囲 or listの範囲)を zlib で圧縮したもの
+
+chunkのファイル名は中身のhashなので、前回の保存から変わっていないchunkは書き込みません。
+hash/圧縮/展開(hashlib/zlib)はGILを解放するのでスレッドで並列に実行します。
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.pickle"
+_CHUNK_EXT = ".zlib"
+
+
+class _ChunkRef:
+    def __init__(self, kind: str, chunks: List[str], dtype: Any = None, shape: Optional[Tuple[int, ...]] = None):
+        self.kind = kind  # "array" or "list"
+        self.chunks = chunks
+        self.dtype = dtype
+        self.shape = shape
+
+
+def _split(
+    data: Any,
+    jobs: List[Tuple[Any, str]],
+    chunk_bytes: int,
+    list_chunk_size: int,
+) -> Any:
+    if isinstance(data, np.ndarray) and data.dtype != object and data.ndim > 0:
+        row_bytes = max(1, data.nbytes // max(1, len(data)))
+        rows = max(1, chunk_bytes // row_bytes)
+        ref = _ChunkRef("array", [], data.dtype, data.shape)
+        for i in range(0, max(1, len(data)), rows):
+            jobs.append((np.ascontiguousarray(data[i : i + rows]), "array"))
+            ref.chunks.append(len(jobs) - 1)
+        return ref
+    if isinstance(data, list) and len(data) > list_chunk_size:
+        ref = _ChunkRef("list", [])
+        for i in range(0, len(data), list_chunk_size):
+            jobs.append((data[i : i + list_chunk_size], "list"))
+            ref.chunks.append(len(jobs) - 1)
+        return ref
+    if isinstance(data, list):
+        return [_split(d, jobs, chunk_bytes, list_chunk_size) for d in data]
+    if isinstance(data, tuple):
+        return tuple([_split(d, jobs, chunk_bytes, list_chunk_size) for d in data])
+    if isinstance(data, dict):
+        return {k: _split(v, jobs, chunk_bytes, list_chunk_size) for k, v in data.items()}
+    return data
+
+
+def _merge(data: Any, chunks: Dict[str, Any]) -> Any:
+    if isinstance(data, _ChunkRef):
+        if data.kind == "array":
+            arr = np.empty(data.shape, dtype=data.dtype)
+            row_nbytes = arr[:1].nbytes
+            if row_nbytes == 0:
+                return arr
+            i = 0
+            for name in data.chunks:
+                b = chunks[name]
+                n = len(b) // row_nbytes
+                arr[i : i + n] = np.frombuffer(b, dtype=data.dtype).reshape((n,) + arr.shape[1:])
+                i += n
+            return arr
+        lst = []
+        for name in data.chunks:
+            lst.extend(pickle.loads(chunks[name]))
+        return lst
+    if isinstance(data, list):
+        return [_merge(d, chunks) for d in data]
+    if isinstance(data, tuple):
+        return tuple([_merge(d, chunks) for d in data])
+    if isinstance(data, dict):
+        return {k: _merge(v, chunks) for k, v in data.items()}
+    return data
+
+
+def _write_chunk(path: str, data: Any, kind: str, level: int) -> Tuple[str, bool]:
+    if kind == "array":
+        b = memoryview(data.reshape(-1).view(np.uint8))
+    else:
+        b = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    name = hashlib.blake2b(b, digest_size=16).hexdigest() + _CHUNK_EXT
+    chunk_path = os.path.join(path, name)
+    if os.path.isfile(chunk_path):
+        return name, False
+    tmp_path = f"{chunk_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(zlib.compress(b, level))
+    os.replace(tmp_path, chunk_path)
+    return name, True
+
+
+def _read_chunk(path: str, name: str) -> bytes:
+    with open(os.path.join(path, name), "rb") as f:
+        return zlib.decompress(f.read())
+
+
+def is_chunk_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def save_chunks(
+    data: Any,
+    path: str,
+    chunk_bytes: int = 16 * 1024 * 1024,
+    list_chunk_size: int = 10_000,
+    compress_level: int = 1,
+    max_workers: Optional[int] = None,
+) -> Tuple[int, int]:
+    """backup を path(ディレクトリ) に分割保存します
+
+    Returns:
+        Tuple[int, int]: (chunk数, 実際に書き込んだchunk数)
+    """
+    os.makedirs(path, exist_ok=True)
+
+    jobs = []
+    skeleton = _split(data, jobs, chunk_bytes, list_chunk_size)
+    with ThreadPoolExecutor(max_workers) as executor:
+        results = list(executor.map(lambda j: _write_chunk(path, j[0], j[1], compress_level), jobs))
+    names = [r[0] for r in results]
+
+    def _set_names(d):
+        if isinstance(d, _ChunkRef):
+            d.chunks = [names[i] for i in d.chunks]
+        elif isinstance(d, (list, tuple)):
+            [_set_names(v) for v in d]
+        elif isinstance(d, dict):
+            [_set_names(v) for v in d.values()]
+
+    _set_names(skeleton)
+
+    # manifestを書き換えた後、使われなくなったchunkを削除
+    tmp_path = os.path.join(path, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"version": 1, "data": skeleton}, f)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+    used = set(names)
+    for name in os.listdir(path):
+        if name.endswith(_CHUNK_EXT) and name not in used:
+            os.remove(os.path.join(path, name))
+
+    return len(names), sum([r[1] for r in results])
+
+
+def load_chunks(path: str, max_workers: Optional[int] = None) -> Any:
+    with open(os.path.join(path, MANIFEST_NAME), "rb") as f:
+        manifest = pickle.load(f)
+
+    names = []
+
+    def _get_names(d):
+        if isinstance(d, _ChunkRef):
+            names.extend(d.chunks)
+        elif isinstance(d, (list, tuple)):
+            [_get_names(v) for v in d]
+        elif isinstance(d, dict):
+            [_get_names(v) for v in d.values()]
+
+    _get_names(manifest["data"])
+    names = list(set(names))
+    with ThreadPoolExecutor(max_workers) as executor:
+        chunks = dict(zip(names, executor.map(lambda n: _read_chunk(path, n), names)))
+    return _merge(manifest["data"], chunks)
@@ -5,6 +5,9 @@ import numpy as np
 
 
 class Memory(ABC):
+    # sample で取り出した batch を memory から削除するか(update で戻す)
+    is_sample_removal = False
+
     @staticmethod
     @abstractmethod
     def getName() -> str:
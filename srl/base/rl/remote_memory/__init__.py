@@ -1,3 +1,4 @@
+from .columnar_replay_buffer import ColumnarReplayBuffer  # noqa F401
 from .experience_replay_buffer import ExperienceReplayBuffer  # noqa F401
 from .priority_experience_replay import PriorityExperienceReplay  # noqa F401
 from .sequence_memory import SequenceRemoteMemory  # noqa F401
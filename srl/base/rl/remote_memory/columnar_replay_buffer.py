@@ -0,0 +1,376 @@
+import logging
+import os
+import random
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from srl.base.rl.base import RLRemoteMemory
+
+logger = logging.getLogger(__name__)
+
+
+def create_column_arrays(
+    capacity: int,
+    columns: Dict[str, Tuple[Tuple[int, ...], Any]],
+    memmap_dir: str = "",
+    readonly: bool = False,
+) -> Tuple[Dict[str, np.ndarray], bool]:
+    """columns: {key: (shape, dtype)} の配列 (capacity, *shape) を作成します
+
+    memmap_dir を指定した場合は memmap_dir/{key}.npy の np.memmap になり、
+    同じ shape/dtype のファイルが既にあればその内容をそのまま使います。
+    readonly の場合は既存のファイルを読み込み専用で開きます(無い/shapeが違う場合は例外)。
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], bool]: 配列, 全て既存のファイルから開いたか
+    """
+    if memmap_dir != "" and not readonly:
+        os.makedirs(memmap_dir, exist_ok=True)
+
+    arrays = {}
+    reopened = memmap_dir != ""
+    for k, (shape, dtype) in columns.items():
+        shape = (capacity,) + tuple(shape)
+        if memmap_dir == "":
+            arrays[k] = np.zeros(shape, dtype=dtype)
+            continue
+
+        path = os.path.join(memmap_dir, f"{k}.npy")
+        if readonly:
+            arr = open_memmap(path, mode="r")
+            if arr.shape != shape or arr.dtype != np.dtype(dtype):
+                raise ValueError(f"memmap layout mismatch: {path} {arr.shape}{arr.dtype} != {shape}{np.dtype(dtype)}")
+            arrays[k] = arr
+            continue
+
+        arr = None
+        if os.path.isfile(path):
+            arr = open_memmap(path, mode="r+")
+            if arr.shape != shape or arr.dtype != np.dtype(dtype):
+                logger.info(f"memmap layout changed, recreate: {path}")
+                del arr
+                arr = None
+        if arr is None:
+            arr = open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+            reopened = False
+        arrays[k] = arr
+    return arrays, reopened
+
+
+def _backup_arrays(
+    memory: Dict[str, np.ndarray],
+    idx: int,
+    size: int,
+    frames: Optional[np.ndarray],
+    frame_count: int,
+    frame_streams: dict,
+) -> list:
+    # 配列上の並びのままコピーする(変わっていない部分は分割保存で書き込まれないように)
+    capacity = len(next(iter(memory.values())))
+    n = idx if idx >= size else capacity  # 使っている範囲
+    data = [
+        {k: v[:n].copy() for k, v in memory.items()},
+        size,
+        idx,
+        None,
+        frame_count,
+        frame_streams,
+    ]
+    if frames is not None:
+        data[3] = frames[: min(frame_count, len(frames))].copy()
+    return data
+
+
+class ColumnarReplayBuffer(RLRemoteMemory):
+    """列(key)毎に確保済みのnumpy配列へ保存するExperienceReplayBuffer
+
+    batch(dict)の各値は init で指定した shape/dtype の配列に書き込まれます。
+    sample は dict[key, np.ndarray(batch_size, ...)] を返すので、そのまま学習に使えます。
+
+    frame_shape を指定すると frame store モードになり、state/next_state を1フレームずつ
+    リングバッファに1回だけ保存します。遷移はフレームの通し番号だけを持ち、sample時にstackを復元します。
+    この場合 batch は state/next_state の代わりに以下を持ちます。
+
+        frame_stream : エピソードを区別するkey(workerごとに一意)
+        first_frame  : エピソードの最初の遷移のみ、stateの最新フレーム(それ以外は None)
+        next_frame   : next_stateの最新フレーム
+
+    memmap_dir を指定すると各列をディスク上の np.memmap に置きます(RAMを超える capacity 用)。
+    位置情報も memmap_dir に随時書き込むので、同じ memmap_dir で init すればすぐに再開できます。
+    この場合 backup は中身を含まず、memmap_dir の位置情報のみになります。
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.init(1_000, {})
+
+    def init(
+        self,
+        capacity: int,
+        columns: Dict[str, Tuple[Tuple[int, ...], Any]],
+        frame_shape: Optional[Tuple[int, ...]] = None,
+        window_length: int = 1,
+        frame_dtype: Any = np.float32,
+        dummy_frame_val: float = 0.0,
+        frame_capacity: int = 0,
+        memmap_dir: str = "",
+    ):
+        """columns: {key: (shape, dtype)}"""
+        self.capacity = capacity
+        self.columns = columns
+        self.memmap_dir = memmap_dir
+        self.idx = 0
+        self.size = 0
+
+        # --- frame store
+        self.frame_shape = frame_shape
+        self.window_length = window_length
+        self.frames = None
+        self.frame_capacity = 0
+        self.frame_count = 0  # 書き込んだフレームの通し番号
+        self.frame_streams = {}  # frame_stream -> 直近のstateのフレーム番号
+        _columns = dict(columns)
+        if frame_shape is not None:
+            if frame_capacity <= 0:
+                # 1遷移で1フレーム + エピソード開始時の分の余裕
+                frame_capacity = capacity + capacity // 20 + window_length + 1
+            assert frame_capacity > window_length * 2
+            self.frame_capacity = frame_capacity
+            self.dummy_frame = np.full(frame_shape, dummy_frame_val, dtype=frame_dtype)
+            # 各遷移のフレーム番号、[:window_length]がstate、[1:]がnext_state(-1はdummy)
+            _columns["_frame_serials"] = ((window_length + 1,), np.int64)
+            # 各遷移を削除するフレーム番号(これより前のフレームが上書きされたら削除)
+            # 参照するフレームの最小番号だが、古い順に削除できるように後の遷移の値以下にしている
+            _columns["_evict_serial"] = ((), np.int64)
+
+        self.memory, reopened = create_column_arrays(capacity, _columns, memmap_dir)
+        if frame_shape is not None:
+            frames, _reopened = create_column_arrays(
+                frame_capacity,
+                {"_frames": (frame_shape, frame_dtype)},
+                memmap_dir,
+            )
+            self.frames = frames["_frames"]
+            reopened = reopened and _reopened
+
+        # --- memmap の位置情報 [idx, size, frame_count]
+        self._meta = None
+        if memmap_dir != "":
+            meta, _reopened = create_column_arrays(3, {"_meta": ((), np.int64)}, memmap_dir)
+            self._meta = meta["_meta"]
+            if reopened and _reopened:
+                self.idx, self.size, self.frame_count = [int(n) for n in self._meta]
+                logger.info(f"memmap reopened (size: {self.size}): {memmap_dir}")
+            else:
+                self._save_meta()
+
+    def length(self) -> int:
+        return self.size
+
+    def _save_meta(self) -> None:
+        if self._meta is not None:
+            self._meta[:] = (self.idx, self.size, self.frame_count)
+
+    def flush(self) -> None:
+        if self._meta is not None:
+            for v in self.memory.values():
+                v.flush()
+            if self.frames is not None:
+                self.frames.flush()
+            self._meta.flush()
+
+    def call_restore(self, data: Any, **kwargs) -> None:
+        if isinstance(data, dict):
+            data = self._restore_memmap(data)
+            if data is None:
+                return
+
+        memory, size, idx, frames, frame_count, frame_streams = data
+
+        # 古い順に並べて、capacityを超える場合は新しい方を残す
+        self.idx = 0
+        self.size = 0
+        if size > 0:
+            n = len(next(iter(memory.values())))
+            indices = (np.arange(size) + (idx - size)) % n
+            indices = indices[-self.capacity :]
+            size = len(indices)
+            for k in self.memory.keys():
+                self.memory[k][:size] = memory[k][indices]
+        self.size = size
+        self.idx = size % self.capacity
+
+        if self.frames is not None:
+            # フレームの位置は 通し番号 % 保存元のフレーム数
+            n = min(frame_count, self.frame_capacity, len(frames))
+            serials = np.arange(frame_count - n, frame_count)
+            if n > 0:
+                self.frames[serials % self.frame_capacity] = frames[serials % len(frames)]
+            self.frame_count = frame_count
+            self.frame_streams = dict(frame_streams)
+            self._evict_old_frames(frame_count - n)
+        self._save_meta()
+
+    def _restore_memmap(self, data: dict) -> Optional[list]:
+        if (
+            os.path.realpath(data["memmap_dir"]) == os.path.realpath(self.memmap_dir)
+            and data["capacity"] == self.capacity
+            and data["frame_capacity"] == self.frame_capacity
+        ):
+            # 同じファイルなので位置情報のみ戻す
+            self.idx = data["idx"]
+            self.size = data["size"]
+            self.frame_count = data["frame_count"]
+            self.frame_streams = dict(data["frame_streams"])
+            self._save_meta()
+            return None
+
+        # 別のファイルからコピー
+        columns = {k: (v.shape[1:], v.dtype) for k, v in self.memory.items()}
+        memory, _ = create_column_arrays(data["capacity"], columns, data["memmap_dir"], readonly=True)
+        frames = None
+        if self.frames is not None:
+            frames, _ = create_column_arrays(
+                data["frame_capacity"],
+                {"_frames": (self.frames.shape[1:], self.frames.dtype)},
+                data["memmap_dir"],
+                readonly=True,
+            )
+            frames = frames["_frames"]
+        return _backup_arrays(
+            memory,
+            data["idx"],
+            data["size"],
+            frames,
+            data["frame_count"],
+            data["frame_streams"],
+        )
+
+    def call_backup(self, **kwargs):
+        if self._meta is not None:
+            self.flush()
+            return {
+                "memmap_dir": self.memmap_dir,
+                "capacity": self.capacity,
+                "frame_capacity": self.frame_capacity,
+                "idx": self.idx,
+                "size": self.size,
+                "frame_count": self.frame_count,
+                "frame_streams": self.frame_streams,
+            }
+        return _backup_arrays(
+            self.memory,
+            self.idx,
+            self.size,
+            self.frames,
+            self.frame_count,
+            self.frame_streams,
+        )
+
+    # ---------------------------
+    def add(self, batch: Dict[str, Any]):
+        if self.frames is not None:
+            if not self._add_frames(batch):
+                return
+        for k in self.columns.keys():
+            self.memory[k][self.idx] = batch[k]
+        self.idx += 1
+        if self.idx >= self.capacity:
+            self.idx = 0
+        if self.size < self.capacity:
+            self.size += 1
+        self._save_meta()
+
+    def sample(self, batch_size: int) -> Dict[str, np.ndarray]:
+        if self.size < batch_size:
+            logger.warning(f"memory size: {self.size} < batch size: {batch_size}")
+            batch_size = self.size
+        tail = (self.idx - self.size) % self.capacity
+        indices = np.array(random.sample(range(self.size), batch_size), dtype=np.int64)
+        indices = (indices + tail) % self.capacity
+        batchs = {k: v[indices] for k, v in self.memory.items()}
+        if self.frames is not None:
+            self._restore_states(batchs)
+        return batchs
+
+    def clear(self) -> None:
+        self.idx = 0
+        self.size = 0
+        self.frame_count = 0
+        self.frame_streams = {}
+        self._save_meta()
+
+    # ---------------------------
+    # frame store
+    # ---------------------------
+    def _write_frame(self, frame) -> int:
+        serial = self.frame_count
+        # 上書きされるフレームを参照している古い遷移は先に削除
+        self._evict_old_frames(serial - self.frame_capacity + 1)
+        self.frames[serial % self.frame_capacity] = frame
+        self.frame_count += 1
+        return serial
+
+    def _evict_old_frames(self, min_serial: int) -> None:
+        # min_serial より前のフレームを使っている遷移を古い順に削除
+        # (_evict_serial は古い順に単調増加なので末尾だけ見ればいい)
+        if min_serial <= 0:
+            return
+        evict_serials = self.memory["_evict_serial"]
+        while self.size > 0:
+            tail = (self.idx - self.size) % self.capacity
+            if evict_serials[tail] >= min_serial:
+                break
+            self.size -= 1
+
+        # 上書きされたフレームを参照している stream は続きを復元できないので削除
+        for key in [k for k, v in self.frame_streams.items() if min(x for x in v if x >= 0) < min_serial]:
+            del self.frame_streams[key]
+
+    def _add_frames(self, batch: Dict[str, Any]) -> bool:
+        key = batch["frame_stream"]
+        if batch["first_frame"] is not None:
+            state_serials = [-1] * (self.window_length - 1) + [self._write_frame(batch["first_frame"])]
+        elif key in self.frame_streams:
+            state_serials = self.frame_streams[key]
+        else:
+            # エピソードの途中から(restore後など)は復元できないので捨てる
+            logger.debug(f"unknown frame stream: {key}")
+            return False
+        serials = state_serials + [self._write_frame(batch["next_frame"])]
+        min_serial = min(x for x in serials if x >= 0)
+
+        if batch["done"] or min_serial < self.frame_count - self.frame_capacity:
+            self.frame_streams.pop(key, None)
+        else:
+            self.frame_streams[key] = serials[1:]
+        if min_serial < self.frame_count - self.frame_capacity:
+            # next_frame の書き込みで state のフレームが上書きされた
+            logger.debug(f"frame overwritten: {key}")
+            return False
+
+        self.memory["_frame_serials"][self.idx] = serials
+
+        # 後から追加した遷移より先に削除されないように、前の遷移の削除番号を下げる
+        evict_serials = self.memory["_evict_serial"]
+        evict_serials[self.idx] = min_serial
+        j = self.idx
+        for _ in range(min(self.size, self.capacity - 1)):
+            j = (j - 1) % self.capacity
+            if evict_serials[j] <= min_serial:
+                break
+            evict_serials[j] = min_serial
+        return True
+
+    def _restore_states(self, batchs: Dict[str, np.ndarray]) -> None:
+        serials = batchs.pop("_frame_serials")
+        batchs.pop("_evict_serial")
+        frames = self.frames[serials % self.frame_capacity]
+        frames[serials < 0] = self.dummy_frame
+        if self.window_length == 1:
+            batchs["state"] = frames[:, 0]
+            batchs["next_state"] = frames[:, 1]
+        else:
+            batchs["state"] = frames[:, :-1]
+            batchs["next_state"] = frames[:, 1:]
@@ -1,7 +1,9 @@
-from typing import Any, List, Optional, Tuple
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from srl.base.rl.base import RLRemoteMemory
+from srl.base.rl.remote_memory.columnar_replay_buffer import create_column_arrays
 from srl.rl.memories.proportional_memory import ProportionalMemory
 from srl.rl.memories.rankbase_memory import RankBaseMemory
 from srl.rl.memories.rankbase_memory_linear import RankBaseMemoryLinear
@@ -12,7 +14,20 @@ class PriorityExperienceReplay(RLRemoteMemory):
     def __init__(self, *args):
         super().__init__(*args)
 
-    def init(self, name: str, capacity: int, alpha: float, beta_initial: float, beta_steps: int):
+    def init(
+        self,
+        name: str,
+        capacity: int,
+        alpha: float,
+        beta_initial: float,
+        beta_steps: int,
+        columns: Optional[Dict[str, Tuple[Tuple[int, ...], Any]]] = None,
+        memmap_dir: str = "",
+    ):
+        """columns を指定すると batch(dict) を列毎の配列(memmap_dir指定時はnp.memmap)に保存し、
+        memory には配列上の位置とpriorityのみを持たせます。
+        この場合 sample の batchs は dict[key, np.ndarray(batch_size, ...)] になります。
+        """
 
         memories = [
             ReplayMemory,
@@ -29,22 +44,78 @@ class PriorityExperienceReplay(RLRemoteMemory):
                 self.memory = m(capacity, alpha, beta_initial, beta_steps)
                 break
 
+        # --- column storage
+        # 配列上の位置は memory の書き込み位置と同じにする(古い順に上書きされるmemoryのみ対応)
+        self.capacity = capacity
+        self.memmap_dir = memmap_dir
+        self.storage = None
+        if columns is not None:
+            if name not in [ReplayMemory.getName(), ProportionalMemory.getName()]:
+                raise ValueError(f"column storage is not supported by {name}.")
+            self.storage, _ = create_column_arrays(capacity, columns, memmap_dir)
+
     def length(self) -> int:
         return len(self.memory)
 
     def call_restore(self, data: Any, **kwargs) -> None:
-        self.memory.restore(data)
+        if self.storage is None:
+            self.memory.restore(data)
+            return
+
+        self.memory.restore(data[0])
+        storage = data[1]
+        if isinstance(storage, str):
+            if os.path.realpath(storage) == os.path.realpath(self.memmap_dir):
+                return  # 同じファイル
+            columns = {k: (v.shape[1:], v.dtype) for k, v in self.storage.items()}
+            storage, _ = create_column_arrays(self.capacity, columns, storage, readonly=True)
+        for k, v in self.storage.items():
+            assert len(storage[k]) == self.capacity, "capacity must be the same."
+            v[:] = storage[k]
 
     def call_backup(self, **kwargs):
-        return self.memory.backup()
+        if self.storage is None:
+            return self.memory.backup()
+
+        if self.memmap_dir != "":
+            for v in self.storage.values():
+                v.flush()
+            storage = self.memmap_dir
+        else:
+            storage = self.storage
+        return [self.memory.backup(), storage]
 
     # ---------------------------
 
+    def _get_write_index(self) -> int:
+        if isinstance(self.memory, ProportionalMemory):
+            return self.memory.tree.write
+        return self.memory.idx
+
     def add(self, batch: Any, td_error: Optional[float] = None):
+        if self.storage is not None:
+            idx = self._get_write_index()
+            for k, v in self.storage.items():
+                v[idx] = batch[k]
+            batch = idx
         self.memory.add(batch, td_error)
 
-    def sample(self, step: int, batch_size: int) -> Tuple[list, list, list]:
-        return self.memory.sample(batch_size, step)
+    def sample(self, step: int, batch_size: int) -> Tuple[list, Any, list]:
+        indices, batchs, weights = self.memory.sample(batch_size, step)
+        if self.storage is not None:
+            idx = np.asarray(batchs, dtype=np.int64)
+            batchs = {k: v[idx] for k, v in self.storage.items()}
+        return indices, batchs, weights
 
     def update(self, indices: List[int], batchs: List[Any], td_errors: np.ndarray) -> None:
         self.memory.update(indices, batchs, td_errors)
+
+    def return_unused_sample(self, indices: List[int], batchs: Any) -> None:
+        """sample したが学習に使わなかった batch を戻します
+
+        sample で memory から取り出す場合(RankBase系)のみ、新しく追加した batch と同じ priority(最大値)で戻します。
+        """
+        if not self.memory.is_sample_removal:
+            return
+        for batch in batchs:
+            self.memory.add(batch)
@@ -94,6 +94,7 @@ class RLWorker(WorkerBase):
         self.__dummy_state = np.full(self.config._one_observation_shape, self.config.dummy_state_val)
         self.__env = None
         self.__recent_states = [self.__dummy_state for _ in range(self.config.window_length)]
+        self.batch_prediction = None
 
     # ------------------------------
     # encode/decode
@@ -160,6 +161,23 @@ class RLWorker(WorkerBase):
     ) -> Info:
         raise NotImplementedError()
 
+    # ------------------------------
+    # implement(option)
+    # ------------------------------
+    def call_policy_batch(self, workers: List["RLWorker"], states: np.ndarray) -> Optional[list]:
+        """vector play用に同じ種類の複数workerの推論をまとめて行います
+
+        Args:
+            workers (List[RLWorker]): 推論対象のworker(selfを含む)
+                                      推論サーバから呼ばれる場合は空なので、worker毎の状態が必要な場合は None を返してください
+            states (np.ndarray): 各workerのpolicyの状態をまとめたもの (len(states), ...)
+
+        Returns:
+            Optional[list]: workers 順の推論結果、結果は各workerの batch_prediction に設定されます。
+                            未対応の場合は None
+        """
+        return None
+
     # ------------------------------------
     # episode
     # ------------------------------------
@@ -183,16 +201,19 @@ class RLWorker(WorkerBase):
         return self._call_on_reset(state, env, worker)
 
     def policy(self, env: EnvRun, worker: "WorkerRun") -> Tuple[EnvAction, Info]:
-        # stacked state
-        if self.config.window_length > 1:
-            state = np.asarray(self.__recent_states)
-        else:
-            state = self.__recent_states[-1]
-
+        state = self.get_policy_state()
         action, info = self._call_policy(state, env, worker)
+        self.batch_prediction = None
         action = self.action_decode(action)
         return action, info
 
+    def get_policy_state(self) -> RLObservation:
+        # stacked state
+        if self.config.window_length > 1:
+            return np.asarray(self.__recent_states)
+        else:
+            return self.__recent_states[-1]
+
     def on_step(self, env: EnvRun, worker: "WorkerRun") -> Info:
         next_state = self.state_encode(env.state, env)
         reward = self.reward_encode(worker.reward, env)
@@ -438,8 +459,14 @@ class WorkerRun:
         self._render.cache_reset()
 
     def policy(self, env: EnvRun) -> Optional[EnvAction]:
-        if self.player_index != env.next_player_index:
+        if not self.prepare_policy(env):
             return None
+        return self.policy_prepared(env)
+
+    def prepare_policy(self, env: EnvRun) -> bool:
+        """policy の前処理(on_reset/on_step)のみ実行します。自分の番でない場合は False"""
+        if self.player_index != env.next_player_index:
+            return False
         logger.debug("worker.policy()")
 
         # 初期化していないなら初期化する
@@ -450,7 +477,9 @@ class WorkerRun:
             # 2週目以降はpolicyの実行前にstepを実行
             self._info = self.worker.on_step(env, self)
             self._step_reward = 0
+        return True
 
+    def policy_prepared(self, env: EnvRun) -> EnvAction:
         # worker policy
         env_action, info = self.worker.policy(env, self)
         self._info.update(info)
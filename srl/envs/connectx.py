@@ -25,13 +25,47 @@ registration.register(
 )
 
 
+def _is_connect4(b: int, shifts: List[int]) -> bool:
+    """bitboard 上で4つ並んでいるか(縦、横、斜め2方向をシフト演算で判定)"""
+    for s in shifts:
+        m = b & (b >> s)
+        if m & (m >> (2 * s)):
+            return True
+    return False
+
+
 class ConnectX(TurnBase2Player):
+    """
+    bitboard は列毎に (rows + 1) bit を使い、下の段から順に並べています(一番上の1bitは番兵)
+    bit index = column * (rows + 1) + (rows - 1 - row)
+    """
+
     def __init__(self):
         super().__init__()
 
         self.columns = 7
         self.rows = 6
         self._player_index = 0
+        self._init_masks()
+
+    def _init_masks(self):
+        H1 = self.rows + 1
+        self._bottom_masks = [1 << (c * H1) for c in range(self.columns)]
+        self._top_masks = [1 << (c * H1 + self.rows - 1) for c in range(self.columns)]
+        self._column_masks = [((1 << self.rows) - 1) << (c * H1) for c in range(self.columns)]
+        self._full_mask = sum(self._column_masks)
+        # 縦、横、斜め(左下右上)、斜め(左上右下)
+        self._shifts = [1, H1, H1 + 1, H1 - 1]
+
+    def _update_bitboards(self):
+        """self.board から bitboard を作り直す"""
+        self.boards = [0, 0]
+        for i, mark in enumerate(self.board):
+            if mark == 0:
+                continue
+            c = i % self.columns
+            r = i // self.columns
+            self.boards[mark - 1] |= 1 << (c * (self.rows + 1) + self.rows - 1 - r)
 
     @property
     def action_space(self) -> DiscreteSpace:
@@ -55,60 +89,45 @@ class ConnectX(TurnBase2Player):
 
     def call_reset(self) -> Tuple[List[int], dict]:
         self.board = [0] * self.columns * self.rows
+        self.boards = [0, 0]
         self._player_index = 0
-        return self.board, {}
+        return self.board[:], {}
 
     def call_step(self, action: int) -> Tuple[List[int], float, float, bool, dict]:
         column = action
+        me = self._player_index
 
         # Mark the position.
-        row = max([r for r in range(self.rows) if self.board[column + (r * self.columns)] == 0])
-        self.board[column + (row * self.columns)] = self.player_index + 1
+        mask = self.boards[0] | self.boards[1]
+        move = (mask + self._bottom_masks[column]) & self._column_masks[column]
+        assert move != 0, f"column {column} is full."
+        self.boards[me] |= move
+        row = self.rows - 1 - (move.bit_length() - 1 - column * (self.rows + 1))
+        self.board[column + (row * self.columns)] = me + 1
 
         # Check for a win.
-        if self._is_win(column, row):
-            if self.player_index == 0:
+        if _is_connect4(self.boards[me], self._shifts):
+            if me == 0:
                 reward1 = 1
                 reward2 = -1
             else:
                 reward1 = -1
                 reward2 = 1
 
-            return self.board, reward1, reward2, True, {}
+            return self.board[:], reward1, reward2, True, {}
 
         # Check for a tie.
-        if all(mark != 0 for mark in self.board):
-            return self.board, 0, 0, True, {}
+        if (mask | move) == self._full_mask:
+            return self.board[:], 0, 0, True, {}
 
         # change player
-        if self._player_index == 0:
-            self._player_index = 1
-        else:
-            self._player_index = 0
-
-        return self.board, 0, 0, False, {}
-
-    def _is_win(self, column, row):
-        inarow = 4 - 1
-        mark = self.player_index + 1
-
-        def count(offset_row, offset_column):
-            for i in range(1, inarow + 1):
-                r = row + offset_row * i
-                c = column + offset_column * i
-                if r < 0 or r >= self.rows or c < 0 or c >= self.columns or self.board[c + (r * self.columns)] != mark:
-                    return i - 1
-            return inarow
-
-        return (
-            count(1, 0) >= inarow  # vertical.
-            or (count(0, 1) + count(0, -1)) >= inarow  # horizontal.
-            or (count(-1, -1) + count(1, 1)) >= inarow  # top left diagonal.
-            or (count(-1, 1) + count(1, -1)) >= inarow  # top right diagonal.
-        )
+        self._player_index = 1 - me
+
+        return self.board[:], 0, 0, False, {}
 
     def get_invalid_actions(self, player_index: int = 0) -> List[int]:
-        invalid_actions = [a for a in range(self.action_space.n) if self.board[a] != 0]
+        mask = self.boards[0] | self.boards[1]
+        invalid_actions = [a for a in range(self.action_space.n) if mask & self._top_masks[a]]
         return invalid_actions
 
     def render_terminal(self, **kwargs) -> None:
@@ -130,11 +149,21 @@ class ConnectX(TurnBase2Player):
         return [
             self.board[:],
             self._player_index,
+            self.boards[:],
         ]
 
     def restore(self, data: Any) -> None:
         self.board = data[0][:]
         self._player_index = data[1]
+        self.boards = data[2][:]
+
+    def snapshot(self) -> Any:
+        return tuple(self.board), self._player_index, self.boards[0], self.boards[1]
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.board = list(data[0])
+        self._player_index = data[1]
+        self.boards = [data[2], data[3]]
 
     def make_worker(self, name: str) -> Optional[RuleBaseWorker]:
         if name == "alphabeta6":
@@ -172,122 +201,200 @@ class ConnectX(TurnBase2Player):
     def call_direct_reset(self, observation, configuration) -> Tuple[np.ndarray, dict]:
         self._player_index = observation.mark - 1
         self.board = observation.board[:]
-        return self.board, {}
+        self._update_bitboards()
+        return self.board[:], {}
 
     def call_direct_step(self, observation, configuration) -> Tuple[np.ndarray, float, float, bool, dict]:
         self._player_index = observation.mark - 1
         self.board = observation.board[:]
-        return self.board, 0, 0, False, {}
+        self._update_bitboards()
+        return self.board[:], 0, 0, False, {}
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+_TT_EXACT = 0
+_TT_LOWER = 1  # 実際の値はこれ以上(beta cut)
+_TT_UPPER = 2  # 実際の値はこれ以下(alpha 以下)
 
 
 @dataclass
 class AlphaBeta(RuleBaseWorker):
+    """alpha-beta(negamax)探索
+
+    - env は使わずに bitboard(手番の石, 全ての石)を直接更新して探索します
+    - 評価値は手番から見た値で、勝ちは早いほど大きく(盤面の空きマス数 + 1)、負けはその逆、それ以外は0です
+    - 置換表は局面を一意に表すキー(手番の石 + 全ての石)で引き、サイズ固定(tt_size)で探索深さと値の種類も保存します
+    - 反復深化で浅い探索の最善手、中央の列から順に探索します
+    - timeout が 0 より大きい場合は時間内に探索できた深さまでの結果を使います
+    """
 
     max_depth: int = 4
-    timeout: int = 6  # s
-    equal_cut: bool = True
+    timeout: float = 6  # s, 0以下は制限なし
+    tt_size: int = 2**16
 
     def __post_init__(self):
         super().__init__()
+        self._tt: List[Optional[tuple]] = [None] * self.tt_size
 
-    def call_on_reset(self, env: EnvRun, worker: WorkerRun) -> dict:
+    def call_on_reset(self, _env: EnvRun, worker: WorkerRun) -> dict:
+        env = cast(ConnectX, _env.get_original_env())
+        self._size = env.columns * env.rows
+        self._shifts = env._shifts
+        self._bottom_masks = env._bottom_masks
+        self._top_masks = env._top_masks
+        self._column_masks = env._column_masks
+        # 中央の列から順に探索
+        center = (env.columns - 1) / 2
+        self._action_order = sorted(range(env.columns), key=lambda c: abs(c - center))
         return {}
 
-    def call_policy(self, env: EnvRun, worker: WorkerRun) -> Tuple[EnvAction, dict]:
+    def call_policy(self, _env: EnvRun, worker: WorkerRun) -> Tuple[EnvAction, dict]:
+        env = cast(ConnectX, _env.get_original_env())
         self._count = 0
         self.t0 = time.time()
-        scores, action = self._alphabeta(env.get_original_env().copy())
 
-        scores = np.array(scores)
-        if worker.player_index == 1:
-            scores = -scores
-
-        self._action = action
-        self._scores = scores
-        self._count = self._count
-        self._time = time.time() - self.t0
-
-        # action = int(random.choice(np.where(scores == scores.max())[0]))
+        cur = env.boards[env.player_index]
+        mask = env.boards[0] | env.boards[1]
+        stones = bin(mask).count("1")
+
+        # 反復深化、時間切れの場合は前の深さの結果を使う
+        scores = []
+        action = 0
+        depth = 0
+        for d in range(1, self.max_depth + 1):
+            self._enable_timeout = self.timeout > 0 and d > 1  # 深さ1は必ず最後まで探索する
+            try:
+                scores, action = self._search_root(cur, mask, stones, d)
+                depth = d
+            except _SearchTimeout:
+                break
+
+        self._render_scores = scores
+        self._render_count = self._count
+        self._render_time = time.time() - self.t0
+        self._render_depth = depth
         return action, {}
 
-    def _alphabeta(self, env: ConnectX, alpha=-np.inf, beta=np.inf, depth: int = 0):
-        if depth == self.max_depth:
-            return [0] * env.action_space.n, 0
-        if self.t0 - time.time() > self.timeout:
-            return [0] * env.action_space.n
-
+    # ---------------------------------
+    # search
+    # ---------------------------------
+    def _ordered_actions(self, mask: int, best_action: int) -> List[int]:
+        actions = [a for a in self._action_order if not (mask & self._top_masks[a])]
+        # 前回の最善手を先頭にする
+        if best_action in actions:
+            actions.remove(best_action)
+            actions.insert(0, best_action)
+        return actions
+
+    def _play(self, cur: int, mask: int, stones: int, action: int) -> Tuple[Optional[float], int, int]:
+        """石を置く、(終了した場合の手番から見た評価値, 次の手番の石, 全ての石)を返す"""
+        move = (mask + self._bottom_masks[action]) & self._column_masks[action]
+        cur |= move
+        mask |= move
+        if _is_connect4(cur, self._shifts):
+            return self._size - stones, 0, 0  # stones は置く前の数
+        if stones + 1 == self._size:
+            return 0, 0, 0
+        return None, cur ^ mask, mask
+
+    def _search_root(self, cur: int, mask: int, stones: int, depth: int) -> Tuple[List[float], int]:
+        key = cur + mask
+        entry = self._tt[key % self.tt_size]
+        best_action = entry[4] if entry is not None and entry[0] == key else -1
+
+        # 同じ評価値の手からランダムに選ぶように、前回の最善手以外の順番はランダムにする
+        actions = self._ordered_actions(mask, best_action)
+        if best_action in actions:
+            tail = actions[1:]
+            random.shuffle(tail)
+            actions = actions[:1] + tail
+        else:
+            random.shuffle(actions)
+
+        scores = [-999.0 for _ in range(len(self._action_order))]
+        best = -np.inf
+        for a in actions:
+            score, n_cur, n_mask = self._play(cur, mask, stones, a)
+            if score is None:
+                score = -self._negamax(n_cur, n_mask, stones + 1, depth - 1, -np.inf, -best)
+
+            # 最善手は正確な値、それ以外は上限値になる
+            scores[a] = score
+            if best < score:
+                best = score
+                best_action = a
+        self._tt_store(key, depth, _TT_EXACT, best, best_action)
+        return scores, best_action
+
+    def _negamax(self, cur: int, mask: int, stones: int, depth: int, alpha: float, beta: float) -> float:
         self._count += 1
-        env_dat = env.backup()
-        invalid_actions = env.get_invalid_actions()
-
-        actions = [a for a in range(env.action_space.n)]
-        random.shuffle(actions)
-        select_action = 0
-
-        if env.player_index == 0:
-
-            # 自分の番
-            scores = [-9.0 for _ in range(env.action_space.n)]
-            for a in actions:
-                if a in invalid_actions:
-                    continue
-                env.restore(env_dat)
-
-                _, r1, r2, done, _ = env.call_step(a)
-                # print(np.array(env.board).reshape((6, 7)))
-                if done:
-                    scores[a] = r1
+        if self._enable_timeout and self._count % 1000 == 0 and time.time() - self.t0 > self.timeout:
+            raise _SearchTimeout()
+
+        if depth <= 0:
+            return 0
+
+        # --- 置換表
+        alpha_org = alpha
+        key = cur + mask
+        entry = self._tt[key % self.tt_size]
+        best_action = -1
+        if entry is not None and entry[0] == key:
+            best_action = entry[4]
+            if entry[1] >= depth:
+                if entry[2] == _TT_EXACT:
+                    return entry[3]
+                elif entry[2] == _TT_LOWER:
+                    alpha = max(alpha, entry[3])
                 else:
-                    n_scores, _ = self._alphabeta(env, alpha, beta, depth + 1)
-                    scores[a] = np.min(n_scores)
-
-                # maximum
-                if alpha < scores[a]:
-                    select_action = a
-                    alpha = scores[a]
-
-                # beta cut
-                if self.equal_cut:
-                    if scores[a] >= beta:
-                        break
-
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3]
+
+        best = -np.inf
+        for a in self._ordered_actions(mask, best_action):
+            score, n_cur, n_mask = self._play(cur, mask, stones, a)
+            if score is None:
+                score = -self._negamax(n_cur, n_mask, stones + 1, depth - 1, -beta, -alpha)
+
+            if best < score:
+                best = score
+                best_action = a
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_org:
+            flag = _TT_UPPER
+        elif best >= beta:
+            flag = _TT_LOWER
         else:
+            flag = _TT_EXACT
+        self._tt_store(key, depth, flag, best, best_action)
+        return best
 
-            # 相手の番
-            scores = [9.0 for _ in range(env.action_space.n)]
-            for a in actions:
-                if a in invalid_actions:
-                    continue
-                env.restore(env_dat)
-
-                _, r1, r2, done, _ = env.call_step(a)
-                # print(np.array(env.board).reshape((6, 7)))
-                if done:
-                    scores[a] = r1
-                else:
-                    n_scores, _ = self._alphabeta(env, alpha, beta, depth + 1)
-                    scores[a] = np.max(n_scores)
-
-                # minimum
-                if beta > scores[a]:
-                    select_action = a
-                    beta = scores[a]
-
-                # alpha cut
-                if self.equal_cut:
-                    if scores[a] <= alpha:
-                        break
-
-        return scores, select_action
+    def _tt_store(self, key: int, depth: int, flag: int, score: float, best_action: int) -> None:
+        idx = key % self.tt_size
+        entry = self._tt[idx]
+        # 別の局面か、同じ局面でより深い探索結果なら置き換える
+        if entry is None or entry[0] != key or entry[1] <= depth:
+            self._tt[idx] = (key, depth, flag, score, best_action)
 
     def render_terminal(self, env: EnvRun, worker: WorkerRun, **kwargs) -> None:
-        print(f"- alphabeta act: {self._action}, count: {self._count}, {self._time:.3f}s) -")
-        print("+---+---+---+---+---+---+---+")
+        invalid_actions = env.get_invalid_actions()
+        print(f"- alphabeta depth: {self._render_depth}, count: {self._render_count}, {self._render_time:.3f}s -")
+        print("+" + "+".join(["---"] * env.action_space.n) + "+")
         s = "|"
         for a in range(env.action_space.n):
-            s += "{:2d} |".format(int(self._scores[a]))
+            if a in invalid_actions:
+                s += "   |"
+            else:
+                s += "{:3d}|".format(int(self._render_scores[a]))
         print(s)
-        print("+---+---+---+---+---+---+---+")
+        print("+" + "+".join(["---"] * env.action_space.n) + "+")
 
 
 class LayerProcessor(Processor):
@@ -11,6 +11,7 @@ from srl.base.env import registration
 from srl.base.env.base import EnvRun, SpaceBase
 from srl.base.env.genre import SinglePlayEnv
 from srl.base.env.spaces import ArrayDiscreteSpace, BoxSpace, DiscreteSpace
+from srl.base.env.vector import VectorEnvBase
 from srl.base.rl.processor import Processor
 
 logger = logging.getLogger(__name__)
@@ -34,6 +35,24 @@ registration.register(
     },
 )
 
+registration.register_vector(
+    id="Grid",
+    entry_point=__name__ + ":GridVector",
+    kwargs={
+        "move_reward": -0.04,
+        "move_prob": 0.8,
+    },
+)
+
+registration.register_vector(
+    id="EasyGrid",
+    entry_point=__name__ + ":GridVector",
+    kwargs={
+        "move_reward": 0.0,
+        "move_prob": 1.0,
+    },
+)
+
 
 class Action(enum.Enum):
     LEFT = 0
@@ -114,6 +133,12 @@ class Grid(SinglePlayEnv):
     def restore(self, data: Any) -> None:
         self.player_pos = data
 
+    def snapshot(self) -> Any:
+        return tuple(self.player_pos)
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.player_pos = data
+
     def call_step(self, action_: int) -> Tuple[List[int], float, bool, dict]:
         action = Action(action_)
 
@@ -426,6 +451,72 @@ class Grid(SinglePlayEnv):
         return np.mean(rewards)
 
 
+@dataclass
+class GridVector(VectorEnvBase):
+    """Grid を batch_size 個まとめて進める env
+
+    位置をマスの index(y * W + x)で持ち、遷移・報酬・終了を事前に計算した表から引きます。
+    """
+
+    move_prob: float = 0.8
+    move_reward: float = -0.04
+
+    def __post_init__(self):
+        self._env = Grid(move_prob=self.move_prob, move_reward=self.move_reward)
+        W = self._env.W
+
+        # 表の作成: [マス, 実際に移動した方向] -> 次のマス
+        self._next_pos = np.zeros((len(self._env.states), len(Action)), dtype=np.int64)
+        self._rewards = np.zeros(len(self._env.states), dtype=np.float32)
+        self._dones = np.zeros(len(self._env.states), dtype=bool)
+        self._pos_to_state = np.zeros((len(self._env.states), 2), dtype=np.int64)
+        for i, state in enumerate(self._env.states):
+            for a in Action:
+                n_state = self._env._move(state, a)
+                self._next_pos[i, a.value] = n_state[0] + n_state[1] * W
+            self._rewards[i], self._dones[i] = self._env.reward_done_func(state)
+            self._pos_to_state[i] = state
+
+        # [選んだaction, 実際に移動した方向] の累積確率
+        probs = [[self._env.action_probs[a][b] for b in Action] for a in Action]
+        self._cum_probs = np.cumsum(probs, axis=1)
+
+        self._start_pos = 1 + 3 * W
+        self.pos = np.full(self.batch_size, self._start_pos, dtype=np.int64)
+        super().__post_init__()
+
+    @property
+    def action_space(self) -> SpaceBase:
+        return self._env.action_space
+
+    @property
+    def observation_space(self) -> SpaceBase:
+        return self._env.observation_space
+
+    @property
+    def observation_type(self) -> EnvObservationType:
+        return self._env.observation_type
+
+    @property
+    def max_episode_steps(self) -> int:
+        return self._env.max_episode_steps
+
+    def call_reset(self, indices: np.ndarray) -> None:
+        self.pos[indices] = self._start_pos
+
+    def call_step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # 累積確率から実際に移動する方向を決める
+        r = self.rng.random(self.batch_size)
+        dirs = (r[:, np.newaxis] >= self._cum_probs[actions]).sum(axis=1)
+        dirs = np.minimum(dirs, len(Action) - 1)
+
+        self.pos = self._next_pos[self.pos, dirs]
+        return self._rewards[self.pos], self._dones[self.pos]
+
+    def call_observation(self) -> np.ndarray:
+        return self._pos_to_state[self.pos]
+
+
 class LayerProcessor(Processor):
     def change_observation_info(
         self,
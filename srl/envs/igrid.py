@@ -4,12 +4,14 @@ import logging
 from dataclasses import dataclass
 from typing import Any, List, Tuple
 
+import numpy as np
 from srl.base.define import EnvObservationType
 from srl.base.env import registration
 from srl.base.env.base import SpaceBase
 from srl.base.env.genre import SinglePlayEnv
 from srl.base.env.spaces import DiscreteSpace
 from srl.base.env.spaces.array_discrete import ArrayDiscreteSpace
+from srl.base.env.vector import VectorEnvBase
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,14 @@ registration.register(
     },
 )
 
+registration.register_vector(
+    id="IGrid",
+    entry_point=__name__ + ":IGridVector",
+    kwargs={
+        "N": 0,
+    },
+)
+
 
 class Action(enum.Enum):
     LEFT = 0
@@ -91,6 +101,13 @@ class IGrid(SinglePlayEnv):
         self.player_pos = d[0]
         self.field = d[1]
 
+    def snapshot(self) -> Any:
+        return tuple(self.player_pos), tuple(tuple(r) for r in self.field)
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.player_pos = data[0]
+        self.field = [list(r) for r in data[1]]
+
     def call_step(self, action_: int) -> Tuple[List[int], float, bool, dict]:
         action = Action(action_)
 
@@ -177,3 +194,90 @@ class IGrid(SinglePlayEnv):
     @property
     def actions(self):
         return [a for a in Action]
+
+
+@dataclass
+class IGridVector(VectorEnvBase):
+    """IGrid を batch_size 個まとめて進める env
+
+    位置をマスの index(y * W + x)、取った key を 0(なし)/1(A)/2(B) で持ち、事前に計算した表から引きます。
+    """
+
+    N: int = 0
+
+    def __post_init__(self):
+        self._env = IGrid(N=self.N)
+        self._env.call_reset()
+        W = self._env.W
+        H = self._env.H
+        field = self._env.field
+        size = W * H
+
+        # [マス, 方向] -> 次のマス
+        self._next_pos = np.zeros((size, len(Action)), dtype=np.int64)
+        self._pos_to_state = np.zeros((size, 2), dtype=np.int64)
+        for y in range(H):
+            for x in range(W):
+                i = x + y * W
+                self._pos_to_state[i] = (x, y)
+                for a in Action:
+                    nx, ny = x, y
+                    if a == Action.UP:
+                        ny -= 1
+                    elif a == Action.DOWN:
+                        ny += 1
+                    elif a == Action.LEFT:
+                        nx -= 1
+                    elif a == Action.RIGHT:
+                        nx += 1
+                    if 0 <= nx < W and 0 <= ny < H and field[ny][nx] != 0:
+                        self._next_pos[i, a.value] = nx + ny * W
+                    else:
+                        self._next_pos[i, a.value] = i
+
+        # [マス, 取ったkey] -> 次のkey, 報酬, 終了
+        self._next_keys = np.tile(np.arange(3), (size, 1))
+        self._rewards = np.zeros((size, 3), dtype=np.float32)
+        self._dones = np.zeros((size, 3), dtype=bool)
+        self._next_keys[0 + (H - 1) * W, :] = 1  # A
+        self._next_keys[2 + (H - 1) * W, :] = 2  # B
+        self._rewards[0, 1:] = [1, -1]  # C
+        self._rewards[2, 1:] = [-1, 1]  # D
+        self._dones[0, 1:] = True
+        self._dones[2, 1:] = True
+
+        p = self._env.player_pos
+        self._start_pos = p[0] + p[1] * W
+        self.pos = np.full(self.batch_size, self._start_pos, dtype=np.int64)
+        self.keys = np.zeros(self.batch_size, dtype=np.int64)
+        super().__post_init__()
+
+    @property
+    def action_space(self) -> SpaceBase:
+        return self._env.action_space
+
+    @property
+    def observation_space(self) -> SpaceBase:
+        return self._env.observation_space
+
+    @property
+    def observation_type(self) -> EnvObservationType:
+        return self._env.observation_type
+
+    @property
+    def max_episode_steps(self) -> int:
+        return self._env.max_episode_steps
+
+    def call_reset(self, indices: np.ndarray) -> None:
+        self.pos[indices] = self._start_pos
+        self.keys[indices] = 0
+
+    def call_step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        self.pos = self._next_pos[self.pos, actions]
+        rewards = self._rewards[self.pos, self.keys]
+        dones = self._dones[self.pos, self.keys]
+        self.keys = self._next_keys[self.pos, self.keys]
+        return rewards, dones
+
+    def call_observation(self) -> np.ndarray:
+        return self._pos_to_state[self.pos]
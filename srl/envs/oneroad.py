@@ -3,11 +3,13 @@ import logging
 from dataclasses import dataclass
 from typing import Any, Tuple
 
+import numpy as np
 from srl.base.define import EnvObservationType
 from srl.base.env import registration
 from srl.base.env.base import SpaceBase
 from srl.base.env.genre import SinglePlayEnv
 from srl.base.env.spaces import DiscreteSpace
+from srl.base.env.vector import VectorEnvBase
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,16 @@ registration.register(
     entry_point=__name__ + ":OneRoad",
     kwargs={"N": 20, "action": 16},
 )
+registration.register_vector(
+    id="OneRoad",
+    entry_point=__name__ + ":OneRoadVector",
+    kwargs={"N": 10, "action": 2},
+)
+registration.register_vector(
+    id="OneRoad-hard",
+    entry_point=__name__ + ":OneRoadVector",
+    kwargs={"N": 20, "action": 16},
+)
 
 
 @dataclass
@@ -60,6 +72,12 @@ class OneRoad(SinglePlayEnv):
         d = json.loads(data)
         self.player_pos = d[0]
 
+    def snapshot(self) -> Any:
+        return self.player_pos
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.player_pos = data
+
     def call_step(self, action: int) -> Tuple[int, float, bool, dict]:
         if action == 0:
             self.player_pos += 1
@@ -81,3 +99,43 @@ class OneRoad(SinglePlayEnv):
     @property
     def render_interval(self) -> float:
         return 1000 / 1
+
+
+@dataclass
+class OneRoadVector(VectorEnvBase):
+    """OneRoad を batch_size 個まとめて進める env"""
+
+    N: int = 10
+    action: int = 2
+
+    def __post_init__(self):
+        self._env = OneRoad(N=self.N, action=self.action)
+        self.pos = np.zeros(self.batch_size, dtype=np.int64)
+        super().__post_init__()
+
+    @property
+    def action_space(self) -> SpaceBase:
+        return self._env.action_space
+
+    @property
+    def observation_space(self) -> SpaceBase:
+        return self._env.observation_space
+
+    @property
+    def observation_type(self) -> EnvObservationType:
+        return self._env.observation_type
+
+    @property
+    def max_episode_steps(self) -> int:
+        return self._env.max_episode_steps
+
+    def call_reset(self, indices: np.ndarray) -> None:
+        self.pos[indices] = 0
+
+    def call_step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        self.pos = np.where(actions == 0, self.pos + 1, 0)
+        dones = self.pos == self.N
+        return dones.astype(np.float32), dones
+
+    def call_observation(self) -> np.ndarray:
+        return self.pos.copy()
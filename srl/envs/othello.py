@@ -1,5 +1,4 @@
 import logging
-import pickle
 import random
 import time
 from dataclasses import dataclass
@@ -34,8 +33,40 @@ register(
 )
 
 
+# 方向(dx, dy, テンキーの方向)
+_DIRECTIONS = [
+    (-1, 1, 1),
+    (0, 1, 2),
+    (1, 1, 3),
+    (1, 0, 6),
+    (1, -1, 9),
+    (0, -1, 8),
+    (-1, -1, 7),
+    (-1, 0, 4),
+]
+
+
+# 1byte(0-255)毎のビットのリスト
+_BYTE_BITS = [[(v >> i) & 1 for i in range(8)] for v in range(256)]
+
+
+def _bit_count(n: int) -> int:
+    return bin(n).count("1")
+
+
+def _to_bits(n: int, size: int) -> List[int]:
+    bits = []
+    for i in range(0, size, 8):
+        bits.extend(_BYTE_BITS[(n >> i) & 0xFF])
+    return bits[:size]
+
+
 @dataclass
 class Othello(TurnBase2Player):
+    """盤面は bitboard(player0/player1 の石の位置をそれぞれ int のビットで表現)で管理します
+
+    ビットの位置は action と同じ W * y + x です。
+    """
 
     W: int = 8
     H: int = 8
@@ -43,6 +74,91 @@ class Othello(TurnBase2Player):
     def __post_init__(self):
         self._player_index = 0
         self.screen = None
+        self.boards = [0, 0]
+        self.movables = [0, 0]
+        self._init_masks()
+
+    def _init_masks(self):
+        # --- 方向毎のシフト量と、シフトしても盤面からはみ出さない位置のマスク
+        self._full_mask = (1 << (self.W * self.H)) - 1
+        self._shifts = []
+        for diff_x, diff_y, _ in _DIRECTIONS:
+            mask = 0
+            for y in range(self.H):
+                for x in range(self.W):
+                    if 0 <= x + diff_x < self.W and 0 <= y + diff_y < self.H:
+                        mask |= 1 << self.pos(x, y)
+            self._shifts.append((diff_y * self.W + diff_x, mask))
+
+    def _shift(self, b: int, shift: int, mask: int) -> int:
+        b &= mask
+        if shift > 0:
+            return b << shift
+        return b >> -shift
+
+    def _calc_movable(self, player_index: int) -> int:
+        movable = 0
+        for m in self._calc_movable_by_dir(player_index):
+            movable |= m
+        return movable
+
+    def _calc_movable_by_dir(self, player_index: int) -> List[int]:
+        """方向毎の置ける場所、自分の石から相手の石が続く先が空いていれば置ける"""
+        me = self.boards[player_index]
+        enemy = self.boards[1 - player_index]
+        empty = self._full_mask & ~(me | enemy)
+        movables = []
+        for shift, mask in self._shifts:
+            # _shift を展開して高速化、先端(f)だけを伸ばしていく
+            if shift > 0:
+                f = t = ((me & mask) << shift) & enemy
+                while f:
+                    f = ((f & mask) << shift) & enemy
+                    t |= f
+                movables.append(((t & mask) << shift) & empty)
+            else:
+                f = t = ((me & mask) >> -shift) & enemy
+                while f:
+                    f = ((f & mask) >> -shift) & enemy
+                    t |= f
+                movables.append(((t & mask) >> -shift) & empty)
+        return movables
+
+    def _calc_flips(self, player_index: int, action: int) -> int:
+        me = self.boards[player_index]
+        enemy = self.boards[1 - player_index]
+        flips = 0
+        for shift, mask in self._shifts:
+            f = 0
+            t = self._shift(1 << action, shift, mask)
+            while t & enemy:
+                f |= t
+                t = self._shift(t, shift, mask)
+            if t & me:
+                flips |= f
+        return flips
+
+    def _update_movables(self) -> None:
+        self.movables = [self._calc_movable(0), self._calc_movable(1)]
+
+    @property
+    def field(self) -> List[int]:
+        size = self.W * self.H
+        return [b0 - b1 for b0, b1 in zip(_to_bits(self.boards[0], size), _to_bits(self.boards[1], size))]
+
+    @property
+    def movable_dirs(self) -> List[List[List[int]]]:
+        """置ける場所毎に石を返せる方向(テンキー)のリスト"""
+        dirs_list = []
+        for player_index in range(2):
+            dirs = [[] for _ in range(self.W * self.H)]
+            for movable, (_, _, dir_) in zip(self._calc_movable_by_dir(player_index), _DIRECTIONS):
+                for a in range(self.W * self.H):
+                    if (movable >> a) & 1:
+                        # 自分の石から見た方向なので、置く場所から見ると逆向き
+                        dirs[a].append(10 - dir_)
+            dirs_list.append(dirs)
+        return dirs_list
 
     def get_field(self, x: int, y: int) -> int:
         if x < 0:
@@ -53,10 +169,21 @@ class Othello(TurnBase2Player):
             return 9
         if y >= self.H:
             return 9
-        return self.field[self.W * y + x]
+        a = self.W * y + x
+        if (self.boards[0] >> a) & 1:
+            return 1
+        if (self.boards[1] >> a) & 1:
+            return -1
+        return 0
 
     def set_field(self, x: int, y: int, n: int):
-        self.field[self.W * y + x] = n
+        bit = 1 << (self.W * y + x)
+        self.boards[0] &= ~bit
+        self.boards[1] &= ~bit
+        if n == 1:
+            self.boards[0] |= bit
+        elif n == -1:
+            self.boards[1] |= bit
 
     def pos(self, x: int, y: int) -> int:
         return self.W * y + x
@@ -90,86 +217,48 @@ class Othello(TurnBase2Player):
         self.action = 0
 
         self._player_index = 0
-        self.field = [0] * (self.W * self.H)
+        self.boards = [0, 0]
         center_x = int(self.W / 2) - 1
         center_y = int(self.H / 2) - 1
         self.set_field(center_x, center_y, 1)
         self.set_field(center_x + 1, center_y + 1, 1)
         self.set_field(center_x + 1, center_y, -1)
         self.set_field(center_x, center_y + 1, -1)
-        self.movable_dirs = [
-            self._calc_movable_dirs(0),
-            self._calc_movable_dirs(1),
-        ]
+        self._update_movables()
 
         return self.field, {}
 
     def backup(self) -> Any:
-        return pickle.dumps(
-            [
-                self._player_index,
-                self.W,
-                self.H,
-                self.field,
-                self.movable_dirs,
-            ]
-        )
+        return [
+            self._player_index,
+            self.W,
+            self.H,
+            self.boards[:],
+            self.movables[:],
+        ]
 
     def restore(self, data: Any) -> None:
-        d = pickle.loads(data)
-        self._player_index = d[0]
-        self.W = d[1]
-        self.H = d[2]
-        self.field = d[3]
-        self.movable_dirs = d[4]
-
-    def _calc_movable_dirs(self, player_index) -> List[List[int]]:
-        my_color = 1 if player_index == 0 else -1
-        enemy_color = -my_color
-
-        dirs_list = [[] for _ in range(self.W * self.H)]
-        for y in range(self.H):
-            for x in range(self.W):
-                # 石が置ける場所のみ
-                if self.get_field(x, y) != 0:
-                    continue
-
-                # (x, y, dir) dirはテンキーに対応
-                for diff_x, diff_y, dir_ in [
-                    (-1, 1, 1),
-                    (0, 1, 2),
-                    (1, 1, 3),
-                    (1, 0, 6),
-                    (1, -1, 9),
-                    (0, -1, 8),
-                    (-1, -1, 7),
-                    (-1, 0, 4),
-                ]:
-                    tmp_x = x + diff_x
-                    tmp_y = y + diff_y
-
-                    # 1つは相手の駒がある
-                    if self.get_field(tmp_x, tmp_y) != enemy_color:
-                        continue
-                    tmp_x += diff_x
-                    tmp_y += diff_y
-
-                    # 相手の駒移動
-                    while self.get_field(tmp_x, tmp_y) == enemy_color:
-                        tmp_x += diff_x
-                        tmp_y += diff_y
-
-                    # 相手の駒の後に自分の駒があるか
-                    if self.get_field(tmp_x, tmp_y) == my_color:
-                        dirs_list[self.pos(x, y)].append(dir_)
-
-        return dirs_list
+        self._player_index = data[0]
+        if self.W != data[1] or self.H != data[2]:
+            self.W = data[1]
+            self.H = data[2]
+            self._init_masks()
+        self.boards = data[3][:]
+        self.movables = data[4][:]
+
+    def snapshot(self) -> Any:
+        return self._player_index, self.boards[0], self.boards[1], self.movables[0], self.movables[1]
+
+    def restore_snapshot(self, data: Any) -> None:
+        self._player_index = data[0]
+        self.boards = [data[1], data[2]]
+        self.movables = [data[3], data[4]]
 
     def call_step(self, action: int) -> Tuple[List[int], float, float, bool, dict]:
         self.action = action
 
         # --- error action
-        if len(self.movable_dirs[self.player_index][action]) == 0:
+        if not (self.movables[self.player_index] >> action) & 1:
             if self.player_index == 0:
                 return self.field, -1, 0, True, {}
             else:
@@ -181,12 +270,10 @@ class Othello(TurnBase2Player):
         # --- 終了判定
         enemy_player = 1 if self.player_index == 0 else 0
         my_player = 0 if self.player_index == 0 else 1
-        enemy_put_num = self.action_space.n - len(self.get_invalid_actions(enemy_player))
-        my_put_num = self.action_space.n - len(self.get_invalid_actions(my_player))
         # 互いに置けないなら終了
-        if enemy_put_num == 0 and my_put_num == 0:
-            p1_count = len([f for f in self.field if f == 1])
-            p2_count = len([f for f in self.field if f == -1])
+        if self.movables[enemy_player] == 0 and self.movables[my_player] == 0:
+            p1_count = _bit_count(self.boards[0])
+            p2_count = _bit_count(self.boards[1])
             if p1_count > p2_count:
                 r1 = 1
                 r2 = -1
@@ -198,7 +285,7 @@ class Othello(TurnBase2Player):
             return self.field, r1, r2, True, {"P1": p1_count, "P2": p2_count}
 
         # 相手が置けないならpass
-        if enemy_put_num == 0:
+        if self.movables[enemy_player] == 0:
             return self.field, 0, 0, False, {}
 
         # 手番交代
@@ -206,58 +293,35 @@ class Othello(TurnBase2Player):
         return self.field, 0, 0, False, {}
 
     def _step(self, action):
-
         # --- update
-        x, y = self.pos_decode(action)
-        my_color = 1 if self.player_index == 0 else -1
-        self.field[action] = my_color
-
-        # 移動方向はテンキー
-        move_diff = {
-            1: (-1, 1),
-            2: (0, 1),
-            3: (1, 1),
-            6: (1, 0),
-            9: (1, -1),
-            8: (0, -1),
-            7: (-1, -1),
-            4: (-1, 0),
-        }
-        for movable_dir in self.movable_dirs[self.player_index][action]:
-            diff_x, diff_y = move_diff[movable_dir]
-            tmp_x = x + diff_x
-            tmp_y = y + diff_y
-            while self.get_field(tmp_x, tmp_y) != my_color:
-                a = self.pos(tmp_x, tmp_y)
-                self.field[a] = my_color
-                tmp_x += diff_x
-                tmp_y += diff_y
+        flips = self._calc_flips(self.player_index, action)
+        self.boards[self.player_index] |= flips | (1 << action)
+        self.boards[1 - self.player_index] &= ~flips
 
         # 置ける場所を更新
-        self.movable_dirs = [
-            self._calc_movable_dirs(0),
-            self._calc_movable_dirs(1),
-        ]
+        self._update_movables()
 
     def get_invalid_actions(self, player_index) -> List[int]:
-        return [a for a in range(self.H * self.W) if len(self.movable_dirs[player_index][a]) == 0]
+        bits = _to_bits(self.movables[player_index], self.H * self.W)
+        return [a for a, b in enumerate(bits) if b == 0]
 
     def render_terminal(self, **kwargs) -> None:
         invalid_actions = self.get_invalid_actions(self.player_index)
-        p1_count = len([f for f in self.field if f == 1])
-        p2_count = len([f for f in self.field if f == -1])
+        field = self.field
+        p1_count = _bit_count(self.boards[0])
+        p2_count = _bit_count(self.boards[1])
 
         print("-" * (1 + self.W * 3))
         for y in range(self.H):
             s = "|"
             for x in range(self.W):
                 a = self.pos(x, y)
-                if self.field[a] == 1:
+                if field[a] == 1:
                     if self.action == a:
                         s += "*o|"
                     else:
                         s += " o|"
-                elif self.field[a] == -1:
+                elif field[a] == -1:
                     if self.action == a:
                         s += "*x|"
                     else:
@@ -287,6 +351,7 @@ class Othello(TurnBase2Player):
         cell_w = int((WIDTH - w_margin * 2) / self.W)
         cell_h = int((HEIGHT - h_margin * 2) / self.H)
         invalid_actions = self.get_invalid_actions(self.player_index)
+        field = self.field
 
         pw.draw_fill(self.screen, color=(255, 255, 255))
 
@@ -310,7 +375,7 @@ class Othello(TurnBase2Player):
                 )
 
                 a = x + y * self.W
-                if self.field[a] == 1:  # o
+                if field[a] == 1:  # o
                     if self.action == a:
                         width = 4
                         line_color = (200, 0, 0)
@@ -327,7 +392,7 @@ class Othello(TurnBase2Player):
                         width=width,
                         line_color=line_color,
                     )
-                elif self.field[a] == -1:  # x
+                elif field[a] == -1:  # x
                     if self.action == a:
                         width = 4
                         line_color = (200, 0, 0)
@@ -367,20 +432,48 @@ class Othello(TurnBase2Player):
     def make_worker(self, name: str) -> Optional[RuleBaseWorker]:
         if name == "cpu":
             return Cpu()
+        elif name == "cpu_deep":
+            return Cpu(max_depth=self.W * self.H, timeout=1)
         return None
 
 
+class _SearchTimeout(Exception):
+    pass
+
+
+# 置換表の値の種類
+_TT_EXACT = 0
+_TT_LOWER = 1  # 実際の値はこれ以上(beta cut)
+_TT_UPPER = 2  # 実際の値はこれ以下(alpha 以下)
+
+_WIN_SCORE = 500
+
+
+@dataclass
 class Cpu(RuleBaseWorker):
-    cache = {}
+    """alpha-beta(negamax)探索
+
+    - 置換表は Zobrist hash で引き、サイズ固定(tt_size)で探索深さと値の種類(exact/lower/upper)も保存します
+    - 反復深化で浅い探索の最善手と評価値の高いマスから順に探索します
+    - timeout が 0 より大きい場合は時間内に探索できた深さまでの結果を使います
+    """
+
+    max_depth: int = -1  # 探索する手数、-1 は盤面の大きさで決める(8x8:4, 6x6:5, 4x4:8)
+    timeout: float = 0  # s, 0以下は制限なし
+    tt_size: int = 2**16
+
+    def __post_init__(self):
+        super().__init__()
+        self._tt: List[Optional[tuple]] = [None] * self.tt_size
+        self._zobrist_size = 0
 
     def call_on_reset(self, _env: EnvRun, worker: WorkerRun) -> dict:
         env = cast(Othello, _env.get_original_env())
-        self.max_depth = 2
-        self.eval_field = None
+        eval_field = None
 
         if env.W == 8:
-            self.max_depth = 2
-            self.eval_field = [
+            depth = 4
+            eval_field = [
                 [30, -12, 0, -1, -1, 0, -12, 30],
                 [-12, -15, -3, -3, -3, -3, -15, -12],
                 [0, -3, 0, -1, -1, 0, -3, 0],
@@ -390,12 +483,9 @@ class Cpu(RuleBaseWorker):
                 [-12, -15, -3, -3, -3, -3, -15, -12],
                 [30, -12, 0, -1, -1, 0, -12, 30],
             ]
-            self.eval_field = np.array(self.eval_field).flatten()
-            assert self.eval_field.shape == (64,)
-
         elif env.W == 6:
-            self.max_depth = 3
-            self.eval_field = [
+            depth = 5
+            eval_field = [
                 [30, -12, 0, 0, -12, 30],
                 [-12, -15, -3, -3, -15, -12],
                 [0, -3, 0, 0, -3, 0],
@@ -403,74 +493,212 @@ class Cpu(RuleBaseWorker):
                 [-12, -15, -3, -3, -15, -12],
                 [30, -12, 0, 0, -12, 30],
             ]
-            self.eval_field = np.array(self.eval_field).flatten()
-            assert self.eval_field.shape == (36,)
+        else:
+            depth = 8
+        self.search_depth = depth if self.max_depth <= 0 else self.max_depth
 
-        elif env.W == 4:
-            self.max_depth = 6
+        size = env.W * env.H
+        if eval_field is None:
+            self.eval_field = [0] * size
+        else:
+            self.eval_field = np.array(eval_field).flatten().tolist()
+            assert len(self.eval_field) == size
+
+        # 評価値の計算用に 1byte 毎の重みの合計を作っておく
+        self._eval_tables = []
+        for i in range(0, size, 8):
+            weights = self.eval_field[i : i + 8]
+            self._eval_tables.append(
+                [sum(w for j, w in enumerate(weights) if (v >> j) & 1) for v in range(256)]
+            )
+
+        if self._zobrist_size != size:
+            self._zobrist_size = size
+            rnd = random.Random(size)
+            self._zobrist = [[rnd.getrandbits(64) for _ in range(size)] for _ in range(2)]
+            self._zobrist_turn = rnd.getrandbits(64)
+            self._tt = [None] * self.tt_size
 
         return {}
 
     def call_policy(self, env: EnvRun, worker: WorkerRun) -> Tuple[EnvAction, dict]:
         self._count = 0
         self.t0 = time.time()
-        scores = self._negamax(env.get_original_env().copy())
+        _env = cast(Othello, env.get_original_env()).copy()
+
+        # 反復深化、時間切れの場合は前の深さの結果を使う
+        scores = []
+        depth = 0
+        for d in range(1, self.search_depth + 1):
+            self._enable_timeout = self.timeout > 0 and d > 1  # 深さ1は必ず最後まで探索する
+            try:
+                scores = self._search_root(_env, d)
+                depth = d
+            except _SearchTimeout:
+                _env = cast(Othello, env.get_original_env()).copy()
+                break
+
         self._render_scores = scores
         self._render_count = self._count
         self._render_time = time.time() - self.t0
+        self._render_depth = depth
 
         scores = np.array(scores)
         action = int(random.choice(np.where(scores == scores.max())[0]))
         return action, {}
 
-    def _negamax(self, env: Othello, depth: int = 0):
+    # ---------------------------------
+    # search
+    # ---------------------------------
+    def _hash(self, env: Othello) -> int:
+        h = 0
+        for player_index in range(2):
+            b = env.boards[player_index]
+            while b:
+                low = b & -b
+                h ^= self._zobrist[player_index][low.bit_length() - 1]
+                b ^= low
+        if env.player_index == 1:
+            h ^= self._zobrist_turn
+        return h
+
+    def _evaluate(self, env: Othello, player_index: int) -> float:
+        score = 0
+        for i, table in enumerate(self._eval_tables):
+            score += table[(env.boards[0] >> (i * 8)) & 0xFF]
+            score -= table[(env.boards[1] >> (i * 8)) & 0xFF]
+        return score if player_index == 0 else -score
+
+    def _play(self, env: Othello, action: int, h: int) -> Tuple[bool, int]:
+        """石を置いて手番を進める、(終了したか, 次の局面の hash)を返す"""
+        me = env.player_index
+        flips = env._calc_flips(me, action)
+        env.boards[me] |= flips | (1 << action)
+        env.boards[1 - me] &= ~flips
+        env._update_movables()
+
+        # hash の差分更新
+        h ^= self._zobrist[me][action]
+        while flips:
+            low = flips & -flips
+            a = low.bit_length() - 1
+            h ^= self._zobrist[me][a] ^ self._zobrist[1 - me][a]
+            flips ^= low
+
+        if env.movables[1 - me] == 0:
+            if env.movables[me] == 0:
+                return True, h
+            return False, h  # 相手はパス
+        env._player_index = 1 - me
+        return False, h ^ self._zobrist_turn
+
+    def _terminal_score(self, env: Othello, player_index: int) -> float:
+        p1_count = _bit_count(env.boards[0])
+        p2_count = _bit_count(env.boards[1])
+        if p1_count == p2_count:
+            return 0
+        score = _WIN_SCORE if p1_count > p2_count else -_WIN_SCORE
+        return score if player_index == 0 else -score
+
+    def _ordered_actions(self, env: Othello, best_action: int) -> List[int]:
+        movable = env.movables[env.player_index]
+        actions = [a for a, b in enumerate(_to_bits(movable, env.W * env.H)) if b]
+        # 前回の最善手、評価値の高いマスの順
+        actions.sort(key=lambda a: (a != best_action, -self.eval_field[a]))
+        return actions
+
+    def _search_root(self, env: Othello, depth: int) -> List[float]:
+        h = self._hash(env)
+        entry = self._tt[h % self.tt_size]
+        best_action = entry[4] if entry is not None and entry[0] == h else -1
 
-        key = str(env.field)
-        if key in Cpu.cache:
-            return Cpu.cache[key]
+        player_index = env.player_index
+        snap = env.snapshot()
+        scores = [-999.0 for _ in range(env.action_space.n)]
+        best = -np.inf
+        for a in self._ordered_actions(env, best_action):
+            done, n_h = self._play(env, a, h)
+            if done:
+                score = self._terminal_score(env, player_index)
+            elif env.player_index == player_index:
+                score = self._negamax(env, n_h, depth - 1, best - 1e-6, np.inf)
+            else:
+                score = -self._negamax(env, n_h, depth - 1, -np.inf, -(best - 1e-6))
+            env.restore_snapshot(snap)
+
+            # 最善手と同じ評価値の手は正確な値、それ以外は上限値になる
+            scores[a] = score
+            if best < score:
+                best = score
+                best_action = a
+        self._tt_store(h, depth, _TT_EXACT, best, best_action)
+        return scores
 
+    def _negamax(self, env: Othello, h: int, depth: int, alpha: float, beta: float) -> float:
         self._count += 1
+        if self._enable_timeout and self._count % 1000 == 0 and time.time() - self.t0 > self.timeout:
+            raise _SearchTimeout()
 
-        env_dat = env.backup()
         player_index = env.player_index
-        valid_actions = env.get_valid_actions(player_index)
-
-        scores = [-999.0 for _ in range(env.action_space.n)]
-        for a in valid_actions:
-            env.restore(env_dat)
-
-            # env stepを実施
-            _, r1, r2, done, _ = env.call_step(a)
-            if done:
-                # 終了状態なら報酬をスコアにする
-                if player_index == 0:
-                    scores[a] = r1 * 500
+        if depth <= 0:
+            return self._evaluate(env, player_index)
+
+        # --- 置換表
+        alpha_org = alpha
+        entry = self._tt[h % self.tt_size]
+        best_action = -1
+        if entry is not None and entry[0] == h:
+            best_action = entry[4]
+            if entry[1] >= depth:
+                if entry[2] == _TT_EXACT:
+                    return entry[3]
+                elif entry[2] == _TT_LOWER:
+                    alpha = max(alpha, entry[3])
                 else:
-                    scores[a] = r2 * 500
-            elif depth > self.max_depth:
-                # 評価値を返す
-                if self.eval_field is None:
-                    scores[a] = 0
-                else:
-                    scores[a] = np.sum(self.eval_field * env.field)
-                if player_index != 0:
-                    scores[a] = -scores[a]
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3]
+
+        snap = env.snapshot()
+        best = -np.inf
+        for a in self._ordered_actions(env, best_action):
+            done, n_h = self._play(env, a, h)
+            if done:
+                score = self._terminal_score(env, player_index)
+            elif env.player_index == player_index:
+                score = self._negamax(env, n_h, depth - 1, alpha, beta)  # 相手がパス
             else:
-                is_enemy = player_index != env.player_index
-                n_scores = self._negamax(env, depth + 1)
-                if is_enemy:
-                    scores[a] = -np.max(n_scores)
-                else:
-                    scores[a] = np.max(n_scores)
+                score = -self._negamax(env, n_h, depth - 1, -beta, -alpha)
+            env.restore_snapshot(snap)
+
+            if best < score:
+                best = score
+                best_action = a
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_org:
+            flag = _TT_UPPER
+        elif best >= beta:
+            flag = _TT_LOWER
+        else:
+            flag = _TT_EXACT
+        self._tt_store(h, depth, flag, best, best_action)
+        return best
 
-        Cpu.cache[key] = scores
-        return scores
+    def _tt_store(self, h: int, depth: int, flag: int, score: float, best_action: int) -> None:
+        idx = h % self.tt_size
+        entry = self._tt[idx]
+        # 別の局面か、同じ局面でより深い探索結果なら置き換える
+        if entry is None or entry[0] != h or entry[1] <= depth:
+            self._tt[idx] = (h, depth, flag, score, best_action)
 
     def render_terminal(self, _env: EnvRun, worker: WorkerRun, **kwargs) -> None:
         env = cast(Othello, _env.get_original_env())
         valid_actions = env.get_valid_actions(env.player_index)
 
-        print(f"- MinMax count: {self._render_count}, {self._render_time:.3f}s -")
+        print(f"- AlphaBeta depth: {self._render_depth}, count: {self._render_count}, {self._render_time:.3f}s -")
         for y in range(env.H):
             s = "|"
             for x in range(env.W):
@@ -510,12 +738,8 @@ class LayerProcessor(Processor):
         else:
             my_field = -1
             enemy_field = 1
+        observation = np.asarray(observation).reshape((env.H, env.W))
         _field = np.zeros((2, env.H, env.W))
-        for y in range(env.H):
-            for x in range(env.W):
-                idx = x + y * env.W
-                if observation[idx] == my_field:
-                    _field[0][y][x] = 1
-                elif observation[idx] == enemy_field:
-                    _field[1][y][x] = 1
+        _field[0][observation == my_field] = 1
+        _field[1][observation == enemy_field] = 1
         return _field
@@ -56,7 +56,7 @@ class OX(TurnBase2Player):
     def call_reset(self) -> Tuple[List[int], dict]:
         self.field = [0 for _ in range(self.W * self.H)]
         self._player_index = 0
-        return self.field, {}
+        return self.field[:], {}
 
     def backup(self) -> Any:
         return [self.field[:], self._player_index]
@@ -65,6 +65,13 @@ class OX(TurnBase2Player):
         self.field = data[0][:]
         self._player_index = data[1]
 
+    def snapshot(self) -> Any:
+        return tuple(self.field), self._player_index
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.field = list(data[0])
+        self._player_index = data[1]
+
     def call_step(self, action: int) -> Tuple[List[int], float, float, bool, dict]:
 
         reward1, reward2, done = self._step(action)
@@ -75,7 +82,7 @@ class OX(TurnBase2Player):
             else:
                 self._player_index = 0
 
-        return self.field, reward1, reward2, done, {}
+        return self.field[:], reward1, reward2, done, {}
 
     def _step(self, action):
 
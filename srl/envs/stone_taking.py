@@ -60,6 +60,12 @@ class StoneTaking(TurnBase2Player):
         self.field = data[0]
         self._player_index = data[1]
 
+    def snapshot(self) -> Any:
+        return self.field, self._player_index
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.field, self._player_index = data
+
     def call_step(self, action: int) -> Tuple[int, float, float, bool, dict]:
         action += 1
 
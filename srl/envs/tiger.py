@@ -71,6 +71,12 @@ class Tiger(SinglePlayEnv):
         self.tiger = State(d[0])
         self.state = State(d[1])
 
+    def snapshot(self) -> Any:
+        return self.tiger, self.state
+
+    def restore_snapshot(self, data: Any) -> None:
+        self.tiger, self.state = data
+
     def call_step(self, action_: int) -> Tuple[int, float, bool, dict]:
         action = Action(action_)
 
@@ -1,4 +1,3 @@
-import random
 from dataclasses import dataclass
 from typing import Any, List, Optional
 
@@ -7,7 +6,7 @@ from srl.base.rl.memory import Memory
 
 
 class SumTree:
-    """Segment Tree, full binary tree
+    """Segment Tree, full binary tree (numpy)
     all nodes: 2N-1
     left     : 2i+1
     right    : 2i+2
@@ -15,62 +14,43 @@ class SumTree:
     data -> tree index : j + N - 1
     tree index -> data : i - N + 1
 
-    --- N=5
+    N は capacity 以上の2のべき乗で、余った葉の priority は 0 です。
+    完全二分木なので、複数の値の探索や更新を深さ毎にまとめて行えます。
+
+    --- N=4 (capacity=3)
     data_index, tree_index: priority
-    0, 4: 10
-    1, 5: 2
-    2, 6: 5
-    3, 7: 8
-    4, 8: 4
+    0, 3: 10
+    1, 4: 2
+    2, 5: 5
+    -, 6: 0
 
     index tree
          0
        1─┴─2
       3┴4 5┴6
-     7┴8
 
     priority tree
-          29
-       22──┴──7
-      12┴10  2┴5
-     8┴4
+          17
+       12──┴──5
+      10┴2  5┴0
 
     """
 
     def __init__(self, capacity):
         self.capacity = capacity
+        self.leaf_num = 1
+        while self.leaf_num < capacity:
+            self.leaf_num *= 2
+        self.depth = self.leaf_num.bit_length() - 1
         self.write = 0
-        self.tree = [0 for _ in range(2 * self.capacity - 1)]
+        self.tree = np.zeros(2 * self.leaf_num - 1, dtype=np.float64)
         self.data = [None for _ in range(capacity)]
 
-    def _propagate(self, idx, change):
-        parent = (idx - 1) // 2
-
-        self.tree[parent] += change
-
-        if parent != 0:
-            self._propagate(parent, change)
-
-    def _retrieve(self, idx, val):
-        left = 2 * idx + 1
-
-        # 子がなければ該当
-        if left >= len(self.tree):
-            return idx
-
-        # left が val 以上なら左に移動
-        if val <= self.tree[left]:
-            return self._retrieve(left, val)
-        else:
-            # でなければ左の重さを引いて、右に移動
-            right = left + 1
-            return self._retrieve(right, val - self.tree[left])
-
-    def total(self):
-        return self.tree[0]
+    def total(self) -> float:
+        return float(self.tree[0])
 
     def add(self, priority, data):
-        tree_idx = self.write + self.capacity - 1
+        tree_idx = self.write + self.leaf_num - 1
 
         self.data[self.write] = data
         self.update(tree_idx, priority)
@@ -79,19 +59,43 @@ class SumTree:
         if self.write >= self.capacity:
             self.write = 0
 
-    def update(self, tree_idx, priority):
-        # numpyよりプリミティブ型の方が早い、再帰されるので無視できないレベルで違いが出る
-        priority = float(priority)
-        change = priority - self.tree[tree_idx]
-
-        self.tree[tree_idx] = priority
-        self._propagate(tree_idx, change)
+    def update(self, tree_idx: int, priority: float):
+        tree = self.tree
+        change = float(priority) - tree[tree_idx]
+        tree[tree_idx] = priority
+        while tree_idx != 0:
+            tree_idx = (tree_idx - 1) // 2
+            tree[tree_idx] += change
+
+    def update_batch(self, tree_indices: np.ndarray, priorities: np.ndarray):
+        tree = self.tree
+        tree[tree_indices] = priorities
+
+        # 深さ毎に親を子の合計で再計算
+        indices = np.unique(tree_indices)
+        for _ in range(self.depth):
+            indices = np.unique((indices - 1) // 2)
+            tree[indices] = tree[2 * indices + 1] + tree[2 * indices + 2]
+
+    def get_batch(self, vals: np.ndarray):
+        """vals それぞれに該当する葉を深さ毎にまとめて探索する"""
+        tree = self.tree
+        vals = np.asarray(vals, dtype=np.float64).copy()
+        indices = np.zeros(len(vals), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * indices + 1
+            left_val = tree[left]
+            # left が val 以上なら左に移動、でなければ左の重さを引いて右に移動
+            # (誤差で priority 0 の葉に行かないように右が 0 なら左に移動)
+            go_right = (vals > left_val) & (tree[left + 1] > 0)
+            vals -= left_val * go_right
+            indices = left + go_right
+        return indices, tree[indices]
 
     def get(self, val):
-        idx = self._retrieve(0, float(val))
-        data_idx = idx - self.capacity + 1
-
-        return (idx, self.tree[idx], self.data[data_idx])
+        indices, priorities = self.get_batch(np.array([val]))
+        idx = int(indices[0])
+        return (idx, float(priorities[0]), self.data[idx - self.leaf_num + 1])
 
 
 @dataclass
@@ -130,16 +134,13 @@ class ProportionalMemory(Memory):
             self.size = self.capacity
 
     def update(self, indices: List[int], batchs: List[Any], td_errors: np.ndarray) -> None:
-        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
-        for i in range(len(batchs)):
-            self.tree.update(indices[i], priorities[i])
-            if self.max_priority < priorities[i]:
-                self.max_priority = priorities[i]
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon) ** self.alpha
+        self.tree.update_batch(np.asarray(indices, dtype=np.int64), priorities)
+        max_priority = float(np.max(priorities))
+        if self.max_priority < max_priority:
+            self.max_priority = max_priority
 
     def sample(self, batch_size, step):
-        indices = []
-        batchs = []
-        weights = np.empty(batch_size, dtype=np.float32)
         total = self.tree.total()
 
         # βは最初は低く、学習終わりに1にする
@@ -147,28 +148,36 @@ class ProportionalMemory(Memory):
         if beta > 1:
             beta = 1
 
-        for i in range(batch_size):
-
+        if self.has_duplicate:
+            # 区間毎に1つずつ取り出す(stratified sampling)
+            segment = total / batch_size
+            vals = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+            indices, priorities = self.tree.get_batch(vals)
+        else:
+            # 重複を許可しない場合は区間に分けず、重複した分をやり直す
+            # (区間とやり直しを組み合わせると確率が priority に比例しなくなるため)
+            indices, priorities = self.tree.get_batch(np.random.random(batch_size) * total)
             for _ in range(9999):  # for safety
-                r = random.random() * total
-                idx, priority, batch = self.tree.get(r)
-
-                # 重複を許可しない場合はやり直す
-                if idx in indices and not self.has_duplicate:
-                    continue
-                break
-
-            indices.append(idx)
-            batchs.append(batch)
-
-            # 重要度サンプリングを計算 w = (N * pi)
-            prob = priority / total
-            weights[i] = (self.size * prob) ** (-beta)
+                _, first_idx = np.unique(indices, return_index=True)
+                dup = np.ones(batch_size, dtype=bool)
+                dup[first_idx] = False
+                if not dup.any():
+                    break
+                _indices, _priorities = self.tree.get_batch(np.random.random(dup.sum()) * total)
+                indices[dup] = _indices
+                priorities[dup] = _priorities
+
+        data_offset = self.tree.leaf_num - 1
+        batchs = [self.tree.data[i - data_offset] for i in indices]
+
+        # 重要度サンプリングを計算 w = (N * pi)
+        probs = priorities / total
+        weights = (self.size * probs) ** (-beta)
 
         # 最大値で正規化
-        weights = weights / weights.max()
+        weights = (weights / weights.max()).astype(np.float32)
 
-        return indices, batchs, weights
+        return indices.tolist(), batchs, weights
 
     def __len__(self):
         return self.size
@@ -177,7 +186,7 @@ class ProportionalMemory(Memory):
         data = []
         for i in range(self.size):
             d = self.tree.data[i]
-            priority = self.tree.tree[i + self.capacity - 1]
+            priority = float(self.tree.tree[i + self.tree.leaf_num - 1])
             data.append([d, priority])
         return data
 
@@ -1,22 +1,14 @@
-import bisect
 from dataclasses import dataclass
 from typing import Any, List, Optional
 
 import numpy as np
 from srl.base.rl.memory import Memory
-
-
-class _bisect_wrapper:
-    def __init__(self, priority, batch):
-        self.priority = priority
-        self.batch = batch
-
-    def __lt__(self, o):  # a<b
-        return self.priority < o.priority
+from srl.rl.memories.skiplist import IndexableSkipList
 
 
 @dataclass
 class RankBaseMemory(Memory):
+    is_sample_removal = True  # sample で取り出し、update で戻す
 
     capacity: int = 100_000
     alpha: float = 0.6
@@ -28,16 +20,14 @@ class RankBaseMemory(Memory):
         return "RankBaseMemory"
 
     def __post_init__(self):
+        # rank k(1～) の確率 (1/k)^a とその累積和は capacity 分を最初に計算しておく
+        self.probs = (1 / np.arange(1, self.capacity + 1)) ** self.alpha  # 降順
+        self.cumsum_probs = np.cumsum(self.probs)
         self.init()
 
     def init(self):
-        self.memory = []
+        self.memory = IndexableSkipList(self.capacity)  # priorityの昇順
         self.max_priority = 1.0
-        self.total = 0.0
-        self.probs = np.array([])
-        self.is_full = False
-
-        self.total_probs = []
 
     def add(self, batch, td_error: Optional[float] = None):
         if td_error is None:
@@ -47,19 +37,8 @@ class RankBaseMemory(Memory):
             if self.max_priority < priority:
                 self.max_priority = priority
 
-        bisect.insort(self.memory, _bisect_wrapper(priority, batch))
-
-        if not self.is_full:
-            p = (1 / len(self.memory)) ** self.alpha
-            self.total += p
-            self.probs = np.append(self.probs, p)  # 降順
-            self.total_probs.append(self.total)
-
-        if len(self.memory) == self.capacity:
-            self.is_full = True
-            self.probs /= self.total
-
-        elif len(self.memory) > self.capacity:
+        self.memory.insert(priority, batch)
+        if len(self.memory) > self.capacity:
             self.memory.pop(0)
 
     def update(self, indices: List[int], batchs: List[Any], td_errors: np.ndarray) -> None:
@@ -67,7 +46,7 @@ class RankBaseMemory(Memory):
             priority = float(abs(td_errors[i]))
             if self.max_priority < priority:
                 self.max_priority = priority
-            bisect.insort(self.memory, _bisect_wrapper(priority, batchs[i]))
+            self.memory.insert(priority, batchs[i])
 
     def sample(self, batch_size, step):
 
@@ -77,13 +56,20 @@ class RankBaseMemory(Memory):
             beta = 1
 
         N = len(self.memory)
-
-        if self.is_full:
-            probs = self.probs
-        else:
-            probs = self.probs / self.total
-
-        index_list = np.random.choice([i for i in range(N)], size=batch_size, replace=False, p=probs)
+        total = self.cumsum_probs[N - 1]
+
+        # 累積和から rank を選ぶ、重複した分はやり直す
+        index_list = np.searchsorted(self.cumsum_probs[:N], np.random.random(batch_size) * total, side="right")
+        for _ in range(9999):  # for safety
+            _, first_idx = np.unique(index_list, return_index=True)
+            dup = np.ones(batch_size, dtype=bool)
+            dup[first_idx] = False
+            if not dup.any():
+                break
+            index_list[dup] = np.searchsorted(
+                self.cumsum_probs[:N], np.random.random(dup.sum()) * total, side="right"
+            )
+        index_list = np.minimum(index_list, N - 1)
         index_list.sort()
 
         batchs = []
@@ -91,10 +77,10 @@ class RankBaseMemory(Memory):
 
         for i, index in enumerate(index_list):
             memory_idx = N - 1 - index
-            o = self.memory.pop(memory_idx)  # 後ろから取得してindexの変化を防ぐ
+            _, batch = self.memory.pop(memory_idx)  # 後ろから取得してindexの変化を防ぐ
 
-            batchs.append(o.batch)
-            prob = probs[index]
+            batchs.append(batch)
+            prob = self.probs[index] / total
             weights[i] = (N * prob) ** (-beta)
 
         # 最大値で正規化
@@ -107,18 +93,13 @@ class RankBaseMemory(Memory):
 
     def backup(self):
         return [
-            [(o.priority, o.batch) for o in self.memory],
+            list(self.memory),
             self.max_priority,
-            self.total,
-            self.probs.tolist(),
-            self.is_full,
         ]
 
     def restore(self, data):
+        # 以前の形式 [memory, max_priority, total, probs, is_full] も読み込めます
         self.init()
         for d in data[0]:
-            self.memory.append(_bisect_wrapper(d[0], d[1]))
+            self.memory.insert(d[0], d[1])
         self.max_priority = data[1]
-        self.total = data[2]
-        self.probs = np.array(data[3])
-        self.is_full = data[4]
@@ -1,4 +1,3 @@
-import bisect
 import math
 import random
 from dataclasses import dataclass
@@ -6,6 +5,7 @@ from typing import Any, List, Optional
 
 import numpy as np
 from srl.base.rl.memory import Memory
+from srl.rl.memories.skiplist import IndexableSkipList
 
 
 def rank_sum(k, a):
@@ -19,20 +19,9 @@ def rank_sum_inverse(k, a):
     return t / (2 * a)
 
 
-class _bisect_wrapper:
-    def __init__(self, priority, batch):
-        self.priority = priority
-        self.batch = batch
-
-    def __lt__(self, o):  # a<b
-        return self.priority < o.priority
-
-
-# TODO: 赤黒木
-
-
 @dataclass
 class RankBaseMemoryLinear(Memory):
+    is_sample_removal = True  # sample で取り出し、update で戻す
 
     capacity: int = 100_000
     alpha: float = 1.0
@@ -47,7 +36,7 @@ class RankBaseMemoryLinear(Memory):
         self.init()
 
     def init(self):
-        self.memory = []
+        self.memory = IndexableSkipList(self.capacity)  # priorityの昇順
         self.max_priority = 1
 
     def add(self, batch, td_error: Optional[float] = None):
@@ -61,14 +50,14 @@ class RankBaseMemoryLinear(Memory):
         if len(self.memory) >= self.capacity:
             self.memory.pop(0)
 
-        bisect.insort(self.memory, _bisect_wrapper(priority, batch))
+        self.memory.insert(priority, batch)
 
     def update(self, indices: List[int], batchs: List[Any], td_errors: np.ndarray) -> None:
         for i in range(len(batchs)):
             priority = float(abs(td_errors[i]))
             if self.max_priority < priority:
                 self.max_priority = priority
-            bisect.insort(self.memory, _bisect_wrapper(priority, batchs[i]))
+            self.memory.insert(priority, batchs[i])
 
     def sample(self, batch_size, step):
         batchs = []
@@ -96,8 +85,8 @@ class RankBaseMemoryLinear(Memory):
 
         index_list.sort(reverse=True)
         for i, index in enumerate(index_list):
-            o = self.memory.pop(index)  # 後ろから取得するのでindexに変化なし
-            batchs.append(o.batch)
+            _, batch = self.memory.pop(index)  # 後ろから取得するのでindexに変化なし
+            batchs.append(batch)
 
             # 重点サンプリングを計算 w = (N * p)^-1
             r1 = rank_sum(index + 1, self.alpha)
@@ -114,12 +103,12 @@ class RankBaseMemoryLinear(Memory):
 
     def backup(self):
         return [
-            [(d.priority, d.batch) for d in self.memory],
+            list(self.memory),
             self.max_priority,
         ]
 
     def restore(self, data):
-        self.memory = []
+        self.init()
         for d in data[0]:
-            self.memory.append(_bisect_wrapper(d[0], d[1]))
+            self.memory.insert(d[0], d[1])
         self.max_priority = data[1]
@@ -0,0 +1,112 @@
+import math
+import random
+from typing import Any, Iterator, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ("priority", "batch", "next", "width")
+
+    def __init__(self, priority: float, batch: Any, level: int):
+        self.priority = priority
+        self.batch = batch
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    """priority の昇順に並ぶ skip list
+    各リンクが飛ばす要素数(width)を持っているので、順位(index)による取得/削除も O(log n) でできます。
+
+    insert    : O(log n) 同じpriorityは後ろに入る(bisect.insort と同じ)
+    pop(index): O(log n) index は昇順での位置(0が最小、負の値は後ろから)
+    """
+
+    def __init__(self, expected_size: int = 100_000):
+        self.max_level = max(1, int(math.log2(max(expected_size, 2))) + 1)
+        self._nil = _Node(math.inf, None, 0)
+        self.clear()
+
+    def clear(self) -> None:
+        self.head = _Node(-math.inf, None, self.max_level)
+        self.head.next = [self._nil] * self.max_level
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.max_level and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, priority: float, batch: Any) -> None:
+        chain = [self.head] * self.max_level
+        steps_at_level = [0] * self.max_level
+        node = self.head
+        for level in range(self.max_level - 1, -1, -1):
+            while node.next[level].priority <= priority:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        d = self._random_level()
+        new_node = _Node(priority, batch, d)
+        steps = 0
+        for level in range(d):
+            prev_node = chain[level]
+            new_node.next[level] = prev_node.next[level]
+            prev_node.next[level] = new_node
+            new_node.width[level] = prev_node.width[level] - steps
+            prev_node.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(d, self.max_level):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def pop(self, index: int = 0) -> Tuple[float, Any]:
+        if index < 0:
+            index += self.size
+        if not (0 <= index < self.size):
+            raise IndexError("pop index out of range")
+
+        # 各levelで index の直前のnodeを探す
+        chain = [self.head] * self.max_level
+        node = self.head
+        pos = 0  # head の位置を 0 、要素 i の位置を i+1 とする
+        for level in range(self.max_level - 1, -1, -1):
+            while pos + node.width[level] <= index:
+                pos += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        d = len(target.next)
+        for level in range(d):
+            prev_node = chain[level]
+            prev_node.width[level] += target.width[level] - 1
+            prev_node.next[level] = target.next[level]
+        for level in range(d, self.max_level):
+            chain[level].width[level] -= 1
+        self.size -= 1
+        return target.priority, target.batch
+
+    def get(self, index: int) -> Tuple[float, Any]:
+        if index < 0:
+            index += self.size
+        if not (0 <= index < self.size):
+            raise IndexError("index out of range")
+        node = self.head
+        pos = -1
+        for level in range(self.max_level - 1, -1, -1):
+            while pos + node.width[level] <= index:
+                pos += node.width[level]
+                node = node.next[level]
+        return node.priority, node.batch
+
+    def __iter__(self) -> Iterator[Tuple[float, Any]]:
+        node: Optional[_Node] = self.head.next[0]
+        while node is not self._nil:
+            assert node is not None
+            yield node.priority, node.batch
+            node = node.next[0]
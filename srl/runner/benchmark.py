@@ -0,0 +1,379 @@
+"""
+各アルゴリズム × env の処理速度を計測し、結果をjsonファイルに保存/比較します
+
+計測:
+    sequence : 1プロセスでの学習(env step/s, train/s)
+    trainer  : 事前に集めたmemoryでの学習のみ(train/s)
+    mp       : actor/trainerを分けた分散学習(env step/s, train/s)
+    共通で peak_rss(byte, 計測したプロセスとその子プロセスの最大値) と
+    memory_bytes_per_transition(remote_memoryのbackupを1遷移あたりにしたbyte数) を記録します
+
+使い方:
+    python -m srl.runner.benchmark run -o results.json --envs Grid OX --algorithms ql dqn
+    python -m srl.runner.benchmark compare old.json new.json --threshold 0.1
+
+各計測は別プロセスで実行します(peak_rss を計測毎に取得するためと、例外/TFの状態を分離するため)
+"""
+import argparse
+import datetime as dt
+import importlib
+import json
+import logging
+import pickle
+import pkgutil
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+import srl
+from srl.base.rl.base import RLRemoteMemory
+from srl.runner.callback import Callback
+from srl.runner.config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENVS = ["Grid", "OX", "Othello", "ConnectX", "Pendulum-v1"]
+MODES = ["sequence", "trainer", "mp"]
+
+# 大きい方が良い/小さい方が良い指標
+_HIGHER_IS_BETTER = ["steps_per_sec", "train_per_sec"]
+_LOWER_IS_BETTER = ["peak_rss", "memory_bytes_per_transition"]
+
+_RESULT_PREFIX = "SRL_BENCHMARK_RESULT "
+
+
+def get_algorithm_names() -> List[str]:
+    import srl.algorithms
+
+    return sorted([m.name for m in pkgutil.iter_modules(srl.algorithms.__path__)])
+
+
+def _import_envs() -> None:
+    # srl.envs は import 時に登録されるので全て読み込む
+    import srl.envs
+
+    for m in pkgutil.iter_modules(srl.envs.__path__):
+        try:
+            importlib.import_module(f"srl.envs.{m.name}")
+        except Exception:
+            logger.debug(traceback.format_exc())
+
+
+class _ThroughputCounter(Callback):
+    """stepとtrainの回数を数えます(mpの子プロセスからも集計できるように共有メモリに加算)"""
+
+    def __init__(self):
+        import multiprocessing as mp
+
+        # mp.train の子プロセスは spawn で作られるので、同じ context の値を渡す
+        ctx = mp.get_context("spawn")
+        self.step_count = ctx.Value("q", 0)
+        self.train_count = ctx.Value("q", 0)
+
+    def on_episodes_begin(self, info) -> None:
+        self._step = 0
+
+    def on_step_end(self, info) -> None:
+        self._step += 1
+
+    def on_episodes_end(self, info) -> None:
+        with self.step_count.get_lock():
+            self.step_count.value += self._step
+        if info["trainer"] is not None:
+            with self.train_count.get_lock():
+                self.train_count.value += info["trainer"].get_train_count()
+
+    def on_trainer_end(self, info) -> None:
+        with self.train_count.get_lock():
+            self.train_count.value += info["train_count"]
+
+
+def _get_peak_rss() -> int:
+    try:
+        import resource
+    except ImportError:  # windows
+        return -1
+    rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    if sys.platform != "darwin":
+        rss *= 1024  # KB
+    return rss
+
+
+def _get_memory_bytes_per_transition(remote_memory: Optional[RLRemoteMemory]) -> Optional[float]:
+    if remote_memory is None or remote_memory.length() == 0:
+        return None
+    b = pickle.dumps(remote_memory.backup(compress=False), protocol=pickle.HIGHEST_PROTOCOL)
+    return len(b) / remote_memory.length()
+
+
+def run_case(
+    algorithm: str,
+    env: str,
+    mode: str,
+    timeout: float = 10,
+    trainer_fill_steps: int = 2000,
+    actor_num: int = 2,
+) -> Dict[str, Any]:
+    """1つの組み合わせを現在のプロセスで計測します"""
+    from srl import runner
+
+    assert mode in MODES, f"unknown mode: {mode}"
+    result: Dict[str, Any] = {
+        "algorithm": algorithm,
+        "env": env,
+        "mode": mode,
+        "status": "ok",
+    }
+
+    # --- config(作れない組み合わせはskip)
+    _import_envs()
+    try:
+        rl_config = importlib.import_module(f"srl.algorithms.{algorithm}").Config()
+        config = Config(srl.EnvConfig(env), rl_config, actor_num=actor_num)
+        config.assert_params()
+    except Exception as e:
+        result["status"] = "skip"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        return result
+
+    counter = _ThroughputCounter()
+    _common = dict(
+        enable_evaluation=False,
+        print_progress=False,
+        enable_file_logger=False,
+        callbacks=[counter],
+    )
+    try:
+        memory_bytes = None
+        if mode == "sequence":
+            t0 = time.time()
+            _, remote_memory, _ = runner.train(config, timeout=timeout, enable_profiling=False, **_common)
+            elapsed = time.time() - t0
+            memory_bytes = _get_memory_bytes_per_transition(remote_memory)
+        elif mode == "trainer":
+            _, remote_memory, _ = runner.train(
+                config,
+                max_steps=trainer_fill_steps,
+                disable_trainer=True,
+                enable_profiling=False,
+                enable_evaluation=False,
+                print_progress=False,
+                enable_file_logger=False,
+            )
+            # sequence系のmemoryは学習で空になるので学習前に計測
+            memory_bytes = _get_memory_bytes_per_transition(remote_memory)
+            t0 = time.time()
+            runner.train_only(
+                config,
+                remote_memory=remote_memory,
+                timeout=timeout,
+                print_progress=False,
+                enable_file_logger=False,
+                callbacks=[counter],
+            )
+            elapsed = time.time() - t0
+        else:
+            t0 = time.time()
+            runner.mp_train(config, timeout=timeout, enable_profiling=False, **_common)
+            elapsed = time.time() - t0
+    except Exception as e:
+        logger.info(traceback.format_exc())
+        result["status"] = "error"
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        return result
+
+    step_count = counter.step_count.value
+    train_count = counter.train_count.value
+    result["elapsed"] = elapsed
+    result["steps"] = step_count
+    result["train"] = train_count
+    result["steps_per_sec"] = step_count / elapsed if mode != "trainer" else None
+    result["train_per_sec"] = train_count / elapsed
+    result["peak_rss"] = _get_peak_rss()
+    result["memory_bytes_per_transition"] = memory_bytes
+    return result
+
+
+def _run_case_subprocess(algorithm: str, env: str, mode: str, timeout: float, **kwargs) -> Dict[str, Any]:
+    cmd = [
+        sys.executable,
+        "-m",
+        "srl.runner.benchmark",
+        "case",
+        algorithm,
+        env,
+        mode,
+        "--timeout",
+        str(timeout),
+        "--kwargs",
+        json.dumps(kwargs),
+    ]
+    result = {"algorithm": algorithm, "env": env, "mode": mode}
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout * 5 + 300)
+    except subprocess.TimeoutExpired:
+        result["status"] = "error"
+        result["error"] = "TimeoutExpired"
+        return result
+    for line in proc.stdout.splitlines():
+        if line.startswith(_RESULT_PREFIX):
+            return json.loads(line[len(_RESULT_PREFIX) :])
+    result["status"] = "error"
+    result["error"] = f"exitcode {proc.returncode}: {proc.stderr.strip()[-500:]}"
+    return result
+
+
+def run(
+    path: str,
+    algorithms: List[str] = [],
+    envs: List[str] = DEFAULT_ENVS,
+    modes: List[str] = MODES,
+    timeout: float = 10,
+    trainer_fill_steps: int = 2000,
+    actor_num: int = 2,
+    isolate: bool = True,
+) -> List[Dict[str, Any]]:
+    """指定した組み合わせを全て計測し、path に json で保存します
+
+    Args:
+        algorithms: 空の場合は srl.algorithms 内の全アルゴリズム
+        isolate: Trueの場合、各計測を別プロセスで実行
+    """
+    if len(algorithms) == 0:
+        algorithms = get_algorithm_names()
+    kwargs = dict(trainer_fill_steps=trainer_fill_steps, actor_num=actor_num)
+
+    results = []
+    for algorithm in algorithms:
+        for env in envs:
+            for mode in modes:
+                if isolate:
+                    r = _run_case_subprocess(algorithm, env, mode, timeout, **kwargs)
+                else:
+                    r = run_case(algorithm, env, mode, timeout, **kwargs)
+                logger.info(f"{algorithm:20s} {env:12s} {mode:8s} {r['status']}")
+                results.append(r)
+
+    d = {
+        "date": dt.datetime.now().strftime("%Y/%m/%d %H:%M:%S"),
+        "version": srl.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timeout": timeout,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(d, f, indent=2)
+    return results
+
+
+def compare(old_path: str, new_path: str, threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """2つの結果ファイルを比較します
+
+    Returns:
+        List[Dict[str, Any]]: 各組み合わせ/指標毎の比較、threshold以上悪化したものは regression=True
+    """
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["algorithm"], r["env"], r["mode"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = {(r["algorithm"], r["env"], r["mode"]): r for r in json.load(f)["results"]}
+
+    rows = []
+    for key, n in new.items():
+        o = old.get(key, None)
+        if o is None or o["status"] != "ok":
+            continue
+        if n["status"] != "ok":
+            rows.append({"case": key, "metric": "status", "old": o["status"], "new": n["status"], "regression": True})
+            continue
+        for metric in _HIGHER_IS_BETTER + _LOWER_IS_BETTER:
+            o_val = o.get(metric, None)
+            n_val = n.get(metric, None)
+            if o_val is None or n_val is None or o_val <= 0:
+                continue
+            ratio = n_val / o_val
+            if metric in _HIGHER_IS_BETTER:
+                regression = ratio < 1 - threshold
+            else:
+                regression = ratio > 1 + threshold
+            rows.append(
+                {
+                    "case": key,
+                    "metric": metric,
+                    "old": o_val,
+                    "new": n_val,
+                    "ratio": ratio,
+                    "regression": regression,
+                }
+            )
+    return rows
+
+
+def print_compare(rows: List[Dict[str, Any]]) -> None:
+    for r in rows:
+        case = "/".join(r["case"])
+        mark = "NG" if r["regression"] else "  "
+        if r["metric"] == "status":
+            print(f"{mark} {case:40s} {r['metric']:28s} {r['old']} -> {r['new']}")
+        else:
+            print(f"{mark} {case:40s} {r['metric']:28s} {r['old']:12.1f} -> {r['new']:12.1f} ({r['ratio']:.2f}x)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="srl throughput benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run")
+    p.add_argument("-o", "--output", default="benchmark.json")
+    p.add_argument("--algorithms", nargs="*", default=[])
+    p.add_argument("--envs", nargs="*", default=DEFAULT_ENVS)
+    p.add_argument("--modes", nargs="*", default=MODES, choices=MODES)
+    p.add_argument("--timeout", type=float, default=10)
+    p.add_argument("--trainer_fill_steps", type=int, default=2000)
+    p.add_argument("--actor_num", type=int, default=2)
+    p.add_argument("--no_isolate", action="store_true")
+
+    p = sub.add_parser("compare")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.1)
+
+    p = sub.add_parser("case")  # run から別プロセスで実行される用
+    p.add_argument("algorithm")
+    p.add_argument("env")
+    p.add_argument("mode")
+    p.add_argument("--timeout", type=float, default=10)
+    p.add_argument("--kwargs", default="{}")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        run(
+            args.output,
+            args.algorithms,
+            args.envs,
+            args.modes,
+            args.timeout,
+            args.trainer_fill_steps,
+            args.actor_num,
+            isolate=not args.no_isolate,
+        )
+    elif args.command == "compare":
+        rows = compare(args.old, args.new, args.threshold)
+        print_compare(rows)
+        if any([r["regression"] for r in rows]):
+            return 1
+    elif args.command == "case":
+        r = run_case(args.algorithm, args.env, args.mode, args.timeout, **json.loads(args.kwargs))
+        print(_RESULT_PREFIX + json.dumps(r))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
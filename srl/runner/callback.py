@@ -1,4 +1,5 @@
 from abc import ABC
+from typing import Any, Callable, List
 
 
 class Callback(ABC):
@@ -70,3 +71,47 @@ class GameCallback(ABC):
 
     def on_game_step_end(self, info) -> None:
         pass  # do nothing
+
+
+class CallbackHooks:
+    """callbacks のうち、hook を override しているものだけを hook 毎に保持します
+
+    何もしない hook の呼び出しを毎step行わないよう、ループの開始時に1回作成します。
+    (例) [f(info) for f in hooks.on_step_end]
+    """
+
+    on_episodes_begin: List[Callable]
+    on_episodes_end: List[Callable]
+    on_episode_begin: List[Callable]
+    on_episode_end: List[Callable]
+    on_step_action_before: List[Callable]
+    on_step_begin: List[Callable]
+    on_step_end: List[Callable]
+    on_skip_step: List[Callable]
+    intermediate_stop: List[Callable]
+    on_trainer_start: List[Callable]
+    on_trainer_train: List[Callable]
+    on_trainer_end: List[Callable]
+    on_init: List[Callable]
+    on_start: List[Callable]
+    on_polling: List[Callable]
+    on_end: List[Callable]
+
+    def __init__(self, callbacks: List[Any], base: type = Callback):
+        self.callbacks = callbacks
+        for name, v in base.__dict__.items():
+            if name.startswith("_") or not callable(v):
+                continue
+            setattr(self, name, [getattr(c, name) for c in callbacks if self._is_override(c, name, base)])
+
+    @staticmethod
+    def _is_override(callback: Any, name: str, base: type) -> bool:
+        if name in getattr(callback, "__dict__", {}):
+            return True
+        return getattr(type(callback), name, None) is not getattr(base, name)
+
+    def intermediate_stop_any(self, info) -> bool:
+        # 副作用がある場合もあるので全callbackを呼ぶ
+        if len(self.intermediate_stop) == 0:
+            return False
+        return True in [f(info) for f in self.intermediate_stop]
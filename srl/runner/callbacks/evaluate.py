@@ -1,9 +1,13 @@
 import logging
+import multiprocessing as mp
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Union
+from typing import Any, List, Optional, Union
 
 import numpy as np
 from srl.base.define import PlayRenderMode
+from srl.base.env import registration as env_registration
 from srl.base.rl.config import RLConfig
 from srl.runner.callback import Callback
 from srl.runner.config import Config
@@ -12,6 +16,17 @@ from srl.runner.play_sequence import play
 logger = logging.getLogger(__name__)
 
 
+def _play_async(eval_config: Config, params: Any, env_entry: Optional[dict]) -> np.ndarray:
+    # 評価用プロセスで実行
+    # spawnしたプロセスでは実行元で登録したenvが登録されていないので登録する
+    env_registration.register_entry(eval_config.env_config.name, env_entry)
+
+    parameter = eval_config.make_parameter(is_load=False)
+    parameter.restore(params)
+    eval_rewards, _, _, _ = play(eval_config, parameter=parameter)
+    return np.mean(eval_rewards, axis=0)
+
+
 @dataclass
 class Evaluate(Callback):
 
@@ -20,11 +35,18 @@ class Evaluate(Callback):
     num_episode: int = 1
     eval_players: List[Union[None, str, RLConfig]] = field(default_factory=list)
 
+    # 別プロセスで評価し、学習を止めない(結果は届いた後の info["eval_rewards"] に入ります)
+    enable_async: bool = False
+    async_workers: int = 1  # 評価用プロセス数(同時に実行できる評価数)
+
     def __post_init__(self):
         self.eval_config = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.futures: List[Future] = []
 
     def _create_eval_config(self, config: Config):
-        eval_config = config.copy(env_share=self.env_sharing)
+        # 別プロセスに送るのでenvは共有しない
+        eval_config = config.copy(env_share=self.env_sharing and not self.enable_async)
         eval_config.players = self.eval_players[:]
         eval_config.rl_config.remote_memory_path = ""
 
@@ -37,6 +59,7 @@ class Evaluate(Callback):
         eval_config.disable_trainer = True
         eval_config.render_mode = PlayRenderMode.none
         eval_config.enable_profiling = False
+        eval_config.enable_phase_profiler = False
         # callbacks
         eval_config.callbacks = []
 
@@ -47,6 +70,45 @@ class Evaluate(Callback):
         eval_config.run_name = "eval"
         return eval_config
 
+    def _evaluate(self, info) -> None:
+        if not self.enable_async:
+            eval_rewards, _, _, _ = play(
+                self.eval_config,
+                parameter=info["parameter"],
+            )
+            info["eval_rewards"] = np.mean(eval_rewards, axis=0)
+            return
+
+        if self.executor is None:
+            # tensorflow等の状態を引き継がないように spawn
+            self.executor = ProcessPoolExecutor(self.async_workers, mp_context=mp.get_context("spawn"))
+        if len(self.futures) >= self.async_workers:
+            # 評価が追いついていない場合は今回の評価は飛ばす(学習は待たない)
+            logger.debug("skip evaluation(all evaluation processes are busy)")
+            return
+        params = info["parameter"].backup()
+        env_entry = env_registration.get_entry(self.eval_config.env_config.name)
+        self.futures.append(self.executor.submit(_play_async, self.eval_config, params, env_entry))
+
+    def _recv_async(self, info) -> None:
+        # 届いた評価結果を古いものから1つずつ info に入れる
+        if len(self.futures) == 0 or not self.futures[0].done():
+            return
+        future = self.futures.pop(0)
+        try:
+            info["eval_rewards"] = future.result()
+        except Exception:
+            logger.warning(traceback.format_exc())
+
+    def _close_async(self) -> None:
+        if self.executor is None:
+            return
+        for f in self.futures:
+            f.cancel()
+        self.executor.shutdown(wait=True)
+        self.executor = None
+        self.futures = []
+
     def on_episodes_begin(self, info) -> None:
         if info["actor_id"] != 0:
             return
@@ -58,15 +120,15 @@ class Evaluate(Callback):
         if self.eval_config is None:
             return
 
+        self._recv_async(info)
         self.eval_episode += 1
         if self.eval_episode > self.interval:
-            eval_rewards, _, _, _ = play(
-                self.eval_config,
-                parameter=info["parameter"],
-            )
-            info["eval_rewards"] = np.mean(eval_rewards, axis=0)
+            self._evaluate(info)
             self.eval_episode = 0
 
+    def on_episodes_end(self, info) -> None:
+        self._close_async()
+
     # --- Trainer
     def on_trainer_start(self, info) -> None:
         config: Config = info["config"]
@@ -79,10 +141,10 @@ class Evaluate(Callback):
         if self.eval_config is None:
             return
 
+        self._recv_async(info)
         train_count = info["train_count"]
         if train_count % (self.interval + 1) == 0:
-            eval_rewards, _, _, _ = play(
-                self.eval_config,
-                parameter=info["parameter"],
-            )
-            info["eval_rewards"] = np.mean(eval_rewards, axis=0)
+            self._evaluate(info)
+
+    def on_trainer_end(self, info) -> None:
+        self._close_async()
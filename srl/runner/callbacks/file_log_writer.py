@@ -16,6 +16,7 @@ from srl.base.env.base import EnvRun
 from srl.base.rl.worker import WorkerRun
 from srl.runner.callback import Callback, GameCallback
 from srl.runner.config import Config
+from srl.utils import profiler
 from srl.utils.common import JsonNumpyEncoder, summarize_info_from_list
 
 logger = logging.getLogger(__name__)
@@ -26,7 +27,9 @@ tmp/
    ├ train_log/
    │ ├ actorX.txt
    │ ├ trainer.txt
-   │ └ system.txt
+   │ ├ system.txt
+   │ ├ profile_actorX.txt  (enable_phase_profiler)
+   │ └ profile_trainer.txt (enable_phase_profiler)
    │
    ├ episode_log/
    │ └ episodeX.txt
@@ -74,6 +77,29 @@ class FileLogWriter(Callback, GameCallback):
         fp.write(json.dumps(d, cls=JsonNumpyEncoder) + "\n")
         fp.flush()
 
+    def _open_profile_log(self, name: str, mode: str = "w"):
+        prof = profiler.get()
+        if prof is None:
+            self.fp_dict["profile"] = None
+            return
+        self.fp_dict["profile"] = open(os.path.join(self.train_log_dir, f"profile_{name}.txt"), mode, encoding="utf-8")
+        self.profile_snapshot = prof.snapshot()
+
+    def _write_profile_log(self):
+        prof = profiler.get()
+        if prof is None or self.fp_dict.get("profile", None) is None:
+            return
+        snapshot = prof.snapshot()
+        phases = profiler.summarize(snapshot, self.profile_snapshot, with_hist=True)
+        self.profile_snapshot = snapshot
+        if len(phases) == 0:
+            return
+        d = {
+            "date": dt.datetime.now().strftime("%Y/%m/%d %H:%M:%S"),
+            "phases": phases,
+        }
+        self._write_log(self.fp_dict["profile"], d)
+
     def on_init(self, info) -> None:
         self._init_dir(info["config"])
 
@@ -148,6 +174,7 @@ class FileLogWriter(Callback, GameCallback):
         self._init_dir(config)
         self._write_config_summary(config)
         self.fp_dict["trainer"] = open(os.path.join(self.train_log_dir, "trainer.txt"), "w", encoding="utf-8")
+        self._open_profile_log("trainer")
 
         _time = time.time()
 
@@ -197,6 +224,7 @@ class FileLogWriter(Callback, GameCallback):
                 self._save_parameter(info["parameter"], info["train_count"])
 
     def _write_trainer_log(self):
+        self._write_profile_log()
         if self.fp_dict["trainer"] is None:
             return
         if len(self.log_history) == 0:
@@ -248,14 +276,17 @@ class FileLogWriter(Callback, GameCallback):
         self.player_num = info["env"].player_num
         self.actor_id = info["actor_id"]
 
+        # 再起動した actor は前回のログに追記する
+        mode = "w" if info["config"].run_actor_restart_num == 0 else "a"
         self.fp_dict["actor"] = open(
-            os.path.join(self.train_log_dir, f"actor{self.actor_id}.txt"), "w", encoding="utf-8"
+            os.path.join(self.train_log_dir, f"actor{self.actor_id}.txt"), mode, encoding="utf-8"
         )
         if self.actor_id == 0:
-            self.fp_dict["system"] = open(os.path.join(self.train_log_dir, "system.txt"), "w", encoding="utf-8")
+            self.fp_dict["system"] = open(os.path.join(self.train_log_dir, "system.txt"), mode, encoding="utf-8")
         else:
             self.fp_dict["system"] = None
         self.fp_dict["episode"] = None
+        self._open_profile_log(f"actor{self.actor_id}", mode)
 
         self.log_history = []
         self.log_t0 = time.time()
@@ -310,7 +341,7 @@ class FileLogWriter(Callback, GameCallback):
         if _time - self.log_t0 > self.train_log_interval:
             self.log_t0 = _time
             self._write_actor_log()
-            self._write_system_log(info["config"])
+            self._write_system_log(info)
 
     def on_episode_end(self, info):
         if self.actor_id == 0 and self.enable_episode_log:
@@ -355,6 +386,7 @@ class FileLogWriter(Callback, GameCallback):
         self.log_history.append(d)
 
     def _write_actor_log(self):
+        self._write_profile_log()
         if self.fp_dict["actor"] is None:
             return
         if len(self.log_history) == 0:
@@ -381,11 +413,14 @@ class FileLogWriter(Callback, GameCallback):
         self._write_log(self.fp_dict["actor"], d)
         self.log_history = []
 
-    def _write_system_log(self, config: Config):
+    def _write_system_log(self, info):
         if self.fp_dict["system"] is None:
             return
+        config: Config = info["config"]
 
         d: Dict[str, Any] = {"date": dt.datetime.now().strftime("%Y/%m/%d %H:%M:%S")}
+        if "actor_restart_count" in info:
+            d["actor_restart_count"] = info["actor_restart_count"]
         if config.enable_ps:
             try:
                 import psutil
@@ -9,6 +9,7 @@ import numpy as np
 
 from srl.runner.callback import Callback
 from srl.runner.config import Config
+from srl.utils import profiler
 from srl.utils.common import listdictdict_to_dictlist, summarize_info_from_dictlist, to_str_time
 
 logger = logging.getLogger(__name__)
@@ -96,6 +97,7 @@ class PrintProgress(Callback):
 
         self.progress_t0 = self.t0 = time.time()
         self.progress_history = []
+        self._init_profile()
 
     def on_episodes_end(self, info):
         if self.actor_id >= self.max_actor:
@@ -162,6 +164,8 @@ class PrintProgress(Callback):
         }
         if "sync" in info:
             d["sync"] = info["sync"]
+        if "staged" in info:
+            d["staged"] = info["staged"]
 
         # train info
         if self.history_step[0]["train_info"] is not None:
@@ -266,6 +270,10 @@ class PrintProgress(Callback):
                 sync = max([h["sync"] for h in self.progress_history])
                 s += f", {sync:3d} recv"
 
+            # [staged]
+            if "staged" in self.progress_history[-1]:
+                s += f", {self.progress_history[-1]['staged']:3d} staged"
+
             # [memory_system]
             s += self._memory_system_str(self.last_memory)
 
@@ -277,6 +285,7 @@ class PrintProgress(Callback):
             if self.print_train_info:
                 s += self._info_str(self.progress_history, "train_info")
 
+        s += self._profile_str()
         print(s)
         self.progress_history = []
 
@@ -357,6 +366,32 @@ class PrintProgress(Callback):
                 s += f"|{k} {v}"
         return s
 
+    def _init_profile(self):
+        prof = profiler.get()
+        self.profile_snapshot = None if prof is None else prof.snapshot()
+
+    def _profile_str(self) -> str:
+        # |prof trainer.train 40%(0.300ms)[remote_memory.sample 10%] env.step 30%(0.100ms) ...
+        # 子の処理は親の中に含まれるので、親の後ろに [] で表示
+        prof = profiler.get()
+        if prof is None or self.profile_snapshot is None:
+            return ""
+        snapshot = prof.snapshot()
+        d = profiler.summarize(snapshot, self.profile_snapshot)
+        self.profile_snapshot = snapshot
+        if len(d) == 0:
+            return ""
+        s = "|prof"
+        for k, v in sorted(d.items(), key=lambda x: -x[1]["total"]):
+            if "/" in k:
+                continue
+            s += f" {k} {v.get('ratio', 0) * 100:.0f}%({v['mean'] * 1000:.3f}ms)"
+            children = [(k2[len(k) + 1 :], v2) for k2, v2 in d.items() if "/" in k2 and k2.rsplit("/", 1)[0] == k]
+            if len(children) > 0:
+                children.sort(key=lambda x: -x[1]["total"])
+                s += "[" + " ".join([f"{k2} {v2.get('ratio', 0) * 100:.0f}%" for k2, v2 in children]) + "]"
+        return s
+
     # ----------------------------------
     # trainer
     # ----------------------------------
@@ -387,6 +422,7 @@ class PrintProgress(Callback):
 
         self.progress_t0 = self.t0 = time.time()
         self.progress_history = []
+        self._init_profile()
 
         self.resent_train_time = deque(maxlen=10)
         self.last_train_count = 0
@@ -406,6 +442,8 @@ class PrintProgress(Callback):
             d["eval_reward"] = info["eval_rewards"][self.print_worker]
         if "sync" in info:
             d["sync"] = info["sync"]
+        if "samples_per_insert" in info:
+            d["samples_per_insert"] = info["samples_per_insert"]
 
         self.progress_history.append(d)
         if self._check_print_progress():
@@ -457,6 +495,9 @@ class PrintProgress(Callback):
             if "sync" in self.progress_history[0]:
                 sync = max([h["sync"] for h in self.progress_history])
                 s += f", {sync:3d} send "
+            # [rate limiter]
+            if "samples_per_insert" in self.progress_history[-1]:
+                s += f", {self.progress_history[-1]['samples_per_insert']:.2f} spi"
 
             # [system]
             if self.config.distributed:
@@ -513,6 +554,7 @@ class PrintProgress(Callback):
                     else:
                         s += f"|{k} {v}"
 
+        s += self._profile_str()
         print(s)
         self.progress_history = []
 
@@ -38,13 +38,46 @@ class Config:
     # multi player option
     players: List[Union[None, str, RLConfig]] = field(default_factory=list)
 
+    # vector env option(1プロセスで複数のenvを同時に進める、single playのみ)
+    vector_env_num: int = 1
+
+    # thread trainer option(trainerを別スレッドで実行する、single play(vector env以外)のみ)
+    enable_thread_trainer: bool = False
+    thread_trainer_replay_ratio: float = 1.0  # env 1step あたりの train 回数、0以下は制限なし
+    thread_trainer_max_lag: int = 100  # 学習がこのstep数以上遅れたらenv側が待つ、0以下は待たない
+
+    # prefetch sampler option(trainerのsampleを別スレッドで先読みする、train_only/mpのtrainerのみ)
+    enable_prefetch_sampler: bool = False
+    prefetch_sampler_num: int = 2  # 先読みしておく batch 数
+
+    # memory save option(mp の save_memory で使用)
+    save_memory_chunked: bool = False  # ディレクトリに分割して保存する(変更のない部分は書き込まない)
+
     # mp options
     actor_num: int = 1
+    polling_interval: float = 1.0  # s, メインプロセスで callbacks の on_polling を呼ぶ間隔
     trainer_parameter_send_interval_by_train_count: int = 100
     actor_parameter_sync_interval_by_step: int = 100
     allocate_main: str = ""
     allocate_trainer: str = "/GPU:0"
     allocate_actor: Union[List[str], str] = "/CPU:0"
+    enable_shared_memory_board: bool = True  # parameterの共有にshared_memoryを使う(python3.8以降)
+    actor_memory_send_num: int = 32  # actorからremote_memoryへまとめて送る数
+    actor_memory_send_interval: float = 1.0  # s, 送る数に達しなくてもこの時間が経過したら送る
+    enable_inference_server: bool = False  # actorの推論をtrainerプロセスでまとめて実行する
+    inference_server_max_batch: int = 0  # 0以下は actor_num * vector_env_num
+    inference_server_deadline: float = 0.002  # s, 推論をまとめる待ち時間
+    # actorの追加数に対するtrainerのsample数(train回数×batch_size)の比率を制限する、0以下は制限なし
+    rate_limiter_samples_per_insert: float = 0.0
+    rate_limiter_error_buffer: float = 100.0  # 許容する差(sample数)、これを超えると進みすぎている側が待つ
+    rate_limiter_min_size: int = -1  # この追加数までは制限しない、-1は rl_config.memory_warmup_size
+    # 異常終了したactorを新しいseedで再起動する(trainerとremote_memoryはそのまま)
+    enable_actor_restart: bool = False
+    actor_restart_max: int = 10  # 再起動回数の上限(全actorの合計)、超えたら学習を終了する
+    # 空いているCPUコア数に合わせて動かすactor数を増減する(最大actor_num)
+    enable_elastic_actor: bool = False
+    elastic_actor_min: int = 1
+    elastic_actor_interval: float = 60  # s, actor数を見直す間隔
 
     # tensorflow options
     tf_enable_gpu: bool = True
@@ -61,9 +94,11 @@ class Config:
         self.shuffle_player: bool = False
         self.disable_trainer: bool = False
         self.seed: Optional[int] = None
+        self.seed_per_episode: bool = False  # episode開始毎に seed+episode数 で seed を設定しなおす
         self.render_mode: PlayRenderMode = PlayRenderMode.none
         self.render_kwargs: dict = {}
         self.enable_profiling: bool = True
+        self.enable_phase_profiler: bool = False  # stepの各処理の時間を計測する
         # callbacks
         self.callbacks: List[Callback] = []
 
@@ -74,6 +109,7 @@ class Config:
         self.enable_nvidia: bool = False
         self.run_name: str = "main"
         self.run_actor_id: int = 0
+        self.run_actor_restart_num: int = 0
 
         if self.rl_config is None:
             self.rl_config = srl.rl.dummy.Config()
@@ -100,6 +136,9 @@ class Config:
     def assert_params(self):
         self.make_env()
         assert self.actor_num > 0
+        assert self.vector_env_num > 0
+        if self.enable_elastic_actor:
+            assert 0 < self.elastic_actor_min <= self.actor_num
         self.rl_config.assert_params()
 
     def _set_env(self):
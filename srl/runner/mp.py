@@ -1,9 +1,12 @@
 import ctypes
 import logging
 import multiprocessing as mp
+import multiprocessing.connection
 import os
 import pickle
 import pprint
+import queue
+import threading
 import time
 import traceback
 import warnings
@@ -11,18 +14,24 @@ from dataclasses import dataclass
 from multiprocessing.managers import BaseManager
 from typing import Any, List, Optional, Type, Union, cast
 
+import numpy as np
+
 from srl.base.rl.base import RLConfig, RLParameter, RLRemoteMemory
 from srl.base.rl.registration import make_remote_memory
-from srl.runner import play_sequence
+from srl.base.rl.worker import WorkerRun
+from srl.runner import play_sequence, play_vector
 from srl.runner.callback import Callback
 from srl.runner.callbacks.file_log_reader import FileLogReader
 from srl.runner.callbacks.print_progress import PrintProgress
 from srl.runner.config import Config
 from srl.runner.play_trainer import play as train_only
-from srl.utils.common import is_enable_device_name, is_package_imported
+from srl.utils.common import is_enable_device_name, is_package_imported, is_package_installed
 
 logger = logging.getLogger(__name__)
 
+# 子プロセスや共有する値はこの context から作る(呼び出し元の start_method は変更しない、理由は train を参照)
+_mp_context = mp.get_context("spawn")
+
 """
 RuntimeError:
     An attempt has been made to start a new process before the
@@ -95,6 +104,38 @@ class MpConfig:
         return config
 
 
+# --------------------
+# end signal
+# --------------------
+class _TrainEndSignal:
+    """学習の終了フラグ
+
+    value は mp.Value と同じように読み書きでき、True にするとパイプにも通知します。
+    メインプロセスはプロセスの sentinel と一緒に get_wait_object() を connection.wait で待てます。
+    """
+
+    def __init__(self):
+        self._flag = _mp_context.Value(ctypes.c_bool, False)
+        self._reader, self._writer = _mp_context.Pipe(duplex=False)
+
+    @property
+    def value(self) -> bool:
+        return self._flag.value
+
+    @value.setter
+    def value(self, value: bool) -> None:
+        is_notify = value and not self._flag.value
+        self._flag.value = value
+        if is_notify:
+            try:
+                self._writer.send(True)
+            except OSError:
+                logger.debug(traceback.format_exc())
+
+    def get_wait_object(self) -> Any:
+        return self._reader
+
+
 # --------------------
 # board
 # --------------------
@@ -114,21 +155,426 @@ class Board:
         return self.params
 
 
+class _SharedArrayRef:
+    def __init__(self, idx: int):
+        self.idx = idx
+
+
+class SharedMemoryBoard:
+    """parameter を shared_memory 上で共有する Board
+
+    backup() 内の np.ndarray を shared_memory に直接書き込み、それ以外の要素(構造やスカラー)のみ pickle します。
+    ダブルバッファになっており、writer は公開されていない側のスロットに書き込んだ後に version を進めます。
+    reader は読み込み中に version が変わった場合は読み直します。
+    (writer は version が進んだ後でないと reader が読んでいるスロットに書き込まないため、version が同じなら読んだ内容は壊れていません)
+
+    書き込めるのは初期化時と同じ shape/dtype の配列構成のみです。
+    """
+
+    _HEADER_SIZE = 8
+    _ALIGN = 64
+
+    def __init__(self, params: Any, meta_capacity: int = 64 * 1024):
+        from multiprocessing import shared_memory
+
+        arrays = []
+        skeleton = self._split(params, arrays)
+        self.layout = []
+        offset = 0
+        for a in arrays:
+            offset = (offset + self._ALIGN - 1) // self._ALIGN * self._ALIGN
+            self.layout.append((a.shape, a.dtype.str, offset))
+            offset += a.nbytes
+        self.meta_offset = (offset + self._ALIGN - 1) // self._ALIGN * self._ALIGN
+        self.meta_capacity = max(meta_capacity, len(pickle.dumps(skeleton)) * 4)
+        self.slot_size = self.meta_offset + self._HEADER_SIZE + self.meta_capacity
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_size * 2)
+        self.version = _mp_context.Value(ctypes.c_longlong, -1)
+        self.write_lock = _mp_context.Lock()
+        self._is_owner = True
+
+        self.write(params)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_is_owner"] = False
+        return state
+
+    @staticmethod
+    def is_supported(params: Any) -> bool:
+        try:
+            from multiprocessing import shared_memory  # noqa F401
+        except ImportError:
+            return False
+        arrays = []
+        SharedMemoryBoard._split(params, arrays)
+        return len(arrays) > 0
+
+    @staticmethod
+    def _split(obj: Any, arrays: list) -> Any:
+        if isinstance(obj, np.ndarray):
+            arrays.append(obj)
+            return _SharedArrayRef(len(arrays) - 1)
+        if isinstance(obj, list):
+            return [SharedMemoryBoard._split(o, arrays) for o in obj]
+        if isinstance(obj, tuple):
+            return tuple([SharedMemoryBoard._split(o, arrays) for o in obj])
+        if isinstance(obj, dict):
+            return {k: SharedMemoryBoard._split(v, arrays) for k, v in obj.items()}
+        return obj
+
+    @staticmethod
+    def _merge(obj: Any, arrays: list) -> Any:
+        if isinstance(obj, _SharedArrayRef):
+            return arrays[obj.idx]
+        if isinstance(obj, list):
+            return [SharedMemoryBoard._merge(o, arrays) for o in obj]
+        if isinstance(obj, tuple):
+            return tuple([SharedMemoryBoard._merge(o, arrays) for o in obj])
+        if isinstance(obj, dict):
+            return {k: SharedMemoryBoard._merge(v, arrays) for k, v in obj.items()}
+        return obj
+
+    def _view(self, slot: int, i: int) -> np.ndarray:
+        shape, dtype, offset = self.layout[i]
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_size + offset)
+
+    def write(self, params):
+        arrays = []
+        skeleton = pickle.dumps(self._split(params, arrays))
+        if len(arrays) != len(self.layout):
+            raise ValueError(f"The number of arrays has changed. ({len(self.layout)} -> {len(arrays)})")
+        if len(skeleton) > self.meta_capacity:
+            raise ValueError(f"Parameter metadata is too large. ({len(skeleton)} > {self.meta_capacity})")
+
+        with self.write_lock:
+            slot = (self.version.value + 1) % 2
+            for i, a in enumerate(arrays):
+                shape, dtype, _ = self.layout[i]
+                if a.shape != shape or a.dtype.str != dtype:
+                    raise ValueError(f"Array layout has changed. ({shape}, {dtype}) -> ({a.shape}, {a.dtype.str})")
+                self._view(slot, i)[...] = a
+
+            base = slot * self.slot_size + self.meta_offset
+            self.shm.buf[base : base + self._HEADER_SIZE] = len(skeleton).to_bytes(self._HEADER_SIZE, "little")
+            base += self._HEADER_SIZE
+            self.shm.buf[base : base + len(skeleton)] = skeleton
+
+            self.version.value += 1
+
+    def get_update_count(self):
+        return self.version.value + 1
+
+    def read(self):
+        while True:
+            version = self.version.value
+            slot = version % 2
+            arrays = [self._view(slot, i).copy() for i in range(len(self.layout))]
+
+            base = slot * self.slot_size + self.meta_offset
+            size = int.from_bytes(self.shm.buf[base : base + self._HEADER_SIZE], "little")
+            base += self._HEADER_SIZE
+            skeleton = bytes(self.shm.buf[base : base + size])
+
+            # 読んでいる間に更新された場合は、同じスロットへ書き込み中の可能性があるので読み直す
+            if self.version.value == version:
+                break
+
+        return self._merge(pickle.loads(skeleton), arrays)
+
+    def close(self):
+        self.shm.close()
+        if self._is_owner:
+            self.shm.unlink()
+
+
+# --------------------
+# rate limiter
+# --------------------
+class _RateLimiter:
+    """remote memory への追加数(insert)に対する sample 数の比率を制限する
+
+    sample 数は trainer の train 回数 × batch_size です。
+    diff = (insert数 - min_size) * samples_per_insert - sample数 として、
+    diff > error_buffer の場合は actor(insert側)が、diff < -error_buffer の場合は trainer(sample側)が待ちます。
+    また insert数 が min_size 未満の間は trainer が待ちます。
+    """
+
+    _WAIT_INTERVAL = 0.001  # s
+    _STALL_TIMEOUT = 10  # s, trainer がこの時間 sample しない場合は actor は待つのをやめる
+
+    def __init__(
+        self,
+        samples_per_insert: float,
+        error_buffer: float,
+        min_size: int,
+        train_end_signal: _TrainEndSignal,
+    ):
+        assert samples_per_insert > 0
+        assert error_buffer > 0
+        self.samples_per_insert = samples_per_insert
+        self.error_buffer = error_buffer
+        self.min_size = max(min_size, 0)
+        self.train_end_signal = train_end_signal
+        self.insert_count = _mp_context.Value(ctypes.c_longlong, 0)
+        self.sample_count = _mp_context.Value(ctypes.c_longlong, 0)
+
+    def _diff(self, staged: int = 0) -> float:
+        inserts = max(self.insert_count.value + staged - self.min_size, 0)
+        return inserts * self.samples_per_insert - self.sample_count.value
+
+    def add_insert(self, n: int) -> None:
+        with self.insert_count.get_lock():
+            self.insert_count.value += n
+
+    def add_sample(self, n: int) -> None:
+        with self.sample_count.get_lock():
+            self.sample_count.value += n
+
+    def is_insert_limited(self, staged: int = 0) -> bool:
+        return self._diff(staged) > self.error_buffer
+
+    def wait_insert(self, staged: int = 0) -> float:
+        """insert が進みすぎている場合は待ちます、待った時間を返します"""
+        if not self.is_insert_limited(staged):
+            return 0
+        t0 = time.time()
+        t_sample = t0
+        prev_sample_count = self.sample_count.value
+        while self._diff(staged) > self.error_buffer:
+            if self.train_end_signal.value:
+                break
+            time.sleep(self._WAIT_INTERVAL)
+            if prev_sample_count != self.sample_count.value:
+                prev_sample_count = self.sample_count.value
+                t_sample = time.time()
+            elif time.time() - t_sample > self._STALL_TIMEOUT:
+                # trainer 側の都合(warmupなど)で sample されない場合に止まり続けないように
+                logger.warning("rate limiter: trainer is not sampling, skip waiting.")
+                break
+        return time.time() - t0
+
+    def is_sample_limited(self) -> bool:
+        return self.insert_count.value < self.min_size or self._diff() < -self.error_buffer
+
+    def wait_sample(self) -> float:
+        """sample が進みすぎている場合は待ちます、待った時間を返します"""
+        if not self.is_sample_limited():
+            return 0
+        t0 = time.time()
+        while self.is_sample_limited():
+            if self.train_end_signal.value:
+                break
+            time.sleep(self._WAIT_INTERVAL)
+        return time.time() - t0
+
+    def get_samples_per_insert(self) -> float:
+        """実際の insert あたりの sample 数"""
+        inserts = self.insert_count.value - self.min_size
+        if inserts <= 0:
+            return 0
+        return self.sample_count.value / inserts
+
+
+# --------------------
+# remote memory staging
+# --------------------
+class _RemoteMemoryStaging:
+    """actor側で add をためておき、add_many でまとめて送る
+
+    数(send_num)か時間(send_interval)のどちらかに達したら送ります。
+    add 以外は remote_memory へそのまま中継します。
+    rate_limiter がある場合、trainer の sample が追いつくまで add で待ちます。
+    """
+
+    def __init__(
+        self,
+        remote_memory: RLRemoteMemory,
+        send_num: int,
+        send_interval: float,
+        rate_limiter: Optional[_RateLimiter] = None,
+    ):
+        self.remote_memory = remote_memory
+        self.send_num = send_num
+        self.send_interval = send_interval
+        self.rate_limiter = rate_limiter
+        self.buffer = []
+        self.t0 = time.time()
+        self.wait_time = 0.0
+
+    def add(self, *args) -> None:
+        if self.rate_limiter is not None and self.rate_limiter.is_insert_limited(len(self.buffer) + 1):
+            # 待つ前に送っておく(trainerから見えない分で止まらないように)
+            self.flush()
+            self.wait_time += self.rate_limiter.wait_insert(1)
+        self.buffer.append(args)
+        if len(self.buffer) >= self.send_num:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.buffer) > 0:
+            self.remote_memory.add_many(self.buffer)
+            if self.rate_limiter is not None:
+                self.rate_limiter.add_insert(len(self.buffer))
+            self.buffer = []
+        self.t0 = time.time()
+
+    def flush_if_timeout(self) -> None:
+        if time.time() - self.t0 >= self.send_interval:
+            self.flush()
+
+    def get_staged_num(self) -> int:
+        return len(self.buffer)
+
+    def __getattr__(self, name: str):
+        return getattr(self.remote_memory, name)
+
+
+# --------------------
+# inference server
+# --------------------
+class _InferenceServer(threading.Thread):
+    """trainer プロセス上で actor の推論をまとめて実行する
+
+    最初のリクエストから deadline 秒以内に届いたリクエストを max_batch までまとめて
+    call_policy_batch で推論します。
+    """
+
+    def __init__(
+        self,
+        worker: WorkerRun,
+        request_queue: Any,
+        response_queues: List[Any],
+        max_batch: int,
+        deadline: float,
+    ):
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.request_queue = request_queue
+        self.response_queues = response_queues
+        self.max_batch = max_batch
+        self.deadline = deadline
+        self.stop_event = threading.Event()
+
+        self.batch_count = 0
+        self.request_count = 0
+
+    def run(self):
+        logger.info("inference server start")
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    requests = [self.request_queue.get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+
+                # deadlineまでリクエストをまとめる
+                # request は (actor_id, request_id, states)
+                size = len(requests[0][2])
+                t0 = time.time()
+                while size < self.max_batch:
+                    remain = self.deadline - (time.time() - t0)
+                    if remain <= 0:
+                        break
+                    try:
+                        requests.append(self.request_queue.get(timeout=remain))
+                    except queue.Empty:
+                        break
+                    size += len(requests[-1][2])
+
+                states = np.concatenate([r[2] for r in requests])
+                predictions = self.worker.worker.call_policy_batch([], states)
+                if predictions is None and self.batch_count == 0:
+                    logger.warning("This worker does not support the inference server. Actors use local inference.")
+                self.batch_count += 1
+                self.request_count += len(requests)
+
+                # 応答には request_id を付けて返す
+                idx = 0
+                for actor_id, request_id, _states in requests:
+                    if predictions is None:
+                        self.response_queues[actor_id].put((request_id, None))
+                    else:
+                        self.response_queues[actor_id].put((request_id, predictions[idx : idx + len(_states)]))
+                    idx += len(_states)
+        finally:
+            logger.info(
+                f"inference server end(batch: {self.batch_count}, average requests: "
+                f"{self.request_count / max(self.batch_count, 1):.2f})"
+            )
+
+
+class _InferenceClient:
+    def __init__(self, request_queue: Any, response_queue: Any, actor_id: int, train_end_signal: _TrainEndSignal):
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.actor_id = actor_id
+        self.train_end_signal = train_end_signal
+
+        # 直近の推論を server が行ったか(server が推論している間は actor の parameter は使われない)
+        self.is_served = False
+        self.is_unsupported = False
+
+        # request_id は (プロセス毎のランダムな値, 連番)
+        # 再起動前のプロセス宛ての応答を同じ actor_id の新しいプロセスが受け取っても区別できるようにする
+        self._session_id = int.from_bytes(os.urandom(8), "little")
+        self._request_num = 0
+
+        # 前のプロセス(再起動前)宛ての応答が残っていれば捨てる
+        while True:
+            try:
+                self.response_queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def predict(self, states: np.ndarray) -> Optional[list]:
+        """server で推論した結果を返す。終了時や非対応時は None"""
+        if self.is_unsupported:
+            return None
+        self._request_num += 1
+        request_id = (self._session_id, self._request_num)
+        self.request_queue.put((self.actor_id, request_id, states))
+        while True:
+            try:
+                response_id, predictions = self.response_queue.get(timeout=1)
+            except queue.Empty:
+                if self.train_end_signal.value:
+                    self.is_served = False
+                    return None
+                continue
+            if response_id != request_id:
+                continue  # 前のプロセスや前のリクエスト宛ての応答
+            self.is_served = predictions is not None
+            if predictions is None:
+                # server側が非対応の場合は以降 actor 側で推論する
+                self.is_unsupported = True
+            return predictions
+
+
 # --------------------
 # actor
 # --------------------
 class _ActorInterrupt(Callback):
     def __init__(
         self,
-        remote_board: Board,
+        remote_board: Union[Board, SharedMemoryBoard],
         parameter: RLParameter,
-        train_end_signal: ctypes.c_bool,
+        staging: _RemoteMemoryStaging,
+        train_end_signal: _TrainEndSignal,
         config: Config,
+        inference_client: Optional[_InferenceClient] = None,
+        actor_stop_signal: Optional[ctypes.c_bool] = None,
+        actor_restart_count: Optional[ctypes.c_int] = None,
     ) -> None:
         self.remote_board = remote_board
         self.parameter = parameter
+        self.staging = staging
         self.train_end_signal = train_end_signal
         self.actor_parameter_sync_interval_by_step = config.actor_parameter_sync_interval_by_step
+        self.inference_client = inference_client
+        self.actor_stop_signal = actor_stop_signal
+        self.actor_restart_count = actor_restart_count
 
         self.step = 0
         self.prev_update_count = 0
@@ -136,9 +582,21 @@ class _ActorInterrupt(Callback):
 
     def on_episodes_begin(self, info):
         info["sync"] = 0
+        info["staged"] = 0
+
+    def on_episodes_end(self, info):
+        self.staging.flush()
 
     def on_step_end(self, info):
+        self.staging.flush_if_timeout()
+        info["staged"] = self.staging.get_staged_num()
+        if self.actor_restart_count is not None:
+            info["actor_restart_count"] = self.actor_restart_count.value
+
         self.step += 1
+        # 推論サーバが推論している場合は actor の parameter を使わないので同期しない
+        if self.inference_client is not None and self.inference_client.is_served:
+            return
         if self.step % self.actor_parameter_sync_interval_by_step != 0:
             return
         update_count = self.remote_board.get_update_count()
@@ -155,38 +613,65 @@ class _ActorInterrupt(Callback):
     def intermediate_stop(self, info) -> bool:
         if self.train_end_signal.value:
             return True
+        if self.actor_stop_signal is not None and self.actor_stop_signal.value:
+            return True
         return False
 
 
 def _run_actor(
     config: Config,
     remote_memory: RLRemoteMemory,
-    remote_board: Board,
+    remote_board: Union[Board, SharedMemoryBoard],
     actor_id: int,
-    train_end_signal: ctypes.c_bool,
+    train_end_signal: _TrainEndSignal,
+    inference_queues: Optional[tuple],
+    rate_limiter: Optional[_RateLimiter],
+    actor_stop_signal: Optional[ctypes.c_bool] = None,
+    actor_restart_count: Optional[ctypes.c_int] = None,
+    restart_num: int = 0,
 ):
     config.run_name = f"actor{actor_id}"
     config.run_actor_id = actor_id
+    config.run_actor_restart_num = restart_num
     config.init_tensorflow(rerun=True)
 
+    # 再起動した actor は前回と同じ乱数を引かないように seed を変える
+    if restart_num > 0 and config.seed is not None:
+        config.seed += restart_num * config.actor_num + actor_id
+
+    params = (
+        config,
+        remote_memory,
+        remote_board,
+        actor_id,
+        train_end_signal,
+        inference_queues,
+        rate_limiter,
+        actor_stop_signal,
+        actor_restart_count,
+    )
     allocate = config.get_allocate()
     if is_enable_device_name(allocate):
         import tensorflow as tf
 
         with tf.device(allocate):
-            logger.info(f"actor{actor_id} start(allocate={allocate})")
-            __run_actor(config, remote_memory, remote_board, actor_id, train_end_signal)
+            logger.info(f"actor{actor_id} start(allocate={allocate}, restart={restart_num})")
+            __run_actor(*params)
     else:
-        logger.info(f"actor{actor_id} start(allocate=default)")
-        __run_actor(config, remote_memory, remote_board, actor_id, train_end_signal)
+        logger.info(f"actor{actor_id} start(allocate=default, restart={restart_num})")
+        __run_actor(*params)
 
 
 def __run_actor(
     config: Config,
     remote_memory: RLRemoteMemory,
-    remote_board: Board,
+    remote_board: Union[Board, SharedMemoryBoard],
     actor_id: int,
-    train_end_signal: ctypes.c_bool,
+    train_end_signal: _TrainEndSignal,
+    inference_queues: Optional[tuple],
+    rate_limiter: Optional[_RateLimiter],
+    actor_stop_signal: Optional[ctypes.c_bool],
+    actor_restart_count: Optional[ctypes.c_int],
 ):
     try:
 
@@ -200,41 +685,230 @@ def __run_actor(
         if params is not None:
             parameter.restore(params)
 
+        # --- remote memory
+        staging = _RemoteMemoryStaging(
+            remote_memory,
+            config.actor_memory_send_num,
+            config.actor_memory_send_interval,
+            rate_limiter,
+        )
+
+        # --- inference client
+        if inference_queues is None:
+            client = None
+        else:
+            client = _InferenceClient(inference_queues[0], inference_queues[1][actor_id], actor_id, train_end_signal)
+
         # --- callbacks
         config.callbacks.append(
             _ActorInterrupt(
                 remote_board,
                 parameter,
+                staging,
                 train_end_signal,
                 config,
+                client,
+                actor_stop_signal,
+                actor_restart_count if config.enable_actor_restart else None,
             )
         )
 
         # --- play
-        play_sequence.play(config, parameter, remote_memory, actor_id)
-
+        if client is None:
+            play_sequence.play(config, parameter, cast(RLRemoteMemory, staging), actor_id)
+        else:
+            play_vector.play(config, parameter, cast(RLRemoteMemory, staging), actor_id, inference_client=client)
+
+        # actor の終了条件で終わった場合は全体を終了する(elasticで止められた場合は続ける)
+        if actor_stop_signal is None or not actor_stop_signal.value:
+            train_end_signal.value = True
+    except BaseException:
+        # 再起動する場合は他のプロセスを止めない
+        if not config.enable_actor_restart:
+            train_end_signal.value = True
+        raise
     finally:
-        train_end_signal.value = True
         logger.info(f"actor{actor_id} end")
 
 
+def _get_free_cpu_num() -> Optional[float]:
+    """空いているCPUコア数(コア数 - 1分間のロードアベレージ)、取得できない場合は None"""
+    cpu_num = os.cpu_count()
+    if cpu_num is None:
+        return None
+    try:
+        if is_package_installed("psutil"):
+            import psutil
+
+            load = psutil.getloadavg()[0]
+        else:
+            load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+    return cpu_num - load
+
+
+class _ActorSupervisor:
+    """actor プロセスを起動・監視します
+
+    enable_actor_restart の場合、異常終了した actor を新しい seed で再起動します。
+    enable_elastic_actor の場合、空いているCPUコア数に合わせて動かす actor 数を増減します。
+    actor 数を減らす場合は actor_id の大きい順に止め、止めた actor は次に増やす時に再開します。
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        remote_memory: RLRemoteMemory,
+        remote_board: Union[Board, SharedMemoryBoard],
+        train_end_signal: _TrainEndSignal,
+        inference_queues: Optional[tuple],
+        rate_limiter: Optional[_RateLimiter],
+    ):
+        self.config = config
+        self.remote_memory = remote_memory
+        self.remote_board = remote_board
+        self.train_end_signal = train_end_signal
+        self.inference_queues = inference_queues
+        self.rate_limiter = rate_limiter
+
+        self.processes: List[Optional[mp.process.BaseProcess]] = [None for _ in range(config.actor_num)]
+        self.stop_signals = [
+            cast(ctypes.c_bool, _mp_context.Value(ctypes.c_bool, False)) for _ in range(config.actor_num)
+        ]
+        self.restart_nums = [0 for _ in range(config.actor_num)]
+        self.restart_count = cast(ctypes.c_int, _mp_context.Value(ctypes.c_int, 0))
+        self.elastic_t0 = time.time()
+
+    def get_restart_count(self) -> int:
+        return self.restart_count.value
+
+    def get_sentinels(self) -> List[Any]:
+        return [p.sentinel for p in self.processes if p is not None]
+
+    def get_running_num(self) -> int:
+        return len([p for p in self.processes if p is not None and p.is_alive()])
+
+    def start_actor(self, actor_id: int) -> None:
+        self.stop_signals[actor_id].value = False
+        params = (
+            self.config,
+            self.remote_memory,
+            self.remote_board,
+            actor_id,
+            self.train_end_signal,
+            self.inference_queues,
+            self.rate_limiter,
+            self.stop_signals[actor_id],
+            self.restart_count,
+            self.restart_nums[actor_id],
+        )
+        ps = _mp_context.Process(target=_run_actor, args=params)
+        ps.start()
+        self.processes[actor_id] = ps
+
+    def start(self) -> None:
+        if self.config.enable_elastic_actor:
+            start_num = self.config.elastic_actor_min
+        else:
+            start_num = self.config.actor_num
+        for actor_id in range(start_num):
+            self.start_actor(actor_id)
+
+    def check(self) -> bool:
+        """落ちた actor を処理します、学習を続けられない場合は False"""
+        if self.train_end_signal.value:
+            return False
+        for actor_id, ps in enumerate(self.processes):
+            if ps is None or ps.is_alive():
+                continue
+
+            # elastic で止めた actor
+            if self.stop_signals[actor_id].value and ps.exitcode == 0:
+                self.processes[actor_id] = None
+                continue
+
+            if ps.exitcode == 0 or not self.config.enable_actor_restart:
+                logger.info(f"train end(actor {actor_id} process dead, exitcode: {ps.exitcode})")
+                return False
+            if self.restart_count.value >= self.config.actor_restart_max:
+                logger.warning(f"train end(actor restart count exceeded: {self.config.actor_restart_max})")
+                return False
+
+            self.restart_count.value += 1
+            self.restart_nums[actor_id] += 1
+            logger.warning(
+                f"restart actor{actor_id}(exitcode: {ps.exitcode}, "
+                f"restart count: {self.restart_count.value}/{self.config.actor_restart_max})"
+            )
+            self.start_actor(actor_id)
+
+        if self.config.enable_elastic_actor:
+            self._update_elastic()
+        return True
+
+    def _update_elastic(self) -> None:
+        if time.time() - self.elastic_t0 < self.config.elastic_actor_interval:
+            return
+        self.elastic_t0 = time.time()
+
+        free_cpu = _get_free_cpu_num()
+        if free_cpu is None:
+            return
+        running = [i for i, p in enumerate(self.processes) if p is not None and not self.stop_signals[i].value]
+        if free_cpu >= 1:
+            # 空いているコアがあれば1つ増やす
+            stopped = [i for i in range(self.config.actor_num) if i not in running]
+            if len(stopped) > 0:
+                actor_id = stopped[0]
+                if self.processes[actor_id] is not None:
+                    return  # 停止中の actor が終わるのを待つ
+                logger.info(f"elastic: start actor{actor_id}(free cpu: {free_cpu:.1f}, actor: {len(running) + 1})")
+                self.start_actor(actor_id)
+        elif free_cpu < -1:
+            # コアが足りていなければ1つ減らす
+            if len(running) > self.config.elastic_actor_min:
+                actor_id = running[-1]
+                logger.info(f"elastic: stop actor{actor_id}(free cpu: {free_cpu:.1f}, actor: {len(running) - 1})")
+                self.stop_signals[actor_id].value = True
+
+    def join(self, timeout: float = 5) -> None:
+        for ps in self.processes:
+            if ps is None:
+                continue
+            ps.join(timeout)
+            if ps.is_alive():
+                ps.terminate()
+
+    def raise_if_error(self) -> None:
+        # exitcode: 0 正常, 1 例外, 負 シグナル
+        for actor_id, ps in enumerate(self.processes):
+            if ps is None or ps.exitcode is None or ps.exitcode == 0:
+                continue
+            raise RuntimeError(f"An exception has occurred in actor {actor_id} process.(exitcode: {ps.exitcode})")
+
+
 # --------------------
 # trainer
 # --------------------
 class _TrainerInterrupt(Callback):
     def __init__(
         self,
-        remote_board: Board,
+        remote_board: Union[Board, SharedMemoryBoard],
         parameter: RLParameter,
-        train_end_signal: ctypes.c_bool,
+        train_end_signal: _TrainEndSignal,
         config: Config,
+        rate_limiter: Optional[_RateLimiter] = None,
     ) -> None:
         self.remote_board = remote_board
         self.parameter = parameter
         self.train_end_signal = train_end_signal
         self.config = config
+        self.rate_limiter = rate_limiter
+        self.batch_size = getattr(config.rl_config, "batch_size", 1)
 
         self.sync_count = 0
+        self.prev_train_count = 0
 
     def on_trainer_start(self, info):
         info["sync"] = 0
@@ -242,6 +916,12 @@ class _TrainerInterrupt(Callback):
     def on_trainer_train(self, info):
         train_count = info["train_count"]
 
+        if self.rate_limiter is not None:
+            self.rate_limiter.add_sample((train_count - self.prev_train_count) * self.batch_size)
+            self.prev_train_count = train_count
+            self.rate_limiter.wait_sample()
+            info["samples_per_insert"] = self.rate_limiter.get_samples_per_insert()
+
         if train_count == 0:
             time.sleep(1)
             return
@@ -260,8 +940,10 @@ class _TrainerInterrupt(Callback):
 def _run_trainer(
     config: Config,
     remote_memory: RLRemoteMemory,
-    remote_board: Board,
-    train_end_signal: ctypes.c_bool,
+    remote_board: Union[Board, SharedMemoryBoard],
+    train_end_signal: _TrainEndSignal,
+    inference_queues: Optional[tuple],
+    rate_limiter: Optional[_RateLimiter],
 ):
     config.run_name = "trainer"
     config.init_tensorflow(rerun=True)
@@ -272,17 +954,19 @@ def _run_trainer(
 
         with tf.device(allocate):
             logger.info(f"trainer start(allocate={allocate})")
-            __run_trainer(config, remote_memory, remote_board, train_end_signal)
+            __run_trainer(config, remote_memory, remote_board, train_end_signal, inference_queues, rate_limiter)
     else:
         logger.info("trainer start(allocate=default)")
-        __run_trainer(config, remote_memory, remote_board, train_end_signal)
+        __run_trainer(config, remote_memory, remote_board, train_end_signal, inference_queues, rate_limiter)
 
 
 def __run_trainer(
     config: Config,
     remote_memory: RLRemoteMemory,
-    remote_board: Board,
-    train_end_signal: ctypes.c_bool,
+    remote_board: Union[Board, SharedMemoryBoard],
+    train_end_signal: _TrainEndSignal,
+    inference_queues: Optional[tuple],
+    rate_limiter: Optional[_RateLimiter],
 ):
     # --- parameter
     parameter = config.make_parameter(is_load=False)
@@ -290,6 +974,22 @@ def __run_trainer(
     if params is not None:
         parameter.restore(params)
 
+    # --- inference server
+    if inference_queues is None:
+        server = None
+    else:
+        max_batch = config.inference_server_max_batch
+        if max_batch <= 0:
+            max_batch = config.actor_num * config.vector_env_num
+        server = _InferenceServer(
+            config.make_worker(parameter, remote_memory),
+            inference_queues[0],
+            inference_queues[1],
+            max_batch,
+            config.inference_server_deadline,
+        )
+        server.start()
+
     try:
         # --- callbacks
         config.callbacks.append(
@@ -298,6 +998,7 @@ def __run_trainer(
                 parameter,
                 train_end_signal,
                 config,
+                rate_limiter,
             )
         )
 
@@ -306,6 +1007,9 @@ def __run_trainer(
 
     finally:
         train_end_signal.value = True
+        if server is not None:
+            server.stop_event.set()
+            server.join(timeout=5)
         t0 = time.time()
         remote_board.write(parameter.backup())
         logger.info(f"trainer end.(send parameter time: {time.time() - t0:.1f}s)")
@@ -318,9 +1022,6 @@ class MPManager(BaseManager):
     pass
 
 
-__is_set_start_method = False
-
-
 def train(
     config: Config,
     mp_config: Optional[MpConfig] = None,  # DeprecationWarning
@@ -333,12 +1034,15 @@ def train(
     shuffle_player: bool = True,
     disable_trainer: bool = False,
     enable_profiling: bool = True,
+    enable_phase_profiler: bool = False,
     # evaluate
     enable_evaluation: bool = True,
     eval_env_sharing: bool = True,
     eval_interval: int = 0,  # episode
     eval_num_episode: int = 1,
     eval_players: List[Union[None, str, RLConfig]] = [],
+    eval_enable_async: bool = False,
+    eval_async_workers: int = 1,
     # PrintProgress
     print_progress: bool = True,
     progress_max_time: int = 60 * 10,  # s
@@ -362,8 +1066,6 @@ def train(
     return_memory: bool = False,
     save_memory: str = "",
 ):
-    global __is_set_start_method
-
     if disable_trainer:
         enable_evaluation = False  # 学習しないので
         assert (
@@ -394,6 +1096,7 @@ def train(
     config.shuffle_player = shuffle_player
     config.disable_trainer = disable_trainer
     config.enable_profiling = enable_profiling
+    config.enable_phase_profiler = enable_phase_profiler
     # callbacks
     config.callbacks = callbacks[:]
     # play info
@@ -411,6 +1114,8 @@ def train(
                 interval=eval_interval,
                 num_episode=eval_num_episode,
                 eval_players=eval_players,
+                enable_async=eval_enable_async,
+                async_workers=eval_async_workers,
             ),
         )
 
@@ -455,6 +1160,7 @@ def train(
     #    raise RuntimeError("The definition of rl must be in the py file")
 
     """ multiprocessing を spawn で統一
+    (呼び出し元の start_method は変更せず、プロセスや共有する値は _mp_context から作成します)
 
     1. tensorflowはforkに対して安全ではないようです。
     https://github.com/tensorflow/tensorflow/issues/5448#issuecomment-258934405
@@ -472,15 +1178,11 @@ def train(
     3. linux + GPU + tensorflow + multiprocessing にて以下エラーがでてtrainerが落ちる
     # Failed setting context: CUDA_ERROR_NOT_INITIALIZED: initialization error
     """
-    if not __is_set_start_method:
-        mp.set_start_method("spawn")
-        __is_set_start_method = True
-
     MPManager.register("RemoteMemory", remote_memory_class)
     MPManager.register("Board", Board)
 
     logger.info("MPManager start")
-    with MPManager() as manager:
+    with MPManager(ctx=_mp_context) as manager:
         return_parameter, return_remote_memory = _train(
             config,
             init_parameter,
@@ -520,9 +1222,8 @@ def _train(
     [c.on_init(_info) for c in config.callbacks]
 
     # --- share values
-    train_end_signal = cast(ctypes.c_bool, mp.Value(ctypes.c_bool, False))
+    train_end_signal = _TrainEndSignal()
     remote_memory = manager.RemoteMemory(config.rl_config)
-    remote_board = manager.Board()
 
     # init
     if init_remote_memory is None:
@@ -531,23 +1232,78 @@ def _train(
     else:
         remote_memory.restore(init_remote_memory.backup())
     if init_parameter is None:
-        _parameter = config.make_parameter()
-        remote_board.write(_parameter.backup())
+        init_parameter = config.make_parameter()
+    init_params = init_parameter.backup()
+
+    # board
+    if config.enable_shared_memory_board and SharedMemoryBoard.is_supported(init_params):
+        logger.info("use SharedMemoryBoard")
+        remote_board = SharedMemoryBoard(init_params)
     else:
-        remote_board.write(init_parameter.backup())
+        remote_board = manager.Board()
+        remote_board.write(init_params)
 
-    # --- actor
-    actors_ps_list = []
-    for actor_id in range(config.actor_num):
-        params = (
+    # inference server
+    if config.enable_inference_server:
+        assert not disable_trainer, "The inference server runs on the trainer process."
+        inference_queues = (_mp_context.Queue(), [_mp_context.Queue() for _ in range(config.actor_num)])
+    else:
+        inference_queues = None
+
+    # rate limiter
+    if config.rate_limiter_samples_per_insert > 0 and not disable_trainer:
+        min_size = config.rate_limiter_min_size
+        if min_size < 0:
+            min_size = getattr(config.rl_config, "memory_warmup_size", 0)
+        rate_limiter = _RateLimiter(
+            config.rate_limiter_samples_per_insert,
+            config.rate_limiter_error_buffer,
+            min_size,
+            train_end_signal,
+        )
+    else:
+        rate_limiter = None
+
+    try:
+        return __train(
             config,
+            _info,
+            train_end_signal,
             remote_memory,
             remote_board,
-            actor_id,
-            train_end_signal,
+            inference_queues,
+            rate_limiter,
+            disable_trainer,
+            return_memory,
+            save_memory,
         )
-        ps = mp.Process(target=_run_actor, args=params)
-        actors_ps_list.append(ps)
+    finally:
+        if isinstance(remote_board, SharedMemoryBoard):
+            remote_board.close()
+
+
+def __train(
+    config: Config,
+    _info: dict,
+    train_end_signal: _TrainEndSignal,
+    remote_memory: RLRemoteMemory,
+    remote_board: Union[Board, SharedMemoryBoard],
+    inference_queues: Optional[tuple],
+    rate_limiter: Optional[_RateLimiter],
+    disable_trainer: bool,
+    return_memory: bool,
+    save_memory: str,
+):
+
+    # --- actor
+    supervisor = _ActorSupervisor(
+        config,
+        remote_memory,
+        remote_board,
+        train_end_signal,
+        inference_queues,
+        rate_limiter,
+    )
 
     # --- trainer
     if disable_trainer:
@@ -558,12 +1314,14 @@ def _train(
             remote_memory,
             remote_board,
             train_end_signal,
+            inference_queues,
+            rate_limiter,
         )
-        trainer_ps = mp.Process(target=_run_trainer, args=params)
+        trainer_ps = _mp_context.Process(target=_run_trainer, args=params)
 
     # --- start
     logger.debug("process start")
-    [p.start() for p in actors_ps_list]
+    supervisor.start()
     if trainer_ps is not None:
         trainer_ps.start()
 
@@ -571,8 +1329,14 @@ def _train(
     [c.on_start(_info) for c in config.callbacks]
 
     # 終了を待つ
+    # プロセスの終了と終了フラグを待ち、どちらかが起きたらすぐに確認する
+    polling_t0 = time.time()
     while True:
-        time.sleep(1)  # polling time
+        wait_objects = supervisor.get_sentinels() + [train_end_signal.get_wait_object()]
+        if trainer_ps is not None:
+            wait_objects.append(trainer_ps.sentinel)
+        timeout = max(0.0, config.polling_interval - (time.time() - polling_t0))
+        mp.connection.wait(wait_objects, timeout=timeout)
 
         # プロセスが落ちたら終了
         if trainer_ps is not None:
@@ -580,43 +1344,31 @@ def _train(
                 train_end_signal.value = True
                 logger.info("train end(trainer process dead)")
                 break
-        for i, w in enumerate(actors_ps_list):
-            if not w.is_alive():
-                train_end_signal.value = True
-                logger.info(f"train end(actor {i} process dead)")
-                break
+        if not supervisor.check():
+            train_end_signal.value = True
+        _info["actor_restart_count"] = supervisor.get_restart_count()
+        _info["actor_num"] = supervisor.get_running_num()
 
         # callbacks
-        [c.on_polling(_info) for c in config.callbacks]
+        if time.time() - polling_t0 >= config.polling_interval:
+            polling_t0 = time.time()
+            [c.on_polling(_info) for c in config.callbacks]
 
         if train_end_signal.value:
             break
 
     # --- プロセスの終了を待つ
-    for w in actors_ps_list:
-        for _ in range(5):
-            if w.is_alive():
-                time.sleep(1)
-            else:
-                break
-        else:
-            w.terminate()
+    supervisor.join()
     if trainer_ps is not None:
-        for _ in range(60 * 10):
-            if trainer_ps.is_alive():
-                time.sleep(1)
-            else:
-                break
-        else:
+        trainer_ps.join(60 * 10)
+        if trainer_ps.is_alive():
             trainer_ps.terminate()
 
     # 子プロセスが正常終了していなければ例外を出す
     # exitcode: 0 正常, 1 例外, 負 シグナル
     if trainer_ps is not None and trainer_ps.exitcode != 0:
         raise RuntimeError(f"An exception has occurred in trainer process.(exitcode: {trainer_ps.exitcode})")
-    for i, w in enumerate(actors_ps_list):
-        if w.exitcode != 0 and w.exitcode is not None:
-            raise RuntimeError(f"An exception has occurred in actor {i} process.(exitcode: {w.exitcode})")
+    supervisor.raise_if_error()
 
     return_parameter = config.make_parameter()
     return_remote_memory = config.make_remote_memory()
@@ -630,7 +1382,7 @@ def _train(
 
         # --- last memory
         if save_memory != "":
-            remote_memory.save(save_memory, compress=True)
+            remote_memory.save(save_memory, compress=True, chunked=config.save_memory_chunked)
         if return_memory:
             t0 = time.time()
             return_remote_memory.restore(remote_memory.backup())
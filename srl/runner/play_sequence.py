@@ -11,9 +11,10 @@ from srl.base.define import PlayRenderMode
 from srl.base.env.base import EnvRun
 from srl.base.rl.base import RLParameter, RLRemoteMemory
 from srl.base.rl.config import RLConfig
-from srl.runner.callback import Callback
+from srl.runner.callback import Callback, CallbackHooks
 from srl.runner.callbacks.file_log_reader import FileLogReader
 from srl.runner.config import Config
+from srl.utils import profiler
 from srl.utils.common import is_package_imported, is_package_installed, is_packages_installed
 
 logger = logging.getLogger(__name__)
@@ -30,13 +31,17 @@ def play_facade(
     shuffle_player: bool = False,
     disable_trainer: bool = False,
     seed: Optional[int] = None,
+    seed_per_episode: bool = False,
     enable_profiling: bool = True,
+    enable_phase_profiler: bool = False,
     # evaluate
     enable_evaluation: bool = False,
     eval_env_sharing: bool = True,
     eval_interval: int = 0,  # episode
     eval_num_episode: int = 1,
     eval_players: List[Union[None, str, RLConfig]] = [],
+    eval_enable_async: bool = False,
+    eval_async_workers: int = 1,
     # play info
     training: bool = False,
     distributed: bool = False,
@@ -94,7 +99,9 @@ def play_facade(
     config.disable_trainer = disable_trainer
     if config.seed is None:
         config.seed = seed
+    config.seed_per_episode = seed_per_episode
     config.enable_profiling = enable_profiling
+    config.enable_phase_profiler = enable_phase_profiler
     # callbacks
     config.callbacks = callbacks[:]
     # play info
@@ -133,6 +140,8 @@ def play_facade(
                 interval=eval_interval,
                 num_episode=eval_num_episode,
                 eval_players=eval_players,
+                enable_async=eval_enable_async,
+                async_workers=eval_async_workers,
             ),
         )
 
@@ -199,6 +208,19 @@ def play_facade(
 __enabled_nvidia = False
 
 
+def _set_seed(seed: int, env: Optional[EnvRun] = None) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+
+    if is_package_imported("tensorflow"):
+        import tensorflow as tf
+
+        tf.random.set_seed(seed)
+
+    if env is not None:
+        env.set_seed(seed)
+
+
 def play(
     config: Config,
     parameter: Optional[RLParameter] = None,
@@ -207,6 +229,12 @@ def play(
 ) -> Tuple[List[List[float]], RLParameter, RLRemoteMemory, EnvRun]:
     global __enabled_nvidia
 
+    # --- vector play
+    if config.vector_env_num > 1:
+        from srl.runner.play_vector import play as play_vector
+
+        return play_vector(config, parameter, remote_memory, actor_id)
+
     # --- init profile
     initialized_nvidia = False
     if config.enable_profiling:
@@ -226,13 +254,7 @@ def play(
 
     # --- random seed
     if config.seed is not None:
-        random.seed(config.seed)
-        np.random.seed(config.seed)
-
-        if is_package_imported("tensorflow"):
-            import tensorflow as tf
-
-            tf.random.set_seed(config.seed)
+        _set_seed(config.seed)
 
     # --- create env
     env = config.make_env()
@@ -253,12 +275,29 @@ def play(
     else:
         trainer = None
 
+    # --- thread trainer
+    if trainer is not None and config.enable_thread_trainer:
+        from srl.runner.thread_trainer import ThreadTrainer
+
+        thread_trainer = ThreadTrainer(
+            trainer,
+            remote_memory,
+            config.thread_trainer_replay_ratio,
+            config.thread_trainer_max_lag,
+        )
+    else:
+        thread_trainer = None
+
     # callbacks
     callbacks = [c for c in config.callbacks if issubclass(c.__class__, Callback)]
+    hooks = CallbackHooks(callbacks)
 
     # --- workers
     workers = [config.make_player(i, parameter, remote_memory, actor_id) for i in range(env.player_num)]
 
+    # --- phase profiler
+    prof, enabled_phase_profiler = profiler.start_play(config.enable_phase_profiler, workers, remote_memory)
+
     # callbacks
     _info = {
         "config": config,
@@ -269,7 +308,9 @@ def play(
         "workers": workers,
         "actor_id": actor_id,
     }
-    [c.on_episodes_begin(_info) for c in callbacks]
+    [f(_info) for f in hooks.on_episodes_begin]
+    if thread_trainer is not None:
+        thread_trainer.start()
 
     # --- rewards
     episode_rewards_list = []
@@ -291,111 +332,139 @@ def play(
     worker_idx = 0
 
     # --- loop
-    while True:
-        _time = time.time()
-
-        # --- stop check
-        if config.timeout > 0 and (_time - elapsed_t0) > config.timeout:
-            end_reason = "timeout."
-            break
-
-        if config.max_steps > 0 and total_step > config.max_steps:
-            end_reason = "max_steps over."
-            break
+    try:
+        while True:
+            _time = time.time()
 
-        if trainer is not None:
-            if config.max_train_count > 0 and trainer.get_train_count() > config.max_train_count:
-                end_reason = "max_train_count over."
+            # --- stop check
+            if config.timeout > 0 and (_time - elapsed_t0) > config.timeout:
+                end_reason = "timeout."
                 break
 
-        # ------------------------
-        # episode end / init
-        # ------------------------
-        if env.done:
-            episode_count += 1
-
-            if config.max_episodes > 0 and episode_count >= config.max_episodes:
-                end_reason = "episode_count over."
-                break  # end
-
-            # env reset
-            episode_t0 = _time
-            env.reset()
+            if config.max_steps > 0 and total_step > config.max_steps:
+                end_reason = "max_steps over."
+                break
 
-            # shuffle
-            if config.shuffle_player:
-                random.shuffle(worker_indices)
+            if trainer is not None:
+                if config.max_train_count > 0 and trainer.get_train_count() > config.max_train_count:
+                    end_reason = "max_train_count over."
+                    break
+
+            # ------------------------
+            # episode end / init
+            # ------------------------
+            if env.done:
+                episode_count += 1
+
+                if config.max_episodes > 0 and episode_count >= config.max_episodes:
+                    end_reason = "episode_count over."
+                    break  # end
+
+                # env reset
+                episode_t0 = _time
+                if config.seed is not None and config.seed_per_episode:
+                    _set_seed(config.seed + episode_count, env)
+                env.reset()
+
+                # shuffle
+                if config.shuffle_player:
+                    random.shuffle(worker_indices)
+                worker_idx = worker_indices[env.next_player_index]
+
+                # worker reset
+                [w.on_reset(env, worker_indices[i]) for i, w in enumerate(workers)]
+
+                _info["episode_count"] = episode_count
+                _info["worker_indices"] = worker_indices
+                _info["worker_idx"] = worker_idx
+                _info["player_index"] = env.next_player_index
+                _info["action"] = None
+                _info["step_time"] = 0
+                _info["train_info"] = None
+                _info["train_time"] = 0
+                [f(_info) for f in hooks.on_episode_begin]
+
+            # ------------------------
+            # step
+            # ------------------------
+            if prof is not None:
+                _pt = time.perf_counter()
+            [f(_info) for f in hooks.on_step_action_before]
+            if prof is not None:
+                _pt = prof.split("callbacks", _pt)
+
+            # action
+            action = workers[worker_idx].policy(env)
+            _info["action"] = action
+            if prof is not None:
+                _pt = prof.lap("policy", _pt)
+
+            [f(_info) for f in hooks.on_step_begin]
+            if prof is not None:
+                _pt = prof.split("callbacks", _pt)
+
+            # env step
+            if config.env_config.frameskip == 0:
+                env.step(action)
+            else:
+                env.step(action, lambda: [f(_info) for f in hooks.on_skip_step])
             worker_idx = worker_indices[env.next_player_index]
-
-            # worker reset
-            [w.on_reset(env, worker_indices[i]) for i, w in enumerate(workers)]
-
-            _info["episode_count"] = episode_count
-            _info["worker_indices"] = worker_indices
+            if prof is not None:
+                _pt = prof.lap("env.step", _pt)
+
+            # rl step
+            [w.on_step(env) for w in workers]
+            if prof is not None:
+                _pt = prof.lap("worker.on_step", _pt)
+
+            # step update
+            step_time = time.time() - _time
+            total_step += 1
+
+            # trainer
+            if thread_trainer is not None:
+                thread_trainer.add_step()
+                train_info, train_time = thread_trainer.pop_train_info()
+            elif config.training and trainer is not None:
+                _t0 = time.time()
+                train_info = trainer.train()
+                train_time = time.time() - _t0
+                if prof is not None:
+                    _pt = prof.lap("trainer.train", _pt)
+            else:
+                train_info = None
+                train_time = 0
+
+            _info["step_time"] = step_time
+            _info["train_info"] = train_info
+            _info["train_time"] = train_time
+            [f(_info) for f in hooks.on_step_end]
             _info["worker_idx"] = worker_idx
             _info["player_index"] = env.next_player_index
-            _info["action"] = None
-            _info["step_time"] = 0
-            _info["train_info"] = None
-            _info["train_time"] = 0
-            [c.on_episode_begin(_info) for c in callbacks]
-
-        # ------------------------
-        # step
-        # ------------------------
-        [c.on_step_action_before(_info) for c in callbacks]
-
-        # action
-        action = workers[worker_idx].policy(env)
-        _info["action"] = action
-
-        [c.on_step_begin(_info) for c in callbacks]
-
-        # env step
-        if config.env_config.frameskip == 0:
-            env.step(action)
-        else:
-            env.step(action, lambda: [c.on_skip_step(_info) for c in callbacks])
-        worker_idx = worker_indices[env.next_player_index]
-
-        # rl step
-        [w.on_step(env) for w in workers]
-
-        # step update
-        step_time = time.time() - _time
-        total_step += 1
-
-        # trainer
-        if config.training and trainer is not None:
-            _t0 = time.time()
-            train_info = trainer.train()
-            train_time = time.time() - _t0
-        else:
-            train_info = None
-            train_time = 0
-
-        _info["step_time"] = step_time
-        _info["train_info"] = train_info
-        _info["train_time"] = train_time
-        [c.on_step_end(_info) for c in callbacks]
-        _info["worker_idx"] = worker_idx
-        _info["player_index"] = env.next_player_index
-
-        if env.done:
-            worker_rewards = [env.episode_rewards[worker_indices[i]] for i in range(env.player_num)]
-            episode_rewards_list.append(worker_rewards)
-
-            _info["episode_step"] = env.step_num
-            _info["episode_rewards"] = env.episode_rewards
-            _info["episode_time"] = time.time() - episode_t0
-            _info["episode_count"] = episode_count
-            [c.on_episode_end(_info) for c in callbacks]
-
-        # callback end
-        if True in [c.intermediate_stop(_info) for c in callbacks]:
-            end_reason = "callback.intermediate_stop"
-            break
 
+            if env.done:
+                worker_rewards = [env.episode_rewards[worker_indices[i]] for i in range(env.player_num)]
+                episode_rewards_list.append(worker_rewards)
+
+                _info["episode_step"] = env.step_num
+                _info["episode_rewards"] = env.episode_rewards
+                _info["episode_time"] = time.time() - episode_t0
+                _info["episode_count"] = episode_count
+                [f(_info) for f in hooks.on_episode_end]
+            if prof is not None:
+                prof.lap("callbacks", _pt)
+
+            # callback end
+            if hooks.intermediate_stop_any(_info):
+                end_reason = "callback.intermediate_stop"
+                break
+    finally:
+        # 例外で抜けた場合も thread を止める
+        if thread_trainer is not None:
+            thread_trainer.stop()
+
+    if thread_trainer is not None:
+        thread_trainer.pop_train_info()  # 例外確認
     if config.training:
         logger.info(f"training end({end_reason})")
 
@@ -406,9 +475,10 @@ def play(
 
     _info["episode_count"] = episode_count
     _info["end_reason"] = end_reason
-    [c.on_episodes_end(_info) for c in callbacks]
+    [f(_info) for f in hooks.on_episodes_end]
 
     # close profile
+    profiler.end_play(prof, enabled_phase_profiler)
     if initialized_nvidia:
         config.enable_nvidia = False
         __enabled_nvidia = False
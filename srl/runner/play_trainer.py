@@ -2,14 +2,16 @@ import logging
 import random
 import time
 import traceback
-from typing import List, Optional, Tuple, Union
+from typing import List, Optional, Tuple, Union, cast
 
 import numpy as np
 
 from srl.base.rl.base import RLConfig, RLParameter, RLRemoteMemory
-from srl.runner.callback import Callback
+from srl.base.rl.registration import make_remote_memory
+from srl.runner.callback import Callback, CallbackHooks
 from srl.runner.callbacks.file_log_reader import FileLogReader
 from srl.runner.sequence import Config
+from srl.utils import profiler
 from srl.utils.common import is_package_imported, is_package_installed
 
 logger = logging.getLogger(__name__)
@@ -27,12 +29,15 @@ def train(
     timeout: int = -1,
     # play config
     seed: Optional[int] = None,
+    enable_phase_profiler: bool = False,
     # evaluate
     enable_evaluation: bool = False,
     eval_env_sharing: bool = True,
     eval_interval: int = 0,  # episode
     eval_num_episode: int = 1,
     eval_players: List[Union[None, str, RLConfig]] = [],
+    eval_enable_async: bool = False,
+    eval_async_workers: int = 1,
     # PrintProgress
     print_progress: bool = True,
     progress_max_time: int = 60 * 10,  # s
@@ -57,6 +62,7 @@ def train(
     # play config
     if config.seed is None:
         config.seed = seed
+    config.enable_phase_profiler = enable_phase_profiler
     # callbacks
     config.callbacks = callbacks[:]
     # play info
@@ -74,6 +80,8 @@ def train(
                 interval=eval_interval,
                 num_episode=eval_num_episode,
                 eval_players=eval_players,
+                enable_async=eval_enable_async,
+                async_workers=eval_async_workers,
             ),
         )
 
@@ -171,10 +179,25 @@ def play(
         parameter = config.make_parameter()
     if remote_memory is None:
         remote_memory = config.make_remote_memory()
-    trainer = config.make_trainer(parameter, remote_memory)
+
+    # --- prefetch sampler
+    sampler = None
+    if config.enable_prefetch_sampler:
+        from srl.runner import prefetch_sampler
+
+        if prefetch_sampler.is_supported(make_remote_memory(config.rl_config, return_class=True)):
+            sampler = prefetch_sampler.PrefetchSampler(remote_memory, config.prefetch_sampler_num)
+        else:
+            logger.warning("This remote memory does not support the prefetch sampler.")
+    trainer_memory = remote_memory if sampler is None else cast(RLRemoteMemory, sampler)
+    trainer = config.make_trainer(parameter, trainer_memory)
+
+    # --- phase profiler
+    prof, enabled_phase_profiler = profiler.start_play(config.enable_phase_profiler, [], trainer_memory)
 
     # callbacks
     callbacks = [c for c in config.callbacks if issubclass(c.__class__, Callback)]
+    hooks = CallbackHooks(callbacks)
 
     # callbacks
     _info = {
@@ -184,7 +207,7 @@ def play(
         "trainer": trainer,
         "train_count": 0,
     }
-    [c.on_trainer_start(_info) for c in callbacks]
+    [f(_info) for f in hooks.on_trainer_start]
 
     # --- init
     t0 = time.time()
@@ -192,40 +215,52 @@ def play(
     train_count = 0
 
     # --- loop
-    while True:
-        train_t0 = time.time()
-
-        # stop check
-        if config.timeout > 0 and train_t0 - t0 > config.timeout:
-            end_reason = "timeout."
-            break
-
-        if config.max_train_count > 0 and train_count > config.max_train_count:
-            end_reason = "max_train_count over."
-            break
-
-        # train
-        train_info = trainer.train()
-        train_time = time.time() - train_t0
-        train_count = trainer.get_train_count()
-
-        # callbacks
-        _info["train_info"] = train_info
-        _info["train_time"] = train_time
-        _info["train_count"] = train_count
-        [c.on_trainer_train(_info) for c in callbacks]
-
-        # callback end
-        if True in [c.intermediate_stop(_info) for c in callbacks]:
-            end_reason = "callback.intermediate_stop"
-            break
+    try:
+        while True:
+            train_t0 = time.time()
+
+            # stop check
+            if config.timeout > 0 and train_t0 - t0 > config.timeout:
+                end_reason = "timeout."
+                break
+
+            if config.max_train_count > 0 and train_count > config.max_train_count:
+                end_reason = "max_train_count over."
+                break
+
+            # train
+            if prof is not None:
+                _pt = time.perf_counter()
+            train_info = trainer.train()
+            train_time = time.time() - train_t0
+            train_count = trainer.get_train_count()
+            if prof is not None:
+                _pt = prof.lap("trainer.train", _pt)
+
+            # callbacks
+            _info["train_info"] = train_info
+            _info["train_time"] = train_time
+            _info["train_count"] = train_count
+            [f(_info) for f in hooks.on_trainer_train]
+            if prof is not None:
+                prof.lap("callbacks", _pt)
+
+            # callback end
+            if hooks.intermediate_stop_any(_info):
+                end_reason = "callback.intermediate_stop"
+                break
+    finally:
+        # 例外で抜けた場合も thread を止め、残っている priority の更新を反映してから終了
+        if sampler is not None:
+            sampler.close()
 
     # callbacks
     _info["train_count"] = train_count
     _info["end_reason"] = end_reason
-    [c.on_trainer_end(_info) for c in callbacks]
+    [f(_info) for f in hooks.on_trainer_end]
 
     # close profile
+    profiler.end_play(prof, enabled_phase_profiler)
     if initialized_nvidia:
         config.enable_nvidia = False
         __enabled_nvidia = False
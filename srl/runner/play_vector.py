@@ -0,0 +1,279 @@
+import logging
+import pprint
+import random
+import time
+from typing import Any, List, Optional, Tuple, cast
+
+import numpy as np
+
+import srl
+from srl.base.define import EnvAction
+from srl.base.env.base import EnvRun
+from srl.base.rl.base import RLParameter, RLRemoteMemory
+from srl.base.rl.worker import RLWorker, WorkerRun
+from srl.runner.callback import Callback, CallbackHooks
+from srl.runner.config import Config
+from srl.utils import profiler
+from srl.utils.common import is_package_imported, is_package_installed
+
+logger = logging.getLogger(__name__)
+
+
+def _policy_batch(workers: List[WorkerRun], envs: List[EnvRun], inference_client: Any) -> List[EnvAction]:
+    # --- 前処理(on_reset/on_step)を先に全て実行
+    for i in range(len(envs)):
+        workers[i].prepare_policy(envs[i])
+
+    # --- 推論をまとめて実行
+    rl_workers = [w.worker for w in workers]
+    if isinstance(rl_workers[0], RLWorker):
+        rl_workers = cast(List[RLWorker], rl_workers)
+        states = np.asarray([w.get_policy_state() for w in rl_workers])
+        predictions = None
+        if inference_client is not None:
+            predictions = inference_client.predict(states)
+        if predictions is None:
+            predictions = rl_workers[0].call_policy_batch(rl_workers, states)
+        if predictions is not None:
+            for w, p in zip(rl_workers, predictions):
+                w.batch_prediction = p
+
+    return [workers[i].policy_prepared(envs[i]) for i in range(len(envs))]
+
+
+def play(
+    config: Config,
+    parameter: Optional[RLParameter] = None,
+    remote_memory: Optional[RLRemoteMemory] = None,
+    actor_id: int = 0,
+    inference_client: Any = None,
+) -> Tuple[List[List[float]], RLParameter, RLRemoteMemory, EnvRun]:
+    """1プロセスで config.vector_env_num 個のenvを同時に進めます
+
+    各envは同じタイミングでstepし、workerの推論は call_policy_batch によりまとめて実行されます。
+    inference_client がある場合、推論は inference_client.predict(states) で外部(推論サーバ)に任せます。
+    callbackは env 毎の info で呼ばれます(info["env_index"] で区別できます)。
+    trainer は全envが1step進む毎に1回学習します。
+    """
+    env_num = config.vector_env_num
+
+    # --- init profile
+    if config.enable_profiling:
+        config.enable_ps = is_package_installed("psutil")
+
+    # --- random seed
+    if config.seed is not None:
+        random.seed(config.seed)
+        np.random.seed(config.seed)
+
+        if is_package_imported("tensorflow"):
+            import tensorflow as tf
+
+            tf.random.set_seed(config.seed)
+
+    # --- create env
+    envs = [config.make_env()]
+    for _ in range(env_num - 1):
+        env = srl.make_env(config.env_config)
+        env.init()
+        envs.append(env)
+    assert envs[0].player_num == 1, "vector play supports only single player env."
+    if config.seed is not None:
+        [env.set_seed(config.seed + i) for i, env in enumerate(envs)]
+
+    # --- config
+    config = config.copy(env_share=True)
+    config.assert_params()
+
+    # --- parameter/remote_memory/trainer
+    if parameter is None:
+        parameter = config.make_parameter()
+    if remote_memory is None:
+        remote_memory = config.make_remote_memory()
+    if config.training and not config.disable_trainer:
+        trainer = config.make_trainer(parameter, remote_memory)
+    else:
+        trainer = None
+
+    # callbacks
+    callbacks = [c for c in config.callbacks if issubclass(c.__class__, Callback)]
+    hooks = CallbackHooks(callbacks)
+
+    # --- workers(env毎)
+    workers = [config.make_player(0, parameter, remote_memory, actor_id) for _ in range(env_num)]
+
+    # --- phase profiler
+    prof, enabled_phase_profiler = profiler.start_play(config.enable_phase_profiler, workers, remote_memory)
+
+    # callbacks
+    _infos = []
+    for i in range(env_num):
+        _infos.append(
+            {
+                "config": config,
+                "env": envs[i],
+                "env_index": i,
+                "parameter": parameter,
+                "remote_memory": remote_memory,
+                "trainer": trainer,
+                "workers": [workers[i]],
+                "actor_id": actor_id,
+                "worker_indices": [0],
+                "worker_idx": 0,
+            }
+        )
+    [f(_infos[0]) for f in hooks.on_episodes_begin]
+
+    # --- rewards
+    episode_rewards_list = []
+
+    if config.training and not config.distributed:
+        logger.info(f"Training Config\n{pprint.pformat(config.to_dict())}")
+
+    # --- render init
+    [env.set_render_mode(config.render_mode) for env in envs]
+    [w.set_render_mode(config.render_mode) for w in workers]
+
+    # --- init
+    episode_count = -1
+    total_step = 0
+    elapsed_t0 = time.time()
+    episode_t0 = [0.0 for _ in range(env_num)]
+    end_reason = ""
+
+    # --- loop
+    while True:
+        _time = time.time()
+
+        # --- stop check
+        if config.timeout > 0 and (_time - elapsed_t0) > config.timeout:
+            end_reason = "timeout."
+            break
+
+        if config.max_steps > 0 and total_step > config.max_steps:
+            end_reason = "max_steps over."
+            break
+
+        if trainer is not None:
+            if config.max_train_count > 0 and trainer.get_train_count() > config.max_train_count:
+                end_reason = "max_train_count over."
+                break
+
+        # ------------------------
+        # episode end / init
+        # ------------------------
+        is_episode_over = False
+        for i, env in enumerate(envs):
+            if not env.done:
+                continue
+            episode_count += 1
+
+            if config.max_episodes > 0 and episode_count >= config.max_episodes:
+                is_episode_over = True
+                break
+
+            # env reset
+            episode_t0[i] = _time
+            env.reset()
+            workers[i].on_reset(env, 0)
+
+            _info = _infos[i]
+            _info["episode_count"] = episode_count
+            _info["player_index"] = env.next_player_index
+            _info["action"] = None
+            _info["step_time"] = 0
+            _info["train_info"] = None
+            _info["train_time"] = 0
+            [f(_info) for f in hooks.on_episode_begin]
+        if is_episode_over:
+            end_reason = "episode_count over."
+            break
+
+        # ------------------------
+        # step
+        # ------------------------
+        if prof is not None:
+            _pt = time.perf_counter()
+        for _info in _infos:
+            [f(_info) for f in hooks.on_step_action_before]
+        if prof is not None:
+            _pt = prof.split("callbacks", _pt)
+
+        # action
+        actions = _policy_batch(workers, envs, inference_client)
+        if prof is not None:
+            _pt = prof.lap("policy", _pt)
+        for i, _info in enumerate(_infos):
+            _info["action"] = actions[i]
+            [f(_info) for f in hooks.on_step_begin]
+        if prof is not None:
+            _pt = prof.split("callbacks", _pt)
+
+        # env step
+        for i, env in enumerate(envs):
+            if config.env_config.frameskip == 0:
+                env.step(actions[i])
+            else:
+                env.step(actions[i], lambda: [f(_infos[i]) for f in hooks.on_skip_step])
+            if prof is not None:
+                _pt = prof.lap("env.step", _pt)
+
+            # rl step
+            workers[i].on_step(env)
+            if prof is not None:
+                _pt = prof.lap("worker.on_step", _pt)
+
+        # step update
+        step_time = (time.time() - _time) / env_num
+        total_step += env_num
+
+        # trainer
+        if config.training and trainer is not None:
+            _t0 = time.time()
+            train_info = trainer.train()
+            train_time = time.time() - _t0
+            if prof is not None:
+                _pt = prof.lap("trainer.train", _pt)
+        else:
+            train_info = None
+            train_time = 0
+
+        is_stop = False
+        for i, env in enumerate(envs):
+            _info = _infos[i]
+            _info["step_time"] = step_time
+            _info["train_info"] = train_info if i == 0 else None
+            _info["train_time"] = train_time if i == 0 else 0
+            [f(_info) for f in hooks.on_step_end]
+            _info["player_index"] = env.next_player_index
+
+            if env.done:
+                episode_rewards_list.append([env.episode_rewards[0]])
+
+                _info["episode_step"] = env.step_num
+                _info["episode_rewards"] = env.episode_rewards
+                _info["episode_time"] = time.time() - episode_t0[i]
+                [f(_info) for f in hooks.on_episode_end]
+
+            # callback end
+            if hooks.intermediate_stop_any(_info):
+                is_stop = True
+        if prof is not None:
+            prof.lap("callbacks", _pt)
+        if is_stop:
+            end_reason = "callback.intermediate_stop"
+            break
+
+    if config.training:
+        logger.info(f"training end({end_reason})")
+
+    # 一度もepisodeを終了していない場合は例外で途中経過を保存
+    if len(episode_rewards_list) == 0:
+        episode_rewards_list.append([envs[0].episode_rewards[0]])
+
+    _infos[0]["episode_count"] = episode_count
+    _infos[0]["end_reason"] = end_reason
+    [f(_infos[0]) for f in hooks.on_episodes_end]
+
+    profiler.end_play(prof, enabled_phase_profiler)
+    return episode_rewards_list, parameter, remote_memory, envs[0]
@@ -0,0 +1,119 @@
+import logging
+import queue
+import threading
+from typing import Any, Optional, Type
+
+from srl.base.rl.base import RLRemoteMemory
+from srl.base.rl.remote_memory import SequenceRemoteMemory
+
+logger = logging.getLogger(__name__)
+
+
+def is_supported(remote_memory_class: Type[RLRemoteMemory]) -> bool:
+    """sample が取り出し(SequenceRemoteMemory)の場合は先読みできない"""
+    return not issubclass(remote_memory_class, SequenceRemoteMemory)
+
+
+class PrefetchSampler:
+    """trainer の sample を別スレッドで先読みする remote_memory のラッパー
+
+    別スレッドで sample(mpの場合はプロセス間通信、batch の作成や重みの計算を含む)を実行し、
+    prefetch_num 個の batch を用意しておきます。
+    先読みは直前の sample の引数で行うので、返す batch は最大 prefetch_num 回前の引数で作成したものになります。
+    update(priorityの更新)も同じスレッドで呼ばれた順に実行し、次の sample の前に反映します。
+    close で使われなかった先読み分は remote_memory.return_unused_sample があれば戻します。
+    (sample で memory から取り出す RankBase 系の memory で batch が失われないように)
+    sample/update 以外は remote_memory へそのまま中継します。
+    """
+
+    def __init__(self, remote_memory: RLRemoteMemory, prefetch_num: int = 2):
+        assert prefetch_num > 0
+        self.remote_memory = remote_memory
+        self.prefetch_num = prefetch_num
+
+        self.exception: Optional[BaseException] = None
+        self._batches = queue.Queue(maxsize=prefetch_num)
+        self._updates = queue.Queue()
+        self._sample_args = None
+        self._unused_batches = []  # 止めた時に queue に入れられなかった batch
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def sample(self, *args, **kwargs) -> Any:
+        self._sample_args = (args, kwargs)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        while True:
+            try:
+                return self._batches.get(timeout=1)
+            except queue.Empty:
+                pass
+            if self.exception is not None:
+                raise RuntimeError("An exception has occurred in prefetch thread.") from self.exception
+            if not self._thread.is_alive():
+                raise RuntimeError("The prefetch thread has stopped.")
+
+    def update(self, *args, **kwargs) -> None:
+        if self._thread is None:
+            self.remote_memory.update(*args, **kwargs)  # type: ignore
+        else:
+            self._updates.put((args, kwargs))
+
+    def get_prefetched_num(self) -> int:
+        return self._batches.qsize()
+
+    def _apply_updates(self) -> None:
+        while True:
+            try:
+                args, kwargs = self._updates.get_nowait()
+            except queue.Empty:
+                break
+            self.remote_memory.update(*args, **kwargs)  # type: ignore
+
+    def _run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                # 先に priority の更新を順番に反映
+                self._apply_updates()
+
+                args, kwargs = self._sample_args  # type: ignore
+                batch = self.remote_memory.sample(*args, **kwargs)  # type: ignore
+
+                # 空きができるまで待つ、待っている間も更新は反映する
+                while True:
+                    if self._stop_event.is_set():
+                        self._unused_batches.append(batch)
+                        break
+                    try:
+                        self._batches.put(batch, timeout=0.01)
+                        break
+                    except queue.Full:
+                        self._apply_updates()
+        except BaseException as e:
+            logger.error(f"prefetch thread error: {e}")
+            self.exception = e
+
+    def close(self) -> None:
+        """スレッドを止めて、残っている更新を反映し、使われなかった先読み分を戻します"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self._apply_updates()
+
+        while True:
+            try:
+                self._unused_batches.append(self._batches.get_nowait())
+            except queue.Empty:
+                break
+        return_func = getattr(self.remote_memory, "return_unused_sample", None)
+        if return_func is not None:
+            for indices, batchs, _ in self._unused_batches:
+                return_func(indices, batchs)
+        self._unused_batches = []
+        self._stop_event.clear()
+
+    def __getattr__(self, name: str):
+        return getattr(self.remote_memory, name)
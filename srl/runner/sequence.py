@@ -1,7 +1,10 @@
 import logging
-from typing import List, Optional, Union
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Union
 
 from srl.base.define import PlayRenderMode
+from srl.base.env import registration as env_registration
 from srl.base.rl.base import RLConfig, RLParameter, RLRemoteMemory
 from srl.runner.callback import Callback
 from srl.runner.config import Config
@@ -22,12 +25,15 @@ def train(
     disable_trainer: bool = False,
     seed: Optional[int] = None,
     enable_profiling: bool = True,
+    enable_phase_profiler: bool = False,
     # evaluate
     enable_evaluation: bool = True,
     eval_env_sharing: bool = True,
     eval_interval: int = 0,  # episode
     eval_num_episode: int = 1,
     eval_players: List[Union[None, str, RLConfig]] = [],
+    eval_enable_async: bool = False,
+    eval_async_workers: int = 1,
     # PrintProgress
     print_progress: bool = True,
     progress_max_time: int = 60 * 10,  # s
@@ -61,12 +67,15 @@ def train(
         disable_trainer=disable_trainer,
         seed=seed,
         enable_profiling=enable_profiling,
+        enable_phase_profiler=enable_phase_profiler,
         # evaluate
         enable_evaluation=enable_evaluation,
         eval_env_sharing=eval_env_sharing,
         eval_interval=eval_interval,
         eval_num_episode=eval_num_episode,
         eval_players=eval_players,
+        eval_enable_async=eval_enable_async,
+        eval_async_workers=eval_async_workers,
         # play info
         training=True,
         distributed=False,
@@ -109,6 +118,8 @@ def evaluate(
     # play config
     shuffle_player: bool = False,
     seed: Optional[int] = None,
+    seed_per_episode: bool = False,  # True の場合は episode 毎に seed+episode数 で seed を設定(process_num によらず同じ結果)
+    process_num: int = 1,  # 2以上の場合、episodeを複数プロセスで並列に実行(seed は常に episode 毎)
     # PrintProgress
     print_progress: bool = False,
     progress_max_time: int = 60 * 5,  # s
@@ -121,43 +132,51 @@ def evaluate(
     remote_memory: Optional[RLRemoteMemory] = None,
 ) -> Union[List[float], List[List[float]]]:  # single play , multi play
 
-    episode_rewards, _, _, _, _ = play_facade(
-        config,
-        # stop config
-        max_episodes=max_episodes,
-        timeout=timeout,
-        max_steps=max_steps,
-        max_train_count=-1,
-        # play config
-        shuffle_player=shuffle_player,
-        disable_trainer=True,
-        seed=seed,
-        enable_profiling=False,
-        # evaluate
-        enable_evaluation=False,
-        # play info
-        training=False,
-        distributed=False,
-        # render mode
-        render_mode=PlayRenderMode.none,
-        render_kwargs={},
-        # PrintProgress
-        print_progress=print_progress,
-        progress_max_time=progress_max_time,
-        progress_start_time=progress_start_time,
-        progress_print_env_info=progress_print_env_info,
-        progress_print_worker_info=progress_print_worker_info,
-        progress_print_train_info=False,
-        progress_print_worker=progress_print_worker,
-        # file_log
-        enable_file_logger=False,
-        # Rendering
-        enable_rendering=False,
-        # other
-        callbacks=callbacks,
-        parameter=parameter,
-        remote_memory=remote_memory,
-    )
+    if process_num > 1:
+        assert max_episodes > 0, "Please specify 'max_episodes' when process_num > 1."
+        assert timeout == -1 and max_steps == -1, "'timeout' and 'max_steps' are not supported when process_num > 1."
+        if len(callbacks) > 0 or print_progress:
+            logger.warning("callbacks and print_progress are not used when process_num > 1.")
+        episode_rewards = _evaluate_parallel(config, parameter, max_episodes, shuffle_player, seed, process_num)
+    else:
+        episode_rewards, _, _, _, _ = play_facade(
+            config,
+            # stop config
+            max_episodes=max_episodes,
+            timeout=timeout,
+            max_steps=max_steps,
+            max_train_count=-1,
+            # play config
+            shuffle_player=shuffle_player,
+            disable_trainer=True,
+            seed=seed,
+            seed_per_episode=seed_per_episode,
+            enable_profiling=False,
+            # evaluate
+            enable_evaluation=False,
+            # play info
+            training=False,
+            distributed=False,
+            # render mode
+            render_mode=PlayRenderMode.none,
+            render_kwargs={},
+            # PrintProgress
+            print_progress=print_progress,
+            progress_max_time=progress_max_time,
+            progress_start_time=progress_start_time,
+            progress_print_env_info=progress_print_env_info,
+            progress_print_worker_info=progress_print_worker_info,
+            progress_print_train_info=False,
+            progress_print_worker=progress_print_worker,
+            # file_log
+            enable_file_logger=False,
+            # Rendering
+            enable_rendering=False,
+            # other
+            callbacks=callbacks,
+            parameter=parameter,
+            remote_memory=remote_memory,
+        )
     if config.env_config.player_num == 1:
         return [r[0] for r in episode_rewards]
     else:
@@ -364,3 +383,74 @@ def test_play(
         remote_memory=remote_memory,
     )
     return history
+
+
+# ---------------------------------
+# parallel evaluate
+# ---------------------------------
+# 評価用プロセス毎の config/parameter
+_eval_worker: dict = {}
+
+
+def _init_evaluate_worker(config: Config, params: Any, env_entry: Optional[dict]):
+    # spawnしたプロセスでは実行元で登録したenvが登録されていないので登録する
+    env_registration.register_entry(config.env_config.name, env_entry)
+
+    # parameterの復元はプロセス毎に1回だけ
+    parameter = config.make_parameter(is_load=params is None)
+    if params is not None:
+        parameter.restore(params)
+    _eval_worker["config"] = config
+    _eval_worker["parameter"] = parameter
+
+
+def _evaluate_episode(seed: Optional[int]) -> List[float]:
+    from srl.runner.play_sequence import play
+
+    config = _eval_worker["config"]
+    config.seed = seed
+    episode_rewards, _, _, _ = play(config, _eval_worker["parameter"])
+    return episode_rewards[0]
+
+
+def _evaluate_parallel(
+    config: Config,
+    parameter: Optional[RLParameter],
+    max_episodes: int,
+    shuffle_player: bool,
+    seed: Optional[int],
+    process_num: int,
+) -> List[List[float]]:
+    eval_config = config.copy(env_share=False)
+    # stop config
+    eval_config.max_episodes = 1
+    eval_config.timeout = -1
+    eval_config.max_steps = -1
+    eval_config.max_train_count = -1
+    # play config
+    eval_config.shuffle_player = shuffle_player
+    eval_config.disable_trainer = True
+    eval_config.seed_per_episode = True
+    eval_config.enable_profiling = False
+    eval_config.render_mode = PlayRenderMode.none
+    eval_config.callbacks = []
+    # play info
+    eval_config.training = False
+    eval_config.distributed = False
+    eval_config.run_name = "eval"
+
+    # seedはepisode毎に決める(どのプロセスで実行されても、process_num=1 + seed_per_episode の場合とも同じ結果になるように)
+    if config.seed is not None:
+        seed = config.seed
+    seeds = [None if seed is None else seed + i for i in range(max_episodes)]
+
+    params = None if parameter is None else parameter.backup()
+    env_entry = env_registration.get_entry(config.env_config.name)
+    with ProcessPoolExecutor(
+        process_num,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_evaluate_worker,
+        initargs=(eval_config, params, env_entry),
+    ) as executor:
+        # map は episode の順番で返す
+        return list(executor.map(_evaluate_episode, seeds))
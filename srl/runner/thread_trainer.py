@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from srl.base.rl.base import RLRemoteMemory, RLTrainer
+from srl.utils import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadTrainer(threading.Thread):
+    """1プロセス内で trainer を別スレッドで実行します
+
+    env の step(メインスレッド)と train を並行に実行します。
+    train の回数は env 1step あたり replay_ratio 回になるように調整されます(0以下は制限なし)。
+    学習が max_lag step 分以上遅れている場合は env 側(add_step)が待ちます。
+    parameter/remote_memory はメインスレッドと共有し、remote_memory のメソッドはロックして実行します。
+    """
+
+    def __init__(
+        self,
+        trainer: RLTrainer,
+        remote_memory: RLRemoteMemory,
+        replay_ratio: float = 1.0,
+        max_lag: int = 100,
+    ):
+        super().__init__(daemon=True)
+        self.trainer = trainer
+        self.remote_memory = remote_memory
+        self.replay_ratio = replay_ratio
+        self.max_lag = max_lag
+
+        self.step_count = 0
+        self.train_call_count = 0
+        self.exception: Optional[BaseException] = None
+
+        self._cond = threading.Condition()
+        self._stop_flag = False
+        self._info_lock = threading.Lock()
+        self._train_info: Optional[Dict[str, Any]] = None
+        self._train_time = 0.0
+        self._wrapped: List[Tuple[str, Any]] = []
+
+        self._lock_remote_memory()
+
+    def _lock_remote_memory(self) -> None:
+        lock = threading.RLock()
+        for name in dir(type(self.remote_memory)):
+            if name.startswith("_"):
+                continue
+            if not callable(getattr(type(self.remote_memory), name, None)):
+                continue
+            func = getattr(self.remote_memory, name)
+
+            def _wrapper(*args, _func=func, **kwargs):
+                with lock:
+                    return _func(*args, **kwargs)
+
+            self._wrapped.append((name, self.remote_memory.__dict__.get(name, None)))
+            setattr(self.remote_memory, name, _wrapper)
+
+    def _unlock_remote_memory(self) -> None:
+        for name, org in reversed(self._wrapped):
+            if org is None:
+                delattr(self.remote_memory, name)
+            else:
+                setattr(self.remote_memory, name, org)
+        self._wrapped = []
+
+    def add_step(self, n: int = 1) -> None:
+        with self._cond:
+            self.step_count += n
+            self._cond.notify_all()
+
+            # 学習が遅れすぎている場合は追いつくまで待つ
+            if self.replay_ratio > 0 and self.max_lag > 0:
+                while (
+                    not self._stop_flag
+                    and self.exception is None
+                    and self.is_alive()
+                    and self.train_call_count < (self.step_count - self.max_lag) * self.replay_ratio
+                ):
+                    self._cond.wait(timeout=1)
+
+    def pop_train_info(self) -> Tuple[Optional[Dict[str, Any]], float]:
+        """前回から学習した場合、最後の train_info とその学習時間を返します"""
+        if self.exception is not None:
+            raise RuntimeError("An exception has occurred in trainer thread.") from self.exception
+        with self._info_lock:
+            train_info, train_time = self._train_info, self._train_time
+            self._train_info = None
+            self._train_time = 0.0
+        return train_info, train_time
+
+    def run(self) -> None:
+        try:
+            while True:
+                # env の step に対して学習が進みすぎている場合は待つ
+                if self.replay_ratio > 0:
+                    with self._cond:
+                        while not self._stop_flag and self.train_call_count >= self.step_count * self.replay_ratio:
+                            self._cond.wait(timeout=1)
+                if self._stop_flag:
+                    break
+
+                train_count = self.trainer.get_train_count()
+                prof = profiler.get()
+                _pt = time.perf_counter()
+                t0 = time.time()
+                train_info = self.trainer.train()
+                train_time = time.time() - t0
+                if prof is not None:
+                    prof.lap("trainer.train", _pt)
+                with self._cond:
+                    self.train_call_count += 1
+                    self._cond.notify_all()
+                with self._info_lock:
+                    self._train_info = train_info
+                    self._train_time = train_time
+
+                # 制限なしで学習が始まっていない(warmup中)場合は空回りしないように少し待つ
+                if self.replay_ratio <= 0 and train_count == self.trainer.get_train_count():
+                    time.sleep(0.001)
+        except BaseException as e:
+            logger.error(f"trainer thread error: {e}")
+            self.exception = e
+            with self._cond:
+                self._cond.notify_all()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop_flag = True
+            self._cond.notify_all()
+        self.join()
+        self._unlock_remote_memory()
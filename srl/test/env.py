@@ -1,3 +1,7 @@
+import pickle
+
+import numpy as np
+
 import srl
 from srl import runner
 from srl.base.define import PlayRenderMode
@@ -68,8 +72,7 @@ class TestEnv:
 
         # --- restore/backup
         if check_restore:
-            dat = env.backup()
-            env.restore(dat)
+            self._check_restore(env)
 
         assert not env.done, "Done should be True after reset."
         assert env.step_num == 0, "step_num should be 0 after reset."
@@ -106,8 +109,7 @@ class TestEnv:
 
             # --- restore/backup
             if check_restore:
-                dat = env.backup()
-                env.restore(dat)
+                self._check_restore(env)
 
             # render
             env.render()
@@ -117,6 +119,67 @@ class TestEnv:
 
         return env
 
+    def _check_restore(self, env: EnvRun):
+        dat = env.backup()
+        step_num = env.step_num
+        state = pickle.dumps(env.state)
+        episode_rewards = env.episode_rewards.copy()
+        invalid_actions = [env.get_invalid_actions(i) for i in range(env.player_num)]
+
+        # 1step 進めてから戻しても同じ状態になる(同じデータで2回戻せる)
+        for _ in range(2):
+            if not env.done:
+                env.step(env.sample())
+            env.restore(dat)
+            assert env.step_num == step_num, "step_num is not restored."
+            assert pickle.dumps(env.state) == state, "state is not restored."
+            assert (env.episode_rewards == episode_rewards).all(), "episode_rewards is not restored."
+            for i in range(env.player_num):
+                assert env.get_invalid_actions(i) == invalid_actions[i], "invalid_actions is not restored."
+
+    def vector_test(
+        self,
+        env_name: str,
+        batch_size: int = 4,
+        max_step: int = 200,
+        check_same: bool = True,
+    ):
+        """VectorEnv を random action で動かします
+
+        check_same が True の場合は、同じ action で動かした batch_size 個の env と結果が同じかも確認します(確率遷移がない env のみ)
+        """
+        vec_env = srl.make_vector_env(env_name, batch_size, seed=1)
+        envs = [srl.make_env(env_name) for _ in range(batch_size)]
+
+        states = vec_env.reset()
+        assert len(states) == batch_size
+        for i, env in enumerate(envs):
+            env.reset()
+            assert vec_env.observation_space.check_val(states[i].tolist()), f"Checking observation_space failed. {i}"
+            if check_same:
+                assert np.array_equal(states[i], env.state), f"state is different. {i}: {states[i]} != {env.state}"
+
+        for _ in range(max_step):
+            actions = vec_env.sample()
+            states, rewards, dones, info = vec_env.step(actions)
+            assert len(states) == batch_size
+            assert rewards.shape == (batch_size,)
+            assert dones.shape == (batch_size,)
+
+            for i, env in enumerate(envs):
+                state = states[i].tolist()
+                assert vec_env.observation_space.check_val(state), f"Checking observation_space failed. {i}"
+                if not check_same:
+                    continue
+                env.step(int(actions[i]))
+                assert np.array_equal(info["final_states"][i], env.state), f"state is different. {i}"
+                assert rewards[i] == np.float32(env.step_rewards[0]), f"reward is different. {i}"
+                assert dones[i] == env.done, f"done is different. {i}"
+                if env.done:
+                    assert info["episode_rewards"][i] == np.float32(env.episode_rewards[0])
+                    env.reset()
+                    assert np.array_equal(states[i], env.state), f"reset state is different. {i}"
+
     def player_test(self, env_name: str, player: str) -> EnvRun:
         env_config = srl.EnvConfig(env_name)
         config = runner.Config(env_config, None)
@@ -0,0 +1,291 @@
+"""
+stepの各処理(policy/env.step/trainなど)の時間を計測します(プロセス毎)
+
+計測値は log スケールのヒストグラムに累積するだけなので計測中のオーバーヘッドは小さいです。
+表示/保存側は snapshot の差分を summarize して使います。
+
+ループの各処理は lap で区切って計測し、その中で計測した処理(timer/wrap)は "親/子" の名前で記録します。
+(例: trainer.train 中の remote_memory.sample は "trainer.train/remote_memory.sample")
+"""
+import functools
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 1us～100s を1桁4分割、前後にはみ出し用のbin
+_MIN_LOG10 = -6
+_MAX_LOG10 = 2
+_DIV = 4
+_BIN_NUM = (_MAX_LOG10 - _MIN_LOG10) * _DIV + 2
+
+
+def get_bin_edges() -> List[float]:
+    """各binの上限(s)、最後のbinは inf"""
+    edges = [10 ** (_MIN_LOG10 + i / _DIV) for i in range(_BIN_NUM - 1)]
+    edges.append(math.inf)
+    return edges
+
+
+class PhaseHistogram:
+    __slots__ = ("count", "total", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.bins = [0] * _BIN_NUM
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed <= 0:
+            i = 0
+        else:
+            i = int(math.ceil((math.log10(elapsed) - _MIN_LOG10) * _DIV))
+            if i < 0:
+                i = 0
+            elif i >= _BIN_NUM:
+                i = _BIN_NUM - 1
+        self.bins[i] += 1
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.t0
+        self.profiler._add_child(elapsed)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    def __init__(self):
+        self.phases: Dict[str, PhaseHistogram] = {}
+        self._wrapped: List[Tuple[Any, str, Any]] = []
+
+        # 入れ子の計測はスレッド毎(ThreadTrainer など)
+        self._local = threading.local()
+
+    def add(self, name: str, elapsed: float) -> None:
+        h = self.phases.get(name, None)
+        if h is None:
+            h = self.phases[name] = PhaseHistogram()
+        h.add(elapsed)
+
+    def _get_local(self) -> threading.local:
+        local = self._local
+        if not hasattr(local, "stack"):
+            local.stack = []  # 計測中の timer/wrap の名前
+            local.children = []  # 親(lap)が決まっていない計測結果
+            local.split_time = {}
+        return local
+
+    def _push(self, name: str) -> None:
+        self._get_local().stack.append(name)
+
+    def _add_child(self, elapsed: float) -> None:
+        local = self._get_local()
+        name = "/".join(local.stack)
+        local.stack.pop()
+        if len(local.children) >= 10_000:
+            # lap が呼ばれない(ループの外で計測している)場合は親無しで記録
+            for _name, _elapsed in local.children:
+                self.add(_name, _elapsed)
+            local.children = []
+        local.children.append((name, elapsed))
+
+    def _flush_children(self, local: threading.local, parent: str) -> None:
+        for name, elapsed in local.children:
+            self.add(f"{parent}/{name}", elapsed)
+        local.children = []
+
+    def lap(self, name: str, t0: float) -> float:
+        """t0からの経過時間を name に追加し、現在時刻を返します
+
+        間に計測した timer/wrap は name の子として記録します。
+        """
+        t = time.perf_counter()
+        local = self._get_local()
+        self.add(name, t - t0 + local.split_time.pop(name, 0.0))
+        self._flush_children(local, name)
+        return t
+
+    def split(self, name: str, t0: float) -> float:
+        """lap と同じですが、経過時間は次の lap(name) までまとめて1回として記録します"""
+        t = time.perf_counter()
+        local = self._get_local()
+        local.split_time[name] = local.split_time.get(name, 0.0) + t - t0
+        self._flush_children(local, name)
+        return t
+
+    def timer(self, name: str) -> _Timer:
+        return _Timer(self, name)
+
+    def wrap(self, obj: Any, method_name: str, name: str) -> None:
+        """obj のメソッドを計測するようにインスタンスのメソッドを置き換えます"""
+        func = getattr(obj, method_name, None)
+        if func is None or getattr(func, "_srl_profiled", False):
+            return
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            self._push(name)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add_child(time.perf_counter() - t0)
+
+        _wrapper._srl_profiled = True  # type: ignore
+        self._wrapped.append((obj, method_name, getattr(obj, "__dict__", {}).get(method_name, None)))
+        setattr(obj, method_name, _wrapper)
+
+    def unwrap_all(self) -> None:
+        """wrap したメソッドを元に戻します(pickle できなくなるので使い終わったら戻す)"""
+        for obj, method_name, org in reversed(self._wrapped):
+            if org is None:
+                delattr(obj, method_name)
+            else:
+                setattr(obj, method_name, org)
+        self._wrapped = []
+
+    def snapshot(self) -> Tuple[float, Dict[str, Tuple[int, float, List[int]]]]:
+        # 別スレッドで phase が増える場合があるので list にしてから読む
+        return time.perf_counter(), {k: (h.count, h.total, h.bins[:]) for k, h in list(self.phases.items())}
+
+
+def summarize(
+    curr: Tuple[float, Dict[str, Tuple[int, float, List[int]]]],
+    prev: Optional[Tuple[float, Dict[str, Tuple[int, float, List[int]]]]] = None,
+    with_hist: bool = False,
+) -> Dict[str, dict]:
+    """2つの snapshot の間の各処理の集計を返します
+
+    count/total(s)/mean(s)/p50,p90,p99(s, binの上限)/ratio(経過時間に対する割合)
+    /exclusive(s, 子の処理を除いた時間)
+    """
+    edges = get_bin_edges()
+    elapsed = curr[0] - prev[0] if prev is not None else 0
+    d = {}
+    for name, (count, total, bins) in curr[1].items():
+        if prev is not None and name in prev[1]:
+            p_count, p_total, p_bins = prev[1][name]
+            count -= p_count
+            total -= p_total
+            bins = [b - pb for b, pb in zip(bins, p_bins)]
+        if count <= 0:
+            continue
+
+        percentiles = {}
+        n = 0
+        targets = [("p50", 0.5), ("p90", 0.9), ("p99", 0.99)]
+        for i, b in enumerate(bins):
+            n += b
+            while len(targets) > 0 and n >= count * targets[0][1]:
+                percentiles[targets[0][0]] = edges[i]
+                targets.pop(0)
+
+        d[name] = {
+            "count": count,
+            "total": total,
+            "mean": total / count,
+            **percentiles,
+        }
+        if elapsed > 0:
+            d[name]["ratio"] = total / elapsed
+        if with_hist:
+            d[name]["hist"] = bins
+
+    # 子を除いた時間
+    for name in d.keys():
+        d[name]["exclusive"] = d[name]["total"]
+    for name in d.keys():
+        parent = name.rsplit("/", 1)[0]
+        if parent != name and parent in d:
+            d[parent]["exclusive"] -= d[name]["total"]
+    return d
+
+
+# ----------------------------
+# process global
+# ----------------------------
+_profiler: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> None:
+    global _profiler
+    _profiler = None
+
+
+def get() -> Optional[Profiler]:
+    return _profiler
+
+
+def timer(name: str):
+    """計測が有効な場合のみ計測する with 用の timer"""
+    if _profiler is None:
+        return _NULL_TIMER
+    return _profiler.timer(name)
+
+
+def start_play(
+    is_enable: bool,
+    workers: list = [],
+    remote_memory: Any = None,
+) -> Tuple[Optional[Profiler], bool]:
+    """runnerのplay開始時に呼びます
+
+    Returns:
+        Tuple[Optional[Profiler], bool]: (profiler(無効時はNone), このplayで有効にしたか)
+    """
+    if not is_enable:
+        return None, False
+    # 既に有効な場合(入れ子のplay)は有効にしたplayが無効にする
+    enabled = _profiler is None
+    prof = enable()
+
+    # ループから直接呼ばれない処理はメソッドを置き換えて計測
+    for w in workers:
+        w = getattr(w, "worker", None)
+        while w is not None:
+            if hasattr(w, "state_encode"):
+                prof.wrap(w, "state_encode", "state_encode")
+            w = getattr(getattr(w, "rl_worker", None), "worker", None)  # ExtendWorker
+    if remote_memory is not None:
+        prof.wrap(remote_memory, "add", "remote_memory.add")
+        prof.wrap(remote_memory, "sample", "remote_memory.sample")
+    return prof, enabled
+
+
+def end_play(prof: Optional[Profiler], enabled: bool) -> None:
+    if prof is None:
+        return
+    prof.unwrap_all()
+    if enabled:
+        disable()
@@ -1,6 +1,7 @@
 import unittest
 
 import srl
+from srl.base.env.base import EnvBase, EnvRun
 from srl.base.env.config import EnvConfig
 from srl.envs import grid
 
@@ -17,6 +18,42 @@ class Test(unittest.TestCase):
         self.assertTrue(config2.max_episode_steps == env.max_episode_steps)
         self.assertTrue(config2.player_num == env.player_num)
 
+    def test_snapshot(self):
+        env = srl.make_env(EnvConfig("Grid", {"move_prob": 1.0}))
+        self.assertTrue(env.env.is_snapshot_implemented())
+        env.reset()
+        env.step(3)
+        dat = env.backup()
+        self.assertTrue(isinstance(dat, tuple))
+
+        state = env.state
+        rewards = env.episode_rewards.copy()
+        for _ in range(2):
+            env.step(3)
+            env.step(3)
+            env.restore(dat)
+            self.assertEqual(env.step_num, 1)
+            self.assertEqual(env.state, state)
+            self.assertTrue((env.episode_rewards == rewards).all())
+
+    def test_snapshot_fallback(self):
+        class _Grid(grid.Grid):
+            snapshot = EnvBase.snapshot
+
+        config = srl.make_env(EnvConfig("Grid", {"move_prob": 1.0})).config
+        env = EnvRun(_Grid(move_prob=1.0), config)
+        self.assertFalse(env.env.is_snapshot_implemented())
+        env.reset()
+        env.step(3)
+        dat = env.backup()
+        self.assertTrue(isinstance(dat, bytes))
+
+        state = env.state
+        env.step(3)
+        env.restore(dat)
+        self.assertEqual(env.step_num, 1)
+        self.assertEqual(env.state, state)
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_config_copy", verbosity=2)
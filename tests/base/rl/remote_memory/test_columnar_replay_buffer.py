@@ -0,0 +1,234 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from srl.base.rl.remote_memory.columnar_replay_buffer import ColumnarReplayBuffer
+
+
+def _create_memory(capacity, memmap_dir=""):
+    memory = ColumnarReplayBuffer(None)
+    memory.init(
+        capacity,
+        {
+            "state": ((2,), np.float32),
+            "action": ((), np.int32),
+            "mask": ((3,), np.bool_),
+        },
+        memmap_dir=memmap_dir,
+    )
+    return memory
+
+
+def _batch(i):
+    return {"state": np.array([i, i], dtype=np.float32), "action": i, "mask": [i % 2 == 0, False, True]}
+
+
+class Test(unittest.TestCase):
+    def test_memory(self):
+        capacity = 10
+
+        memory = _create_memory(capacity)
+        self.assertTrue(memory.length() == 0)
+
+        # add
+        for i in range(100):
+            memory.add(_batch(i))
+        self.assertTrue(memory.length() == capacity)
+
+        # sample
+        batchs = memory.sample(5)
+        self.assertEqual(batchs["state"].shape, (5, 2))
+        self.assertEqual(batchs["state"].dtype, np.float32)
+        self.assertEqual(batchs["action"].shape, (5,))
+        self.assertEqual(batchs["mask"].shape, (5, 3))
+        self.assertEqual(len(set(batchs["action"])), 5)
+        for s, a, m in zip(batchs["state"], batchs["action"], batchs["mask"]):
+            self.assertTrue(90 <= a < 100)
+            self.assertEqual(s[0], a)
+            self.assertEqual(m[0], a % 2 == 0)
+
+        # sample over
+        batchs = memory.sample(20)
+        self.assertTrue(len(batchs["action"]) == 10)
+
+        # restore/backup
+        dat = memory.backup(compress=True)
+        memory2 = _create_memory(capacity)
+        memory2.restore(dat)
+        self.assertTrue(memory2.length() == 10)
+        self.assertEqual(sorted(memory2.sample(10)["action"]), list(range(90, 100)))
+
+        # restore over
+        memory2 = _create_memory(20)
+        memory2.restore(dat)
+        self.assertTrue(memory2.length() == 10)
+        memory2.add(_batch(11))
+        self.assertTrue(memory2.length() == 11)
+        self.assertTrue(memory2.memory["action"][10] == 11)
+
+        # restore min(新しいものが残る)
+        memory2 = _create_memory(5)
+        memory2.restore(dat)
+        self.assertTrue(memory2.length() == 5)
+        self.assertEqual(list(memory2.memory["action"]), [95, 96, 97, 98, 99])
+        memory2.add(_batch(11))
+        self.assertTrue(memory2.length() == 5)
+        self.assertTrue(memory2.memory["action"][0] == 11)
+
+    def test_frame_store(self):
+        window_length = 3
+        memory = ColumnarReplayBuffer(None)
+        memory.init(
+            20,
+            {"action": ((), np.int32), "done": ((), np.bool_)},
+            frame_shape=(2,),
+            window_length=window_length,
+            dummy_frame_val=-1,
+            frame_capacity=22,
+        )
+
+        # 2つのworkerが交互にaddする、各フレームは [n, n]
+        expected = {}
+        recent = {}
+        n = 0
+        for i in range(100):
+            stream = i % 2
+            first = stream not in recent
+            if first:
+                n += 1
+                recent[stream] = [[-1, -1]] * (window_length - 1) + [[n, n]]
+            n += 1
+            done = i % 7 == 0
+            state = recent[stream]
+            next_state = state[1:] + [[n, n]]
+            memory.add(
+                {
+                    "action": i,
+                    "done": done,
+                    "frame_stream": stream,
+                    "first_frame": np.array(state[-1]) if first else None,
+                    "next_frame": np.array([n, n]),
+                }
+            )
+            expected[i] = (state, next_state)
+            if done:
+                del recent[stream]
+            else:
+                recent[stream] = next_state
+        self.assertTrue(0 < memory.length() <= 20)
+        # フレームは1回だけ保存される
+        self.assertEqual(memory.frame_count, n)
+
+        def _check(memory):
+            batchs = memory.sample(memory.length())
+            self.assertEqual(batchs["state"].shape, (memory.length(), window_length, 2))
+            self.assertNotIn("_frame_serials", batchs)
+            for a, s, ns in zip(batchs["action"], batchs["state"], batchs["next_state"]):
+                np.testing.assert_array_equal(s, expected[a][0])
+                np.testing.assert_array_equal(ns, expected[a][1])
+
+        _check(memory)
+
+        # restore/backup
+        dat = memory.backup(compress=True)
+        memory2 = ColumnarReplayBuffer(None)
+        memory2.init(
+            10,
+            {"action": ((), np.int32), "done": ((), np.bool_)},
+            frame_shape=(2,),
+            window_length=window_length,
+            dummy_frame_val=-1,
+        )
+        memory2.restore(dat)
+        self.assertTrue(0 < memory2.length() <= 10)
+        _check(memory2)
+
+    def test_frame_store_interleaved(self):
+        # フレームが遷移より先に上書きされる設定で、複数のstreamが不規則に進む
+        window_length = 4
+        memory = ColumnarReplayBuffer(None)
+        memory.init(
+            50,
+            {"action": ((), np.int32), "done": ((), np.bool_)},
+            frame_shape=(1,),
+            window_length=window_length,
+            dummy_frame_val=-1,
+            frame_capacity=40,
+        )
+
+        rnd = np.random.RandomState(1)
+        expected = {}
+        recent = {}
+        n = 0
+        for i in range(1000):
+            # stream 2 はたまにしか進まない(途中でフレームが上書きされる)
+            stream = i % 2 if rnd.rand() > 0.02 else 2
+            first = stream not in recent
+            if first:
+                recent[stream] = [[-1]] * (window_length - 1) + [[n]]
+                n += 1
+            done = rnd.rand() < 0.02
+            state = recent[stream]
+            next_state = state[1:] + [[n]]
+            memory.add(
+                {
+                    "action": i,
+                    "done": done,
+                    "frame_stream": stream,
+                    "first_frame": np.array(state[-1]) if first else None,
+                    "next_frame": np.array([n]),
+                }
+            )
+            n += 1
+            expected[i] = (state, next_state)
+            if done:
+                del recent[stream]
+            else:
+                recent[stream] = next_state
+
+            if memory.length() > 0:
+                batchs = memory.sample(memory.length())
+                for a, s, ns in zip(batchs["action"], batchs["state"], batchs["next_state"]):
+                    np.testing.assert_array_equal(s, expected[a][0])
+                    np.testing.assert_array_equal(ns, expected[a][1])
+
+            # 上書きされたフレームを参照する stream は残らない
+            min_serial = memory.frame_count - memory.frame_capacity
+            for v in memory.frame_streams.values():
+                self.assertTrue(min(x for x in v if x >= 0) >= min_serial)
+        self.assertTrue(memory.length() > 0)
+
+    def test_memmap(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            memmap_dir = os.path.join(tmp_dir, "a")
+            memory = _create_memory(10, memmap_dir)
+            for i in range(15):
+                memory.add(_batch(i))
+            self.assertTrue(os.path.isfile(os.path.join(memmap_dir, "state.npy")))
+
+            # 同じディレクトリで開きなおすとそのまま続きから使える
+            memory2 = _create_memory(10, memmap_dir)
+            self.assertEqual(memory2.length(), 10)
+            self.assertEqual(sorted(memory2.sample(10)["action"]), list(range(5, 15)))
+            memory2.add(_batch(15))
+            self.assertEqual(sorted(memory2.sample(10)["action"]), list(range(6, 16)))
+
+            # backupは位置情報のみ
+            dat = memory2.backup()
+            self.assertEqual(dat["size"], 10)
+            memory.restore(dat)
+            self.assertEqual(sorted(memory.sample(10)["action"]), list(range(6, 16)))
+
+            # 別のディレクトリ/メモリ上へはコピーされる
+            for m in [_create_memory(5, os.path.join(tmp_dir, "b")), _create_memory(5)]:
+                m.restore(dat)
+                self.assertEqual(sorted(m.sample(5)["action"]), list(range(11, 16)))
+
+            # layoutが変わる場合は作り直し
+            memory3 = _create_memory(20, memmap_dir)
+            self.assertEqual(memory3.length(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_memory", verbosity=2)
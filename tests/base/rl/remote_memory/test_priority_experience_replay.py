@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from srl.base.rl.remote_memory.priority_experience_replay import PriorityExperienceReplay
+
+
+def _create_memory(name, memmap_dir=""):
+    memory = PriorityExperienceReplay(None)
+    memory.init(
+        name,
+        10,
+        0.6,
+        0.4,
+        1000,
+        columns={"state": ((2,), np.float32), "action": ((), np.int32)},
+        memmap_dir=memmap_dir,
+    )
+    return memory
+
+
+class Test(unittest.TestCase):
+    def test_column_storage(self):
+        for name in ["ReplayMemory", "ProportionalMemory"]:
+            with self.subTest(name), tempfile.TemporaryDirectory() as tmp_dir:
+                for memmap_dir in ["", os.path.join(tmp_dir, "a")]:
+                    memory = _create_memory(name, memmap_dir)
+                    for i in range(25):
+                        memory.add({"state": np.array([i, i]), "action": i}, float(i))
+                    self.assertEqual(memory.length(), 10)
+
+                    indices, batchs, weights = memory.sample(0, 5)
+                    self.assertEqual(batchs["state"].shape, (5, 2))
+                    for s, a in zip(batchs["state"], batchs["action"]):
+                        self.assertTrue(15 <= a < 25)
+                        self.assertEqual(s[0], a)
+                    memory.update(indices, batchs, np.ones(5))
+
+                    # restore/backup
+                    dat = memory.backup(compress=True)
+                    memory2 = _create_memory(name, os.path.join(tmp_dir, "b"))
+                    memory2.restore(dat)
+                    _, batchs, _ = memory2.sample(0, 10)
+                    for s, a in zip(batchs["state"], batchs["action"]):
+                        self.assertTrue(15 <= a < 25)
+                        self.assertEqual(s[0], a)
+
+        with self.assertRaises(ValueError):
+            _create_memory("RankBaseMemory")
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_column_storage", verbosity=2)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from srl.base.rl import checkpoint
+from srl.base.rl.remote_memory import ColumnarReplayBuffer, ExperienceReplayBuffer
+
+
+class Test(unittest.TestCase):
+    def test_save_chunks(self):
+        data = [
+            {"a": np.arange(1000, dtype=np.float32).reshape((500, 2)), "b": np.zeros((0, 3), dtype=np.bool_)},
+            [(i, float(i)) for i in range(25)],
+            (1, "x", None),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            num, write_num = checkpoint.save_chunks(data, tmp_dir, chunk_bytes=1000, list_chunk_size=10)
+            self.assertEqual(num, write_num)
+            self.assertTrue(checkpoint.is_chunk_dir(tmp_dir))
+
+            data2 = checkpoint.load_chunks(tmp_dir)
+            np.testing.assert_array_equal(data2[0]["a"], data[0]["a"])
+            self.assertEqual(data2[0]["b"].shape, (0, 3))
+            self.assertEqual(data2[1], data[1])
+            self.assertEqual(data2[2], data[2])
+
+            # 変更がなければ書き込まない
+            _, write_num = checkpoint.save_chunks(data, tmp_dir, chunk_bytes=1000, list_chunk_size=10)
+            self.assertEqual(write_num, 0)
+
+            # 変更した chunk のみ書き込む、使われなくなった chunk は消える
+            data[0]["a"][-1] = -1
+            _, write_num = checkpoint.save_chunks(data, tmp_dir, chunk_bytes=1000, list_chunk_size=10)
+            self.assertEqual(write_num, 1)
+            self.assertEqual(len([f for f in os.listdir(tmp_dir) if f.endswith(".zlib")]), num)
+            np.testing.assert_array_equal(checkpoint.load_chunks(tmp_dir)[0]["a"], data[0]["a"])
+
+    def test_memory_save(self):
+        memory = ExperienceReplayBuffer(None)
+        memory.init(100_000)
+        for i in range(30_000):
+            memory.add((i, i))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for chunked in [True, False]:  # 分割保存 / LZMA
+                path = os.path.join(tmp_dir, f"memory_{chunked}")
+                memory.save(path, chunked=chunked)
+                self.assertEqual(os.path.isdir(path), chunked)
+
+                memory2 = ExperienceReplayBuffer(None)
+                memory2.init(100_000)
+                memory2.load(path)
+                self.assertEqual(memory2.memory, memory.memory)
+
+    def test_columnar_save(self):
+        memory = ColumnarReplayBuffer(None)
+        memory.init(100, {"s": ((3,), np.float32)})
+        for i in range(150):
+            memory.add({"s": [i, i, i]})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint.save_chunks(memory.backup(), tmp_dir, chunk_bytes=120)
+
+            # リングバッファ上の並びで保存するので、追加分のchunkだけ書き込まれる
+            memory.add({"s": [150, 150, 150]})
+            num, write_num = checkpoint.save_chunks(memory.backup(), tmp_dir, chunk_bytes=120)
+            self.assertEqual((num, write_num), (10, 1))
+
+            memory.save(tmp_dir)  # 既存のディレクトリは分割保存
+
+            memory2 = ColumnarReplayBuffer(None)
+            memory2.init(100, {"s": ((3,), np.float32)})
+            memory2.load(tmp_dir)
+            self.assertEqual(memory2.length(), 100)
+            self.assertEqual(sorted(memory2.sample(100)["s"][:, 0]), list(range(51, 151)))
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_save_chunks", verbosity=2)
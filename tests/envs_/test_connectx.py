@@ -1,8 +1,12 @@
+import time
 import unittest
+from types import SimpleNamespace
 
 import numpy as np
+import srl
 from srl.base.define import EnvObservationType
 from srl.base.env.spaces.box import BoxSpace
+from srl.base.rl.worker import WorkerRun
 from srl.envs import connectx  # noqa F401
 from srl.test import TestEnv
 from srl.test.processor import TestProcessor
@@ -67,13 +71,69 @@ class Test(unittest.TestCase):
         for player in [
             "alphabeta6",
             "alphabeta7",
-            # "alphabeta8",
+            "alphabeta8",
             # "alphabeta9",
             # "alphabeta10",
         ]:
             with self.subTest((player,)):
                 self.tester.player_test("ConnectX", player)
 
+    def test_alphabeta(self):
+        env = srl.make_env("ConnectX")
+        worker = WorkerRun(connectx.AlphaBeta(max_depth=4, timeout=0))
+
+        # 勝てる手を選ぶ
+        env.reset()
+        for a in [3, 0, 3, 0, 3, 0]:
+            env.step(a)
+        worker.on_reset(env, env.next_player_index)
+        self.assertEqual(worker.policy(env), 3)
+
+        # 負ける手を防ぐ
+        env.reset()
+        for a in [3, 0, 3, 0, 3]:
+            env.step(a)
+        worker.on_reset(env, env.next_player_index)
+        self.assertEqual(worker.policy(env), 3)
+
+    def test_alphabeta_timeout(self):
+        env = srl.make_env("ConnectX")
+        alphabeta = connectx.AlphaBeta(max_depth=42, timeout=0.5)
+        worker = WorkerRun(alphabeta)
+        env.reset()
+        worker.on_reset(env, env.next_player_index)
+        t0 = time.time()
+        action = worker.policy(env)
+        self.assertTrue(time.time() - t0 < 2)
+        self.assertTrue(action in range(7))
+        self.assertTrue(1 <= alphabeta._render_depth < 42)
+
+    def test_direct_step(self):
+        env = srl.make_env("ConnectX")
+        env_org = env.get_original_env()
+        worker = WorkerRun(connectx.AlphaBeta(max_depth=4, timeout=0))
+
+        # kaggle の observation から盤面を作る
+        board = [0] * 42
+        for x, mark in [(3, 1), (0, 2), (3, 1), (0, 2), (3, 1)]:
+            row = max([r for r in range(6) if board[x + r * 7] == 0])
+            board[x + row * 7] = mark
+        observation = SimpleNamespace(step=5, board=board, mark=2)
+        env.direct_reset(observation, None)
+        env.direct_step(observation, None)
+        self.assertEqual(env.state, board)
+        self.assertEqual(env_org.player_index, 1)
+
+        worker.on_reset(env, env_org.player_index)
+        action = worker.policy(env)
+        self.assertEqual(action, 3)
+
+        # bitboard も更新されている
+        env.step(action)
+        board[3 + 2 * 7] = 2
+        self.assertEqual(env.state, board)
+        self.assertFalse(env.done)
+
     def test_processor(self):
         tester = TestProcessor()
         processor = connectx.LayerProcessor()
@@ -1,6 +1,7 @@
 import unittest
 
 import numpy as np
+import srl
 from srl.base.define import EnvObservationType
 from srl.base.env.spaces.box import BoxSpace  # noqa F401
 from srl.envs import grid
@@ -18,6 +19,19 @@ class Test(unittest.TestCase):
     def test_easy_grid(self):
         self.tester.play_test("EasyGrid")
 
+    def test_vector(self):
+        self.tester.vector_test("EasyGrid", batch_size=8, max_step=500)
+        self.tester.vector_test("Grid", batch_size=8, max_step=500, check_same=False)
+
+        # 遷移確率: スタート(1,3)から上に移動すると 0.8 で上、0.1 で右、0.1 で左(壁なので移動しない)
+        env = srl.make_vector_env("Grid", 10000, seed=1)
+        env.reset()
+        states, _, _, _ = env.step(np.full(10000, grid.Action.UP.value))
+        states = [tuple(s) for s in states.tolist()]
+        self.assertAlmostEqual(states.count((1, 2)) / 10000, 0.8, delta=0.02)
+        self.assertAlmostEqual(states.count((2, 3)) / 10000, 0.1, delta=0.02)
+        self.assertAlmostEqual(states.count((1, 3)) / 10000, 0.1, delta=0.02)
+
     def test_processor(self):
         tester = TestProcessor()
         processor = grid.LayerProcessor()
@@ -11,6 +11,9 @@ class Test(unittest.TestCase):
     def test_play(self):
         self.tester.play_test("IGrid")
 
+    def test_vector(self):
+        self.tester.vector_test("IGrid", batch_size=8, max_step=500)
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_play", verbosity=2)
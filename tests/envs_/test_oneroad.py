@@ -1,5 +1,8 @@
 import unittest
 
+import numpy as np
+import srl
+
 from srl.envs import oneroad  # noqa F401
 from srl.test import TestEnv
 
@@ -14,6 +17,41 @@ class Test(unittest.TestCase):
     def test_play_hard(self):
         self.tester.play_test("OneRoad-hard")
 
+    def test_vector(self):
+        self.tester.vector_test("OneRoad", batch_size=8, max_step=500)
+        self.tester.vector_test("OneRoad-hard", batch_size=8, max_step=500)
+
+    def test_vector_auto_reset(self):
+        env = srl.make_vector_env(srl.EnvConfig("OneRoad", max_episode_steps=5), 2)
+        states = env.reset()
+        self.assertTrue((states == [0, 0]).all())
+
+        # env0 は進み続けて、env1 は戻り続ける
+        actions = np.array([0, 1])
+        for i in range(5):
+            states, rewards, dones, info = env.step(actions)
+            self.assertTrue((states == [i + 1, 0]).all())
+            self.assertFalse(dones.any())
+
+        # max_episode_steps を超えたら打ち切られて reset される
+        states, rewards, dones, info = env.step(actions)
+        self.assertTrue((states == [0, 0]).all())
+        self.assertTrue((info["final_states"] == [6, 0]).all())
+        self.assertTrue(dones.all())
+        self.assertTrue(info["truncated"].all())
+
+        # ゴール
+        env = srl.make_vector_env("OneRoad", 2)
+        env.reset()
+        for _ in range(9):
+            env.step(actions)
+        states, rewards, dones, info = env.step(actions)
+        self.assertTrue((rewards == [1, 0]).all())
+        self.assertTrue((dones == [True, False]).all())
+        self.assertTrue((info["truncated"] == [False, False]).all())
+        self.assertTrue((info["episode_rewards"] == [1, 0]).all())
+        self.assertTrue((states == [0, 0]).all())
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_play_hard", verbosity=2)
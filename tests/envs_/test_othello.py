@@ -1,3 +1,5 @@
+import random
+import time
 import unittest
 from typing import cast
 
@@ -10,6 +12,88 @@ from srl.test import TestEnv
 from srl.test.processor import TestProcessor
 
 
+class _RefOthello:
+    """bitboard 化する前の list の盤面での実装(比較用)"""
+
+    _DIRS = [(-1, 1, 1), (0, 1, 2), (1, 1, 3), (1, 0, 6), (1, -1, 9), (0, -1, 8), (-1, -1, 7), (-1, 0, 4)]
+
+    def __init__(self, W: int, H: int):
+        self.W = W
+        self.H = H
+        self.player_index = 0
+        self.field = [0] * (W * H)
+        cx = W // 2 - 1
+        cy = H // 2 - 1
+        self.field[cx + cy * W] = 1
+        self.field[cx + 1 + (cy + 1) * W] = 1
+        self.field[cx + 1 + cy * W] = -1
+        self.field[cx + (cy + 1) * W] = -1
+        self.movable_dirs = [self._calc_movable_dirs(0), self._calc_movable_dirs(1)]
+
+    def _get(self, x: int, y: int) -> int:
+        if 0 <= x < self.W and 0 <= y < self.H:
+            return self.field[x + y * self.W]
+        return 9
+
+    def _calc_movable_dirs(self, player_index: int):
+        my_color = 1 if player_index == 0 else -1
+        dirs_list = [[] for _ in range(self.W * self.H)]
+        for y in range(self.H):
+            for x in range(self.W):
+                if self._get(x, y) != 0:
+                    continue
+                for dx, dy, dir_ in self._DIRS:
+                    tx = x + dx
+                    ty = y + dy
+                    if self._get(tx, ty) != -my_color:
+                        continue
+                    while self._get(tx, ty) == -my_color:
+                        tx += dx
+                        ty += dy
+                    if self._get(tx, ty) == my_color:
+                        dirs_list[x + y * self.W].append(dir_)
+        return dirs_list
+
+    def get_invalid_actions(self, player_index: int):
+        return [a for a in range(self.W * self.H) if len(self.movable_dirs[player_index][a]) == 0]
+
+    def step(self, action: int):
+        me = self.player_index
+        if len(self.movable_dirs[me][action]) == 0:
+            return self.field[:], (-1, 0) if me == 0 else (0, -1), True
+
+        my_color = 1 if me == 0 else -1
+        x = action % self.W
+        y = action // self.W
+        self.field[action] = my_color
+        for dir_ in self.movable_dirs[me][action]:
+            dx, dy = [(d[0], d[1]) for d in self._DIRS if d[2] == dir_][0]
+            tx = x + dx
+            ty = y + dy
+            while self._get(tx, ty) != my_color:
+                self.field[tx + ty * self.W] = my_color
+                tx += dx
+                ty += dy
+        self.movable_dirs = [self._calc_movable_dirs(0), self._calc_movable_dirs(1)]
+
+        size = self.W * self.H
+        enemy_num = size - len(self.get_invalid_actions(1 - me))
+        my_num = size - len(self.get_invalid_actions(me))
+        if enemy_num == 0 and my_num == 0:
+            p1 = self.field.count(1)
+            p2 = self.field.count(-1)
+            if p1 > p2:
+                rewards = (1, -1)
+            elif p1 < p2:
+                rewards = (-1, 1)
+            else:
+                rewards = (0, 0)
+            return self.field[:], rewards, True
+        if enemy_num != 0:
+            self.player_index = 1 - me
+        return self.field[:], (0, 0), False
+
+
 class Test(unittest.TestCase):
     def setUp(self) -> None:
         self.tester = TestEnv()
@@ -32,6 +116,93 @@ class Test(unittest.TestCase):
     def test_player4x4(self):
         self.tester.player_test("Othello4x4", "cpu")
 
+    def test_player_deep(self):
+        self.tester.player_test("Othello4x4", "cpu_deep")
+
+    def test_rule(self):
+        # list の盤面での実装と同じ結果になる
+        for W, H, game_num in [(8, 8, 30), (6, 6, 50), (4, 4, 100)]:
+            rnd = random.Random(W)
+            pass_num = 0
+            for i in range(game_num):
+                with self.subTest((W, H, i)):
+                    env = othello.Othello(W=W, H=H)
+                    ref = _RefOthello(W, H)
+                    state, _ = env.call_reset()
+                    self.assertEqual(list(state), ref.field)
+                    while True:
+                        for p in range(2):
+                            self.assertEqual(env.get_invalid_actions(p), ref.get_invalid_actions(p))
+                            for dirs1, dirs2 in zip(env.movable_dirs[p], ref.movable_dirs[p]):
+                                self.assertEqual(sorted(dirs1), sorted(dirs2))
+
+                        # たまに置けない場所を選ぶ
+                        if rnd.random() < 0.01:
+                            action = rnd.choice(ref.get_invalid_actions(ref.player_index))
+                        else:
+                            action = rnd.choice(env.get_valid_actions(env.player_index))
+                        player_index = env.player_index
+                        state, r1, r2, done, _ = env.call_step(action)
+                        ref_state, ref_rewards, ref_done = ref.step(action)
+                        self.assertEqual(list(state), ref_state)
+                        self.assertEqual((r1, r2), ref_rewards)
+                        self.assertEqual(done, ref_done)
+                        self.assertEqual(env.player_index, ref.player_index)
+                        if not done and env.player_index == player_index:
+                            pass_num += 1
+                        if done:
+                            break
+            # パスも確認できている
+            self.assertTrue(pass_num > 0, (W, H))
+
+    def test_cpu(self):
+        env = srl.make_env("Othello4x4")
+        env.reset()
+        worker = env.make_worker("cpu")
+        assert worker is not None
+        cpu = cast(othello.Cpu, worker.worker)
+
+        # 単純な negamax(全探索)と最善手の評価値が同じ
+        def _negamax(env: othello.Othello, depth: int) -> float:
+            player_index = env.player_index
+            if depth == 0:
+                return cpu._evaluate(env, player_index)
+            best = -np.inf
+            for a in env.get_valid_actions(player_index):
+                n_env = env.copy()
+                _, r1, r2, done, _ = n_env.call_step(a)
+                if done:
+                    score = cpu._terminal_score(n_env, player_index)
+                elif n_env.player_index == player_index:
+                    score = _negamax(n_env, depth - 1)
+                else:
+                    score = -_negamax(n_env, depth - 1)
+                best = max(best, score)
+            return best
+
+        while not env.done:
+            worker.on_reset(env, env.next_player_index)
+            action = worker.policy(env)
+            org_env = cast(othello.Othello, env.get_original_env())
+            self.assertEqual(max(cpu._render_scores), _negamax(org_env, cpu.search_depth))
+            self.assertTrue(action in env.get_valid_actions())
+            env.step(action)
+
+        # 置換表のサイズは固定
+        self.assertEqual(len(cpu._tt), cpu.tt_size)
+
+    def test_cpu_timeout(self):
+        env = srl.make_env("Othello")
+        env.reset()
+        worker = env.make_worker("cpu_deep")
+        assert worker is not None
+        cpu = cast(othello.Cpu, worker.worker)
+        worker.on_reset(env, 0)
+        t0 = time.time()
+        worker.policy(env)
+        self.assertTrue(time.time() - t0 < cpu.timeout + 1)
+        self.assertTrue(cpu._render_depth >= 1)
+
     def test_processor(self):
         tester = TestProcessor()
         processor = othello.LayerProcessor()
@@ -3,10 +3,11 @@ import math
 import unittest
 
 import numpy as np
-from srl.rl.memories.proportional_memory import ProportionalMemory
+from srl.rl.memories.proportional_memory import ProportionalMemory, SumTree
 from srl.rl.memories.rankbase_memory import RankBaseMemory
 from srl.rl.memories.rankbase_memory_linear import RankBaseMemoryLinear
 from srl.rl.memories.replay_memory import ReplayMemory
+from srl.rl.memories.skiplist import IndexableSkipList
 
 
 class TestMemory(unittest.TestCase):
@@ -74,6 +75,40 @@ class TestMemory(unittest.TestCase):
             for i in range(capacity - 1):
                 assert vals[i] < vals[i + 1]
 
+    def test_sum_tree(self):
+        tree = SumTree(5)
+        for i, p in enumerate([10, 2, 5, 8, 4]):
+            tree.add(p, i)
+        self.assertEqual(tree.total(), 29)
+
+        indices, priorities = tree.get_batch(np.array([0, 10, 11, 12.5, 17.5, 25.5, 29]))
+        data = [tree.data[i - tree.leaf_num + 1] for i in indices]
+        self.assertEqual(data, [0, 0, 1, 2, 3, 4, 4])
+        self.assertEqual(list(priorities), [10, 10, 2, 5, 8, 4, 4])
+
+        # まとめて更新しても合計が一致する
+        tree.update_batch(indices[[0, 2, 5]], np.array([1.0, 1.0, 1.0]))
+        self.assertEqual(tree.total(), 1 + 1 + 5 + 8 + 1)
+        self.assertEqual(tree.get(17.5)[2], 4)
+
+    def test_skiplist(self):
+        import bisect
+        import random
+
+        memory = IndexableSkipList(100)
+        model = []
+        for i in range(2000):
+            if len(model) > 0 and random.random() < 0.4:
+                index = random.randint(-len(model), len(model) - 1)
+                self.assertEqual(memory.get(index), model[index])
+                self.assertEqual(memory.pop(index), model.pop(index))
+            else:
+                p = float(random.randint(0, 20))
+                bisect.insort(model, (p, i))
+                memory.insert(p, i)
+            self.assertEqual(len(memory), len(model))
+        self.assertEqual(list(memory), model)
+
     # -------------------------------
     # test IS
     # -------------------------------
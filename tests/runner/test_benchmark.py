@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from srl.runner import benchmark
+
+
+class Test(unittest.TestCase):
+    def test_run_case(self):
+        r = benchmark.run_case("ql", "Grid", "sequence", timeout=1)
+        self.assertEqual(r["status"], "ok")
+        self.assertTrue(r["steps"] > 0)
+        self.assertTrue(r["steps_per_sec"] > 0)
+        self.assertTrue(r["train"] > 0)
+
+        r = benchmark.run_case("ql", "Grid", "trainer", timeout=1, trainer_fill_steps=100)
+        self.assertEqual(r["status"], "ok")
+        self.assertTrue(r["train"] > 0)
+        self.assertTrue(r["memory_bytes_per_transition"] > 0)
+
+        # 作れない組み合わせ
+        r = benchmark.run_case("ql", "aaaaa", "sequence", timeout=1)
+        self.assertEqual(r["status"], "skip")
+
+    def test_run_compare(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "a.json")
+            results = benchmark.run(path, ["ql"], ["Grid"], ["sequence"], timeout=1)
+            self.assertEqual(results[0]["status"], "ok")
+            self.assertTrue(results[0]["peak_rss"] != 0)
+
+            # 遅くなった結果を作る
+            with open(path) as f:
+                d = json.load(f)
+            d["results"][0]["steps_per_sec"] /= 2
+            path2 = os.path.join(tmp_dir, "b.json")
+            with open(path2, "w") as f:
+                json.dump(d, f)
+
+            rows = benchmark.compare(path, path2, threshold=0.1)
+            rows = {r["metric"]: r for r in rows}
+            self.assertTrue(rows["steps_per_sec"]["regression"])
+            self.assertFalse(rows["train_per_sec"]["regression"])
+            self.assertEqual(benchmark.main(["compare", path, path2]), 1)
+            self.assertEqual(benchmark.main(["compare", path, path]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_run_compare", verbosity=2)
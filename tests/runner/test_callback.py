@@ -0,0 +1,38 @@
+import unittest
+
+from srl.runner.callback import Callback, CallbackHooks
+
+
+class _StepCallback(Callback):
+    def __init__(self):
+        self.step_count = 0
+
+    def on_step_end(self, info) -> None:
+        self.step_count += 1
+
+    def intermediate_stop(self, info) -> bool:
+        return self.step_count >= 2
+
+
+class Test(unittest.TestCase):
+    def test_callback_hooks(self):
+        step_callback = _StepCallback()
+        instance_callback = Callback()
+        instance_callback.on_step_begin = lambda info: None
+        hooks = CallbackHooks([step_callback, Callback(), instance_callback])
+
+        # overrideしているものだけ
+        self.assertEqual(hooks.on_step_end, [step_callback.on_step_end])
+        self.assertEqual(hooks.on_step_begin, [instance_callback.on_step_begin])
+        self.assertEqual(len(hooks.on_episode_end), 0)
+        self.assertEqual(len(hooks.on_trainer_train), 0)
+
+        [f({}) for f in hooks.on_step_end]
+        self.assertFalse(hooks.intermediate_stop_any({}))
+        [f({}) for f in hooks.on_step_end]
+        self.assertTrue(hooks.intermediate_stop_any({}))
+        self.assertFalse(CallbackHooks([Callback()]).intermediate_stop_any({}))
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_callback_hooks", verbosity=2)
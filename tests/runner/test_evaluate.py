@@ -0,0 +1,62 @@
+import unittest
+
+import srl
+from srl import runner
+from srl.algorithms import ql
+from srl.envs import grid  # noqa F401
+from srl.runner.callback import Callback
+
+
+class _EvalRecorder(Callback):
+    def __init__(self):
+        self.eval_rewards = []
+
+    def on_episode_end(self, info) -> None:
+        if info.get("eval_rewards", None) is not None:
+            self.eval_rewards.append(info["eval_rewards"])
+
+    def on_trainer_train(self, info) -> None:
+        if info.get("eval_rewards", None) is not None:
+            self.eval_rewards.append(info["eval_rewards"])
+
+
+class Test(unittest.TestCase):
+    def test_async(self):
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        recorder = _EvalRecorder()
+        parameter, memory, _ = runner.train(
+            config,
+            timeout=5,
+            eval_interval=10,
+            eval_num_episode=2,
+            eval_enable_async=True,
+            eval_async_workers=2,
+            print_progress=False,
+            enable_file_logger=False,
+            callbacks=[recorder],
+        )
+        self.assertTrue(len(recorder.eval_rewards) > 0)
+        self.assertEqual(len(recorder.eval_rewards[0]), 1)  # player数
+
+    def test_async_trainer(self):
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        parameter, memory, _ = runner.train(config, max_steps=1000, enable_file_logger=False, print_progress=False)
+
+        recorder = _EvalRecorder()
+        runner.train_only(
+            config,
+            parameter,
+            memory,
+            timeout=3,
+            enable_evaluation=True,
+            eval_interval=100,
+            eval_enable_async=True,
+            print_progress=False,
+            enable_file_logger=False,
+            callbacks=[recorder],
+        )
+        self.assertTrue(len(recorder.eval_rewards) > 0)
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_async", verbosity=2)
@@ -0,0 +1,360 @@
+import ctypes
+import multiprocessing as mp
+import multiprocessing.connection
+import queue
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from srl.base.rl.remote_memory import PriorityExperienceReplay
+from srl.runner.callback import Callback
+from srl.runner.mp import (
+    SharedMemoryBoard,
+    _InferenceClient,
+    _InferenceServer,
+    _RateLimiter,
+    _RemoteMemoryStaging,
+    _TrainEndSignal,
+)
+
+
+class _CrashActor(Callback):
+    """actor1 を再起動前だけ異常終了させる"""
+
+    def __init__(self):
+        self.step = 0
+
+    def on_step_end(self, info) -> None:
+        self.step += 1
+        config = info["config"]
+        if config.run_actor_id == 1 and config.run_actor_restart_num == 0 and self.step > 10:
+            raise ValueError("crash")
+
+
+class _RecordPolling(Callback):
+    def __init__(self):
+        self.restart_counts = []
+
+    def on_polling(self, info) -> None:
+        self.restart_counts.append(info["actor_restart_count"])
+
+
+def _set_end_signal(end_signal):
+    time.sleep(0.1)
+    end_signal.value = True
+
+
+def _read_board(board, queue):
+    queue.put(board.read())
+
+
+class _StubWorker:
+    def call_policy_batch(self, workers, states):
+        return list(states * 2)
+
+
+class _StubWorkerRun:
+    def __init__(self):
+        self.worker = _StubWorker()
+
+
+class _StubUnsupportedWorker:
+    def call_policy_batch(self, workers, states):
+        return None
+
+
+class _StubParameter:
+    def __init__(self):
+        self.params = None
+
+    def restore(self, params):
+        self.params = params
+
+
+class Test(unittest.TestCase):
+    def test_shared_memory_board(self):
+        params = [
+            [np.ones((2, 3), dtype=np.float32), np.zeros((4,), dtype=np.float64)],
+            1.5,
+            "a",
+        ]
+        self.assertTrue(SharedMemoryBoard.is_supported(params))
+        self.assertFalse(SharedMemoryBoard.is_supported("{}"))
+
+        board = SharedMemoryBoard(params)
+        try:
+            self.assertEqual(board.get_update_count(), 1)
+            d = board.read()
+            np.testing.assert_array_equal(d[0][0], params[0][0])
+            np.testing.assert_array_equal(d[0][1], params[0][1])
+            self.assertEqual(d[1:], [1.5, "a"])
+
+            # 2回書き込んでもダブルバッファの最新が読める
+            for i in range(2):
+                params[0][0] = np.full((2, 3), i + 2, dtype=np.float32)
+                params[1] = float(i)
+                board.write(params)
+            self.assertEqual(board.get_update_count(), 3)
+            d = board.read()
+            np.testing.assert_array_equal(d[0][0], params[0][0])
+            self.assertEqual(d[1], 1.0)
+
+            # 別プロセスから読む
+            queue = mp.Queue()
+            ps = mp.Process(target=_read_board, args=(board, queue))
+            ps.start()
+            d = queue.get(timeout=60)
+            ps.join()
+            np.testing.assert_array_equal(d[0][0], params[0][0])
+
+            # layoutが変わる書き込みはエラー
+            with self.assertRaises(ValueError):
+                board.write([[np.ones((3, 3), dtype=np.float32), params[0][1]], 1.0, "a"])
+        finally:
+            board.close()
+
+    def test_shared_memory_board_concurrent(self):
+        # 書き込み中に読んでも、配列とそれ以外の値が同じ version のものになる
+        params = [np.zeros((200_000,), dtype=np.float64), 0.0]
+        board = SharedMemoryBoard(params)
+        is_end = threading.Event()
+
+        def _write():
+            i = 0
+            while not is_end.is_set():
+                i += 1
+                board.write([np.full((200_000,), i, dtype=np.float64), float(i)])
+
+        th = threading.Thread(target=_write)
+        th.start()
+        try:
+            for _ in range(200):
+                d = board.read()
+                self.assertEqual(d[0][0], d[1])
+                self.assertEqual(d[0][-1], d[1])
+        finally:
+            is_end.set()
+            th.join()
+            board.close()
+
+    def test_remote_memory_staging(self):
+        memory = PriorityExperienceReplay(None)
+        memory.init("ProportionalMemory", 100, 1.0, 1.0, 1)
+
+        staging = _RemoteMemoryStaging(memory, send_num=3, send_interval=9999)
+        staging.add(1, 1.0)
+        staging.add(2, 2.0)
+        self.assertEqual(staging.get_staged_num(), 2)
+        self.assertEqual(staging.length(), 0)
+        staging.add(3, 3.0)
+        self.assertEqual(staging.get_staged_num(), 0)
+        self.assertEqual(staging.length(), 3)
+
+        # priorityが保持されている
+        priorities = sorted([d[1] for d in memory.backup()])
+        self.assertEqual(priorities, [(p + 0.0001) ** 1.0 for p in [1.0, 2.0, 3.0]])
+
+        staging.add(4)
+        staging.send_interval = 0
+        staging.flush_if_timeout()
+        self.assertEqual(staging.get_staged_num(), 0)
+        self.assertEqual(staging.length(), 4)
+
+    def test_inference_server(self):
+        request_queue = queue.Queue()
+        response_queues = [queue.Queue(), queue.Queue()]
+        server = _InferenceServer(_StubWorkerRun(), request_queue, response_queues, max_batch=4, deadline=0.1)
+        server.start()
+        try:
+            end_signal = mp.Value(ctypes.c_bool, False)
+            clients = [_InferenceClient(request_queue, response_queues[i], i, end_signal) for i in range(2)]
+
+            # 2つのリクエストが1回の推論にまとまる
+            request_queue.put((1, "id1", np.array([[3.0]])))
+            preds = clients[0].predict(np.array([[1.0], [2.0]]))
+            np.testing.assert_array_equal(np.asarray(preds), [[2.0], [4.0]])
+            request_id, preds = response_queues[1].get(timeout=5)
+            self.assertEqual(request_id, "id1")
+            np.testing.assert_array_equal(np.asarray(preds), [[6.0]])
+            self.assertEqual(server.batch_count, 1)
+
+            # 再起動前のプロセス宛ての応答(同じ長さ)は使わない
+            request_queue.put((0, "old", np.array([[5.0]])))
+            time.sleep(0.5)
+            preds = clients[0].predict(np.array([[1.0]]))
+            np.testing.assert_array_equal(np.asarray(preds), [[2.0]])
+        finally:
+            server.stop_event.set()
+            server.join()
+
+    def test_actor_parameter_sync_with_inference_server(self):
+        from srl.runner.config import Config
+        from srl.runner.mp import _ActorInterrupt
+
+        request_queue = queue.Queue()
+        response_queues = [queue.Queue()]
+        worker_run = _StubWorkerRun()
+        worker_run.worker = _StubUnsupportedWorker()
+        server = _InferenceServer(worker_run, request_queue, response_queues, max_batch=4, deadline=0.01)
+        server.start()
+        try:
+            end_signal = mp.Value(ctypes.c_bool, False)
+            client = _InferenceClient(request_queue, response_queues[0], 0, end_signal)
+            config = Config(None, None)  # type: ignore
+            config.actor_parameter_sync_interval_by_step = 1
+            board = SharedMemoryBoard([np.zeros((2,))])
+            parameter = _StubParameter()
+            interrupt = _ActorInterrupt(board, parameter, None, end_signal, config, client)  # type: ignore
+            interrupt.staging = mock.Mock()
+            try:
+                # server が推論する前は同期する
+                board.write([np.ones((2,))])
+                interrupt.on_step_end({})
+                np.testing.assert_array_equal(parameter.params[0], [1, 1])
+
+                # server 非対応の場合は actor 側で推論するので同期を続ける
+                self.assertIsNone(client.predict(np.array([[1.0]])))
+                self.assertTrue(client.is_unsupported)
+                self.assertIsNone(client.predict(np.array([[1.0]])))
+                board.write([np.full((2,), 2.0)])
+                interrupt.on_step_end({})
+                np.testing.assert_array_equal(parameter.params[0], [2, 2])
+
+                # server が推論している場合は同期しない
+                server.worker = _StubWorkerRun()
+                client.is_unsupported = False
+                self.assertIsNotNone(client.predict(np.array([[1.0]])))
+                self.assertTrue(client.is_served)
+                board.write([np.full((2,), 3.0)])
+                interrupt.on_step_end({})
+                np.testing.assert_array_equal(parameter.params[0], [2, 2])
+            finally:
+                board.close()
+        finally:
+            server.stop_event.set()
+            server.join()
+
+    def _run_rate_limiter(self, insert_sleep, sample_sleep):
+        end_signal = mp.Value(ctypes.c_bool, False)
+        limiter = _RateLimiter(2, 10, min_size=20, train_end_signal=end_signal)  # type: ignore
+        memory = mock.Mock()
+        staging = _RemoteMemoryStaging(memory, send_num=4, send_interval=1, rate_limiter=limiter)  # type: ignore
+        diffs = []
+
+        def _actor():
+            for i in range(300):
+                staging.add(i)
+                time.sleep(insert_sleep)
+            staging.flush()
+
+        def _trainer():
+            while not end_signal.value:
+                limiter.add_sample(1)
+                limiter.wait_sample()
+                diffs.append(limiter._diff())
+                time.sleep(sample_sleep)
+
+        actor = threading.Thread(target=_actor)
+        trainer = threading.Thread(target=_trainer)
+        actor.start()
+        trainer.start()
+        actor.join(timeout=60)
+        end_signal.value = True
+        trainer.join(timeout=60)
+        self.assertEqual(limiter.insert_count.value, 300)
+        return limiter, diffs, staging
+
+    def test_rate_limiter_actor_fast(self):
+        limiter, diffs, staging = self._run_rate_limiter(0, 0.002)
+        # actor が待つので sample 数は insert 数 × 2 に近い
+        self.assertTrue(staging.wait_time > 0)
+        self.assertTrue(max(diffs) <= 10 + 2 * 4)
+        self.assertTrue(abs(limiter.get_samples_per_insert() - 2) < 0.3)
+
+    def test_rate_limiter_trainer_fast(self):
+        limiter, diffs, staging = self._run_rate_limiter(0.002, 0)
+        # trainer が待つので sample 数は insert 数 × 2 を大きく超えない
+        self.assertTrue(min(diffs[:-1]) >= -10 - 1)
+        self.assertTrue(staging.wait_time == 0)
+
+    def test_train_end_signal(self):
+        end_signal = _TrainEndSignal()
+        self.assertFalse(end_signal.value)
+
+        ps = mp.Process(target=_set_end_signal, args=(end_signal,))
+        ps.start()
+        t0 = time.time()
+        ready = mp.connection.wait([end_signal.get_wait_object()], timeout=10)
+        self.assertTrue(time.time() - t0 < 5)
+        self.assertEqual(len(ready), 1)
+        self.assertTrue(end_signal.value)
+        ps.join()
+
+    def test_actor_restart(self):
+        import srl
+        from srl import runner
+        from srl.algorithms import ql
+        from srl.envs import grid  # noqa F401
+
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config(), actor_num=2)
+        config.enable_actor_restart = True
+        recorder = _RecordPolling()
+        start_method = mp.get_start_method(allow_none=True)
+        runner.mp_train(
+            config,
+            timeout=5,
+            enable_evaluation=False,
+            print_progress=False,
+            enable_file_logger=False,
+            callbacks=[_CrashActor(), recorder],
+        )
+        self.assertEqual(recorder.restart_counts[-1], 1)
+        # 呼び出し元の start_method は変更しない
+        self.assertEqual(mp.get_start_method(allow_none=True), start_method)
+
+        # 再起動しない場合は例外
+        config.enable_actor_restart = False
+        with self.assertRaises(RuntimeError):
+            runner.mp_train(
+                config,
+                timeout=5,
+                enable_evaluation=False,
+                print_progress=False,
+                enable_file_logger=False,
+                callbacks=[_CrashActor()],
+            )
+
+
+    def test_save_memory_chunked(self):
+        import os
+        import tempfile
+
+        import srl
+        from srl import runner
+        from srl.algorithms import ql
+        from srl.base.rl import checkpoint
+        from srl.envs import grid  # noqa F401
+
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config(), actor_num=1)
+        config.save_memory_chunked = True
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "memory")
+            _, memory, _ = runner.mp_train(
+                config,
+                max_train_count=100,
+                enable_evaluation=False,
+                print_progress=False,
+                enable_file_logger=False,
+                return_memory=True,
+                save_memory=path,
+            )
+            self.assertTrue(checkpoint.is_chunk_dir(path))
+            loaded = config.make_remote_memory()
+            loaded.load(path)
+            self.assertEqual(loaded.length(), memory.length())
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_shared_memory_board", verbosity=2)
@@ -0,0 +1,152 @@
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import srl
+from srl import runner
+from srl.algorithms import ql
+from srl.base.rl.remote_memory import PriorityExperienceReplay, SequenceRemoteMemory
+from srl.envs import grid  # noqa F401
+from srl.runner.prefetch_sampler import PrefetchSampler, is_supported
+
+
+class _Memory:
+    def __init__(self, sample_sleep=0.0, error_count=-1):
+        self.sample_sleep = sample_sleep
+        self.error_count = error_count
+        self.sample_count = 0
+        self.logs = []
+
+    def length(self):
+        return 100
+
+    def sample(self, step, batch_size):
+        if self.sample_count == self.error_count:
+            raise ValueError("sample error")
+        time.sleep(self.sample_sleep)
+        self.logs.append(("sample", step))
+        self.sample_count += 1
+        return self.sample_count
+
+    def update(self, indices, batchs, td_errors):
+        self.logs.append(("update", indices))
+
+
+class Test(unittest.TestCase):
+    def test_prefetch(self):
+        memory = _Memory()
+        sampler = PrefetchSampler(memory, prefetch_num=3)  # type: ignore
+        self.assertEqual(sampler.length(), 100)
+
+        self.assertEqual(sampler.sample(0, 4), 1)
+        time.sleep(0.1)
+        self.assertEqual(sampler.get_prefetched_num(), 3)
+        for i in range(10):
+            sampler.update(i, None, None)
+            self.assertEqual(sampler.sample(i + 1, 4), i + 2)
+        sampler.close()
+
+        # update は呼ばれた順に反映される
+        updates = [log[1] for log in memory.logs if log[0] == "update"]
+        self.assertEqual(updates, list(range(10)))
+        # update は次に先読みする sample の前に反映される(先読み分より前には遅れない)
+        for i in range(10):
+            idx = memory.logs.index(("update", i))
+            sample_num = len([x for x in memory.logs[:idx] if x[0] == "sample"])
+            self.assertTrue(sample_num <= (i + 1) + 3 + 1)
+
+    def test_wait(self):
+        # sample が遅くても、学習中に先読みされていれば待たない
+        memory = _Memory(sample_sleep=0.01)
+        sampler = PrefetchSampler(memory, prefetch_num=2)  # type: ignore
+        sampler.sample(0, 4)
+        time.sleep(0.1)
+        t0 = time.time()
+        sampler.sample(0, 4)
+        self.assertTrue(time.time() - t0 < 0.01)
+        sampler.close()
+
+    def test_exception(self):
+        memory = _Memory(error_count=3)
+        sampler = PrefetchSampler(memory, prefetch_num=1)  # type: ignore
+        with self.assertRaises(RuntimeError) as cm:
+            for _ in range(10):
+                sampler.sample(0, 4)
+        self.assertIsInstance(cm.exception.__cause__, ValueError)
+        sampler.close()
+
+    def test_priority_experience_replay(self):
+        memory = PriorityExperienceReplay(None)
+        memory.init("ProportionalMemory", 100, 1.0, 1.0, 1)
+        for i in range(50):
+            memory.add(i, 1.0)
+        sampler = PrefetchSampler(memory, prefetch_num=2)  # type: ignore
+        for i in range(20):
+            indices, batchs, weights = sampler.sample(i, 8)
+            self.assertEqual(len(batchs), 8)
+            sampler.update(indices, batchs, np.ones((8,)))
+        sampler.close()
+        self.assertTrue(sampler._updates.empty())
+
+    def test_rankbase_memory(self):
+        # sample で取り出す memory でも、使われなかった先読み分は close で戻される
+        for name in ["RankBaseMemory", "RankBaseMemoryLinear"]:
+            with self.subTest(name):
+                memory = PriorityExperienceReplay(None)
+                memory.init(name, 100, 1.0, 1.0, 1)
+                for i in range(50):
+                    memory.add(i, 1.0)
+                sampler = PrefetchSampler(memory, prefetch_num=2)  # type: ignore
+                for i in range(5):
+                    indices, batchs, weights = sampler.sample(i, 8)
+                    sampler.update(indices, batchs, np.ones((8,)))
+                time.sleep(0.1)
+                self.assertEqual(sampler.get_prefetched_num(), 2)
+                sampler.close()
+                self.assertEqual(memory.length(), 50)
+                self.assertEqual(sorted(b for _, b in memory.memory.memory), list(range(50)))
+
+    def test_train_only(self):
+        self.assertFalse(is_supported(SequenceRemoteMemory))
+        self.assertTrue(is_supported(PriorityExperienceReplay))
+
+        # 非対応のメモリはそのまま学習する
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        parameter, memory, _ = runner.train(config, max_steps=1000, enable_file_logger=False, print_progress=False)
+        config.enable_prefetch_sampler = True
+        runner.train_only(
+            config,
+            parameter,
+            memory,
+            timeout=1,
+            enable_evaluation=False,
+            enable_file_logger=False,
+            print_progress=False,
+        )
+
+
+    def test_train_only_exception(self):
+        # 学習中に例外が出た場合も close される
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        parameter, memory, _ = runner.train(config, max_steps=100, enable_file_logger=False, print_progress=False)
+        config.enable_prefetch_sampler = True
+        with mock.patch("srl.runner.prefetch_sampler.is_supported", return_value=True), mock.patch.object(
+            PrefetchSampler, "close", autospec=True
+        ) as close, mock.patch.object(ql.Trainer, "train", side_effect=ValueError("train error")):
+            with self.assertRaises(ValueError):
+                runner.train_only(
+                    config,
+                    parameter,
+                    memory,
+                    timeout=1,
+                    enable_evaluation=False,
+                    enable_file_logger=False,
+                    print_progress=False,
+                )
+        close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_prefetch", verbosity=2)
@@ -61,6 +61,51 @@ class Test(unittest.TestCase):
         reward = np.mean(rewards)
         self.assertTrue(reward > 0.5, f"reward: {reward}")
 
+    def test_vector_env(self):
+        env_config = srl.EnvConfig("Grid")
+        rl_config = ql.Config(epsilon=0.5, lr=0.01)
+        config = runner.Config(env_config, rl_config, vector_env_num=4)
+
+        parameter, _, _ = runner.train(config, max_steps=50_000, enable_file_logger=False)
+
+        config.vector_env_num = 1
+        rewards = runner.evaluate(config, parameter, max_episodes=100)
+        reward = np.mean(rewards)
+        self.assertTrue(reward > 0.5, f"reward: {reward}")
+
+    def test_evaluate_process(self):
+        env_config = srl.EnvConfig("Grid")
+        rl_config = ql.Config()
+        config = runner.Config(env_config, rl_config)
+        parameter, _, _ = runner.train(config, max_steps=10000, enable_file_logger=False)
+
+        rewards = runner.evaluate(config, parameter, max_episodes=20, seed=1, process_num=2)
+        self.assertEqual(len(rewards), 20)
+        self.assertTrue(np.mean(rewards) > 0.5)
+
+        # episode毎のseedなのでプロセス数によらず同じ結果
+        rewards2 = runner.evaluate(config, parameter, max_episodes=20, seed=1, process_num=3)
+        self.assertEqual(rewards, rewards2)
+        rewards2 = runner.evaluate(config, parameter, max_episodes=20, seed=1, seed_per_episode=True, process_num=1)
+        self.assertEqual(rewards, rewards2)
+
+        # seed_per_episode の場合は seed+i で1episode実行した結果と同じ
+        rewards_single = [runner.evaluate(config, parameter, max_episodes=1, seed=1 + i)[0] for i in range(20)]
+        self.assertEqual(rewards2, rewards_single)
+
+        # 指定しない場合(1プロセス)は今まで通り最初に1回だけ seed を設定する
+        rewards3 = runner.evaluate(config, parameter, max_episodes=20, seed=1, process_num=1)
+        self.assertEqual(rewards3[0], rewards_single[0])
+        self.assertNotEqual(rewards3, rewards_single)
+        self.assertEqual(rewards3, runner.evaluate(config, parameter, max_episodes=20, seed=1))
+
+        # multi play
+        config = runner.Config(srl.EnvConfig("OX"), None)
+        config.players = ["cpu", "random"]
+        rewards = runner.evaluate(config, max_episodes=10, process_num=2)
+        self.assertEqual(len(rewards), 10)
+        self.assertEqual(len(rewards[0]), 2)
+
 
 if __name__ == "__main__":
     unittest.main(module=__name__, defaultTest="Test.test_basic", verbosity=2)
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import srl
+from srl import runner
+from srl.algorithms import ql
+from srl.envs import grid  # noqa F401
+from srl.runner.thread_trainer import ThreadTrainer
+
+
+class _Trainer:
+    def __init__(self, train_sleep: float = 0, error_count: int = -1):
+        self.train_sleep = train_sleep
+        self.error_count = error_count
+        self.train_count = 0
+
+    def get_train_count(self):
+        return self.train_count
+
+    def train(self):
+        if self.train_count == self.error_count:
+            raise ValueError("train error")
+        time.sleep(self.train_sleep)
+        self.train_count += 1
+        return {"loss": 0}
+
+
+class _RemoteMemory:
+    def __init__(self):
+        self.buffer = []
+
+    def add(self, batch):
+        self.buffer.append(batch)
+
+    def length(self):
+        return len(self.buffer)
+
+
+class Test(unittest.TestCase):
+    def _play(self, replay_ratio, train_sleep, step_sleep, steps=300, max_lag=10):
+        trainer = _Trainer(train_sleep)
+        memory = _RemoteMemory()
+        tt = ThreadTrainer(trainer, memory, replay_ratio, max_lag)  # type: ignore
+        tt.start()
+        for i in range(steps):
+            memory.add(i)
+            time.sleep(step_sleep)
+            tt.add_step()
+            tt.pop_train_info()
+        tt.stop()
+        return trainer, memory, tt
+
+    def test_replay_ratio_trainer_fast(self):
+        # env が遅い場合、学習は ratio を超えない
+        for ratio in [0.5, 2]:
+            trainer, memory, tt = self._play(ratio, train_sleep=0, step_sleep=0.001)
+            self.assertTrue(trainer.train_count <= 300 * ratio)
+            self.assertTrue(trainer.train_count >= (300 - 10) * ratio - 1)
+
+    def test_replay_ratio_env_fast(self):
+        # 学習が遅い場合、env が待つので max_lag 以上は離れない
+        trainer, memory, tt = self._play(2, train_sleep=0.001, step_sleep=0)
+        self.assertTrue(trainer.train_count >= (300 - 10) * 2 - 1)
+        self.assertTrue(trainer.train_count <= 300 * 2)
+
+    def test_unlock_remote_memory(self):
+        trainer, memory, tt = self._play(1, 0, 0, steps=10)
+        self.assertEqual(memory.length(), 10)
+        self.assertTrue("add" not in memory.__dict__)
+        self.assertTrue("length" not in memory.__dict__)
+
+    def test_exception(self):
+        trainer = _Trainer(error_count=5)
+        tt = ThreadTrainer(trainer, _RemoteMemory(), replay_ratio=1, max_lag=10)  # type: ignore
+        tt.start()
+        with self.assertRaises(RuntimeError) as cm:
+            for _ in range(100):
+                tt.add_step()
+                tt.pop_train_info()
+        self.assertIsInstance(cm.exception.__cause__, ValueError)
+        tt.stop()
+        self.assertFalse(tt.is_alive())
+
+    def test_play(self):
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        config.enable_thread_trainer = True
+        config.thread_trainer_replay_ratio = 1
+        parameter, memory, _ = runner.train(config, max_steps=2000, enable_file_logger=False, print_progress=False)
+        self.assertTrue(len(parameter.Q) > 0)  # type: ignore
+        self.assertTrue("add" not in memory.__dict__)
+        self.assertFalse(any(isinstance(t, ThreadTrainer) for t in threading.enumerate()))
+
+    def test_play_exception(self):
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        config.enable_thread_trainer = True
+        with mock.patch.object(ql.Trainer, "train", side_effect=ValueError("train error")):
+            with self.assertRaises(RuntimeError):
+                runner.train(config, max_steps=1000, enable_file_logger=False, print_progress=False)
+        self.assertFalse(any(isinstance(t, ThreadTrainer) for t in threading.enumerate()))
+
+    def test_play_env_exception(self):
+        # env 側で例外が出た場合も thread が止まる
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        config.enable_thread_trainer = True
+        with mock.patch.object(ql.Worker, "call_policy", side_effect=ValueError("policy error")):
+            with self.assertRaises(ValueError):
+                runner.train(config, max_steps=1000, enable_file_logger=False, print_progress=False)
+        self.assertFalse(any(isinstance(t, ThreadTrainer) for t in threading.enumerate()))
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_play", verbosity=2)
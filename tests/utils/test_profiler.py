@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import srl
+from srl import runner
+from srl.algorithms import ql
+from srl.envs import grid  # noqa F401
+from srl.utils import profiler
+
+
+class Test(unittest.TestCase):
+    def test_summarize(self):
+        prof = profiler.Profiler()
+        for _ in range(90):
+            prof.add("a", 0.001)
+        for _ in range(10):
+            prof.add("a", 0.1)
+        prev = prof.snapshot()
+        for _ in range(10):
+            prof.add("a", 0.01)
+        prof.add("b", 0)
+
+        d = profiler.summarize(prof.snapshot())
+        self.assertEqual(d["a"]["count"], 110)
+        self.assertAlmostEqual(d["a"]["total"], 0.09 + 1.0 + 0.1)
+        self.assertAlmostEqual(d["a"]["p50"], 0.001)
+        self.assertAlmostEqual(d["a"]["p90"], 0.01)
+        self.assertAlmostEqual(d["a"]["p99"], 0.1)
+        self.assertEqual(d["b"]["count"], 1)
+
+        # 差分
+        d = profiler.summarize(prof.snapshot(), prev, with_hist=True)
+        self.assertEqual(d["a"]["count"], 10)
+        self.assertAlmostEqual(d["a"]["mean"], 0.01)
+        self.assertEqual(sum(d["a"]["hist"]), 10)
+        self.assertIn("ratio", d["a"])
+
+    def test_wrap(self):
+        class A:
+            def f(self, x):
+                return x + 1
+
+        a = A()
+        prof = profiler.Profiler()
+        prof.wrap(a, "f", "f")
+        prof.wrap(a, "f", "f")  # 2重には wrap しない
+        t0 = time.perf_counter()
+        self.assertEqual(a.f(1), 2)
+        prof.lap("a", t0)
+        self.assertEqual(prof.phases["a/f"].count, 1)
+        prof.unwrap_all()
+        self.assertNotIn("f", a.__dict__)
+        t0 = time.perf_counter()
+        a.f(1)
+        prof.lap("a", t0)
+        self.assertEqual(prof.phases["a/f"].count, 1)
+
+    def test_nested(self):
+        prof = profiler.Profiler()
+        prev = prof.snapshot()
+        t0 = time.perf_counter()
+        with prof.timer("b"):
+            with prof.timer("c"):
+                time.sleep(0.01)
+            time.sleep(0.01)
+        t0 = prof.lap("a", t0)
+
+        # split はまとめて1回になる
+        with prof.timer("b"):
+            time.sleep(0.01)
+        t0 = prof.split("x", t0)
+        time.sleep(0.01)
+        prof.lap("x", t0)
+
+        d = profiler.summarize(prof.snapshot(), prev)
+        self.assertEqual(set(d.keys()), {"a", "a/b", "a/b/c", "x", "x/b"})
+        self.assertEqual(d["x"]["count"], 1)
+        self.assertTrue(d["x"]["total"] >= 0.02)
+        self.assertAlmostEqual(d["a"]["exclusive"], d["a"]["total"] - d["a/b"]["total"])
+        self.assertAlmostEqual(d["a/b"]["exclusive"], d["a/b"]["total"] - d["a/b/c"]["total"])
+        self.assertTrue(d["a/b"]["exclusive"] >= 0.01)
+
+    def test_train(self):
+        config = runner.Config(srl.EnvConfig("Grid"), ql.Config())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _, memory, history = runner.train(
+                config,
+                max_steps=2000,
+                enable_phase_profiler=True,
+                enable_evaluation=False,
+                file_logger_tmp_dir=tmp_dir,
+                progress_start_time=1,
+            )
+            self.assertIsNone(profiler.get())
+            self.assertNotIn("add", memory.__dict__)
+
+            path = os.path.join(history.train_log_dir, "profile_actor0.txt")
+            with open(path) as f:
+                logs = [json.loads(line) for line in f]
+        phases = {}
+        for log in logs:
+            for k, v in log["phases"].items():
+                phases[k] = phases.get(k, 0) + v["count"]
+        for name in [
+            "policy",
+            "policy/state_encode",
+            "env.step",
+            "worker.on_step",
+            "worker.on_step/remote_memory.add",
+            "trainer.train",
+            "trainer.train/remote_memory.sample",
+            "callbacks",
+        ]:
+            self.assertIn(name, phases)
+        self.assertEqual(phases["env.step"], phases["trainer.train"])
+
+
+if __name__ == "__main__":
+    unittest.main(module=__name__, defaultTest="Test.test_train", verbosity=2)